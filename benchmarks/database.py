@@ -0,0 +1,277 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""
+Connectors database write throughput benchmark
+
+Devices and channel properties records are written through connectors container
+the same way as connectors are reporting them, first round creates entities and
+next rounds are updating them with changed attributes. Every database provider is
+measured in its own process, because entities could be bound only to one database.
+
+MySQL is measured only when its database is provided, schema is created when missing.
+
+Usage: python -m benchmarks.database --devices 50 --properties 16 --rounds 5 --mysql-db miniserver_benchmark
+"""
+
+# App dependencies
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+import uuid
+from multiprocessing.connection import Connection
+from typing import List
+from pony.orm import core as orm
+
+# App libs
+from miniserver_gateway.connectors.connectors import Connectors
+from miniserver_gateway.connectors.queue import CreateOrUpdateChannelPropertyQueueItem, CreateOrUpdateDeviceQueueItem
+from miniserver_gateway.db.models import db, ConnectorEntity
+from miniserver_gateway.db.types import DataType, DeviceStates
+from miniserver_gateway.db.utils import DatabaseSettings, DatabaseUtils, entity_key_generator
+
+log = logging.getLogger("benchmark")
+
+
+#
+# Database provider benchmark
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Benchmarks
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class DatabaseBenchmark:
+    __arguments: argparse.Namespace
+    __configuration: dict
+
+    __commits: int = 0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, arguments: argparse.Namespace, configuration: dict) -> None:
+        self.__arguments = arguments
+        self.__configuration = configuration
+
+    # -----------------------------------------------------------------------------
+
+    def run(self) -> dict:
+        DatabaseUtils.bind(self.__configuration)
+
+        # Every transaction is counted, batching is part of measured behaviour
+        commit = db.provider.commit
+
+        def counted_commit(*args, **kwargs):
+            self.__commits += 1
+
+            return commit(*args, **kwargs)
+
+        db.provider.commit = counted_commit
+
+        connector_id: uuid.UUID = self.__create_connector()
+
+        connectors = Connectors([], {"batch_size": self.__arguments.batch_size}, self.__configuration)
+
+        devices: List[uuid.UUID] = [uuid.uuid4() for _ in range(self.__arguments.devices)]
+        channels: List[uuid.UUID] = [uuid.uuid4() for _ in range(self.__arguments.devices)]
+        properties: List[List[uuid.UUID]] = [
+            [uuid.uuid4() for _ in range(self.__arguments.properties)] for _ in range(self.__arguments.devices)
+        ]
+
+        rounds: List[dict] = []
+
+        for round_index in range(self.__arguments.rounds + 1):
+            records: List[object] = []
+
+            for device_index, device_id in enumerate(devices):
+                records.append(
+                    CreateOrUpdateDeviceQueueItem(
+                        connector_id,
+                        device_id,
+                        "benchmark-device-{}".format(device_index),
+                        DeviceStates(DeviceStates.STATE_RUNNING),
+                        firmware_version="0.{}.{}".format(device_index, round_index),
+                    )
+                )
+
+                for property_index, property_id in enumerate(properties[device_index]):
+                    records.append(
+                        CreateOrUpdateChannelPropertyQueueItem(
+                            device_id,
+                            channels[device_index],
+                            "registers",
+                            property_id,
+                            "register-{}".format(property_index),
+                            unit="round-{}".format(round_index),
+                            data_type=DataType(DataType.DATA_TYPE_FLOAT),
+                            settable=True,
+                            queryable=True,
+                        )
+                    )
+
+            commits: int = self.__commits
+            started: float = time.monotonic()
+
+            connectors.process_records(records)
+
+            elapsed: float = time.monotonic() - started
+
+            rounds.append(
+                {
+                    "records": len(records),
+                    "seconds": round(elapsed, 3),
+                    "records_per_second": round(len(records) / elapsed, 2),
+                    "commits": self.__commits - commits,
+                }
+            )
+
+        return {
+            "provider": self.__configuration.get("provider"),
+            "insert": rounds[0],
+            "update": self.__summarize(rounds[1:]),
+        }
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __summarize(rounds: List[dict]) -> dict or None:
+        if len(rounds) == 0:
+            return None
+
+        records: int = sum([item.get("records") for item in rounds])
+        seconds: float = sum([item.get("seconds") for item in rounds])
+
+        return {
+            "rounds": len(rounds),
+            "records": records,
+            "seconds": round(seconds, 3),
+            "records_per_second": round(records / seconds, 2) if seconds > 0 else None,
+            "commits": sum([item.get("commits") for item in rounds]),
+        }
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    @orm.db_session
+    def __create_connector() -> uuid.UUID:
+        connector = ConnectorEntity(
+            name="Benchmark connector {}".format(entity_key_generator.generate()),
+            type="benchmark",
+            params={},
+        )
+
+        return connector.connector_id
+
+
+def run_provider(arguments: argparse.Namespace, configuration: dict, connection: Connection) -> None:
+    logging.basicConfig(level=logging.WARNING)
+
+    try:
+        connection.send(DatabaseBenchmark(arguments, configuration).run())
+
+    except Exception as e:
+        log.exception(e)
+
+        connection.send({"provider": configuration.get("provider"), "error": str(e)})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FastyBird gateway database providers benchmark")
+    parser.add_argument("--devices", type=int, default=50, help="Count of reported devices")
+    parser.add_argument("--properties", type=int, default=16, help="Count of channel properties of each device")
+    parser.add_argument("--rounds", type=int, default=5, help="Count of update rounds after entities are created")
+    parser.add_argument("--batch-size", type=int, default=100, help="Connectors records written in one transaction")
+    parser.add_argument("--sqlite-file", type=str, default=None, help="SQLite database file, temporary if omitted")
+    parser.add_argument("--mysql-host", type=str, default="127.0.0.1")
+    parser.add_argument("--mysql-user", type=str, default="root")
+    parser.add_argument("--mysql-passwd", type=str, default="")
+    parser.add_argument("--mysql-db", type=str, default=None, help="MySQL database, provider is skipped if omitted")
+    parser.add_argument("--output", type=str, default=None, help="JSON file for results, stdout if omitted")
+
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    configurations: List[dict] = [
+        DatabaseSettings(
+            {
+                "provider": DatabaseSettings.PROVIDER_SQLITE,
+                "filename": (
+                    arguments.sqlite_file
+                    if arguments.sqlite_file is not None
+                    else os.path.join(tempfile.mkdtemp(prefix="fb-benchmark-"), "gateway.sqlite")
+                ),
+            }
+        ).to_dict()
+    ]
+
+    if arguments.mysql_db is not None:
+        configurations.append(
+            DatabaseSettings(
+                {
+                    "provider": DatabaseSettings.PROVIDER_MYSQL,
+                    "host": arguments.mysql_host,
+                    "user": arguments.mysql_user,
+                    "passwd": arguments.mysql_passwd,
+                    "db": arguments.mysql_db,
+                    "create_tables": True,
+                }
+            ).to_dict()
+        )
+
+    results: List[dict] = []
+
+    # Fresh interpreter for every provider, entities are bound to database only once
+    context = multiprocessing.get_context("spawn")
+
+    for configuration in configurations:
+        receiver, sender = context.Pipe(duplex=False)
+
+        process = context.Process(target=run_provider, args=(arguments, configuration, sender))
+        process.start()
+
+        results.append(receiver.recv())
+
+        process.join()
+
+    report: dict = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "parameters": {
+            "devices": arguments.devices,
+            "properties": arguments.properties,
+            "rounds": arguments.rounds,
+            "batch_size": arguments.batch_size,
+        },
+        "providers": results,
+    }
+
+    content: str = json.dumps(report, indent=4)
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(content + "\n")
+
+    print(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""
+Entity keys generator benchmark
+
+Measures encoding of single keys and batches, keys generation from concurrent threads
+and verifies that every generated key is unique and every encoded number is decoded
+back to same number. Benchmark fails with non-zero exit code when verification fails.
+
+Usage: python -m benchmarks.keys --count 100000 --threads 4 --samples 100000
+"""
+
+# App dependencies
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from threading import Thread
+from typing import List
+
+# App libs
+from miniserver_gateway.db.utils import EntityKeyGenerator, EntityKeyHash
+
+
+#
+# Keys benchmark
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Benchmarks
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class KeysBenchmark:
+    __arguments: argparse.Namespace
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, arguments: argparse.Namespace) -> None:
+        self.__arguments = arguments
+
+    # -----------------------------------------------------------------------------
+
+    def run(self) -> dict:
+        numbers: List[int] = EntityKeyGenerator(node=1).generate_numbers(self.__arguments.count)
+
+        started: float = time.perf_counter()
+
+        for number in numbers:
+            EntityKeyHash.encode(number)
+
+        encode_seconds: float = time.perf_counter() - started
+
+        started = time.perf_counter()
+
+        keys: List[str] = EntityKeyHash.encode_many(numbers)
+
+        encode_many_seconds: float = time.perf_counter() - started
+
+        started = time.perf_counter()
+
+        for key in keys:
+            EntityKeyHash.decode(key)
+
+        decode_seconds: float = time.perf_counter() - started
+
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "parameters": {
+                "count": self.__arguments.count,
+                "threads": self.__arguments.threads,
+                "samples": self.__arguments.samples,
+            },
+            "key_length": max([len(key) for key in keys]),
+            "encode_per_second": round(len(numbers) / encode_seconds, 2),
+            "encode_many_per_second": round(len(numbers) / encode_many_seconds, 2),
+            "decode_per_second": round(len(keys) / decode_seconds, 2),
+            "generate": self.__measure_generator(),
+            "round_trip_failures": self.__verify_round_trip(),
+        }
+
+    # -----------------------------------------------------------------------------
+
+    def __measure_generator(self) -> dict:
+        generator = EntityKeyGenerator()
+
+        results: List[List[str]] = [[] for _ in range(self.__arguments.threads)]
+
+        def produce(index: int) -> None:
+            # Half of keys are generated one by one, rest in bulk
+            single: int = self.__arguments.count // 2
+
+            for _ in range(single):
+                results[index].append(generator.generate())
+
+            results[index].extend(generator.generate_many(self.__arguments.count - single))
+
+        threads: List[Thread] = [Thread(target=produce, args=(index,)) for index in range(self.__arguments.threads)]
+
+        started: float = time.perf_counter()
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        elapsed: float = time.perf_counter() - started
+
+        keys: List[str] = [key for result in results for key in result]
+
+        # Keys of every thread have to be increasing
+        monotonic: bool = all(
+            [
+                all(
+                    [
+                        EntityKeyHash.decode(previous) < EntityKeyHash.decode(current)
+                        for previous, current in zip(result, result[1:])
+                    ]
+                )
+                for result in results
+            ]
+        )
+
+        return {
+            "keys": len(keys),
+            "per_second": round(len(keys) / elapsed, 2),
+            "duplicates": len(keys) - len(set(keys)),
+            "monotonic": monotonic,
+        }
+
+    # -----------------------------------------------------------------------------
+
+    def __verify_round_trip(self) -> int:
+        rnd = random.Random(self.__arguments.seed)
+
+        # Boundaries of key length are most likely to break encoding
+        samples: List[int] = [0, 1, EntityKeyHash.BASE - 1, EntityKeyHash.BASE]
+
+        for exponent in range(EntityKeyHash.MAX_LEN, 20):
+            boundary: int = EntityKeyHash.BASE**exponent - EntityKeyHash.BASE ** (EntityKeyHash.MAX_LEN - 1)
+
+            samples.extend([boundary - 1, boundary, boundary + 1])
+
+        samples.extend([rnd.getrandbits(rnd.randint(1, 96)) for _ in range(self.__arguments.samples)])
+
+        failures: int = 0
+
+        for sample, key in zip(samples, EntityKeyHash.encode_many(samples)):
+            if (
+                EntityKeyHash.decode(key) != sample
+                or key != EntityKeyHash.encode(sample)
+                or len(key) < EntityKeyHash.MAX_LEN
+            ):
+                failures += 1
+
+        return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FastyBird gateway entity keys benchmark")
+    parser.add_argument("--count", type=int, default=100000, help="Count of keys encoded and generated by thread")
+    parser.add_argument("--threads", type=int, default=4, help="Count of threads generating keys")
+    parser.add_argument("--samples", type=int, default=100000, help="Count of random numbers for round trip check")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of random numbers for round trip check")
+    parser.add_argument("--output", type=str, default=None, help="JSON file for results, stdout if omitted")
+
+    arguments = parser.parse_args()
+
+    report: dict = KeysBenchmark(arguments).run()
+
+    content: str = json.dumps(report, indent=4)
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(content + "\n")
+
+    print(content)
+
+    generated: dict = report.get("generate")
+
+    if report.get("round_trip_failures") > 0 or generated.get("duplicates") > 0 or not generated.get("monotonic"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
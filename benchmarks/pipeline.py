@@ -0,0 +1,459 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""
+End-to-end throughput benchmark of gateway data pipeline
+
+Real Connectors/Storages/Exchanges/Trigger services are started against SQLite
+database and in-process Redis stand-in. Simulated bus devices push register
+values into connectors container and every value is timed until it is published
+by Redis exchange.
+
+Usage: python -m benchmarks.pipeline --devices 10 --registers 16 --duration 30 --output result.json
+"""
+
+# App dependencies
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import uuid
+from threading import Event, Lock, Thread
+from typing import Dict, List, Tuple
+from pony.orm import core as orm
+
+# App libs
+from benchmarks.redis_server import InMemoryRedisServer
+from miniserver_gateway.connectors.connectors import Connectors
+from miniserver_gateway.db.cache import device_property_cache, channel_property_cache
+from miniserver_gateway.db.models import db, ChannelEntity, ChannelPropertyEntity, DeviceEntity
+from miniserver_gateway.db.types import DataType, DeviceStates
+from miniserver_gateway.db.utils import entity_key_generator
+from miniserver_gateway.events.dispatcher import app_dispatcher
+from miniserver_gateway.exchanges.exchanges import Exchanges
+from miniserver_gateway.gateway.async_runtime import AsyncGatewayRuntime
+from miniserver_gateway.storages.storages import Storages
+from miniserver_gateway.triggers.triggers import Trigger
+from miniserver_gateway.utils.metrics import Histogram, app_metrics
+
+log = logging.getLogger("benchmark")
+
+
+#
+# Simulated FB bus devices
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Benchmarks
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class SimulatedBus(Thread):
+    """
+    Bus master reading registers of simulated devices
+
+    Every read register value is handed over to connectors container the same way
+    as FB bus connector does it, so whole pipeline behind connector is exercised
+    """
+
+    __registers: List[uuid.UUID]
+    __rate: float
+
+    __stop_event: Event
+
+    __sent: Dict[Tuple[str, float], float]
+    __lock: Lock
+
+    __sent_count: int = 0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, registers: List[uuid.UUID], rate: float) -> None:
+        super().__init__(name="Simulated bus", daemon=True)
+
+        self.__registers = registers
+        self.__rate = rate
+
+        self.__stop_event = Event()
+
+        self.__sent = {}
+        self.__lock = Lock()
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def sent_count(self) -> int:
+        return self.__sent_count
+
+    # -----------------------------------------------------------------------------
+
+    def run(self) -> None:
+        started: float = time.monotonic()
+        sequence: int = 0
+
+        while not self.__stop_event.is_set():
+            sequence += 1
+
+            for property_id in self.__registers:
+                value: float = float(sequence)
+
+                with self.__lock:
+                    self.__sent[(property_id.__str__(), value)] = time.monotonic()
+
+                Connectors.send_channel_property_to_storage(property_id, value, value - 1)
+
+                self.__sent_count += 1
+
+                if self.__rate > 0:
+                    # Keep requested pace, sleep only when ahead of schedule
+                    delay: float = started + self.__sent_count / self.__rate - time.monotonic()
+
+                    if delay > 0:
+                        time.sleep(delay)
+
+                if self.__stop_event.is_set():
+                    break
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        self.__stop_event.set()
+
+    # -----------------------------------------------------------------------------
+
+    def delivered(self, property_id: str, value: float) -> float or None:
+        """Return time when delivered value was sent to pipeline"""
+        with self.__lock:
+            return self.__sent.pop((property_id, value), None)
+
+
+#
+# Pipeline benchmark
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Benchmarks
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class PipelineBenchmark:
+    __arguments: argparse.Namespace
+
+    __redis: InMemoryRedisServer
+    __bus: SimulatedBus
+
+    __latencies: List[float]
+    __delivered_at: List[float]
+    __lock: Lock
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, arguments: argparse.Namespace) -> None:
+        self.__arguments = arguments
+
+        self.__latencies = []
+        self.__delivered_at = []
+        self.__lock = Lock()
+
+    # -----------------------------------------------------------------------------
+
+    def run(self) -> dict:
+        database_file: str = os.path.join(tempfile.mkdtemp(prefix="fb-benchmark-"), "gateway.sqlite")
+
+        # Stages metrics are part of report
+        app_metrics.set_enabled(True)
+
+        db.bind(provider="sqlite", filename=database_file, create_db=True)
+        db.generate_mapping(create_tables=True)
+
+        registers: List[uuid.UUID] = self.__create_devices(self.__arguments.devices, self.__arguments.registers)
+
+        self.__redis = InMemoryRedisServer()
+        self.__redis.add_publish_listener(self.__on_publish)
+        self.__redis.start()
+
+        self.__bus = SimulatedBus(registers, self.__arguments.rate)
+
+        configuration: dict = {
+            "storages": [{"type": "redis", "class": "RedisStorage", "port": self.__redis.port, "primary": True}],
+            "exchanges": [{"type": "redis", "class": "RedisExchange", "port": self.__redis.port}],
+            "queues": {},
+        }
+
+        usage_before: resource.struct_rusage = resource.getrusage(resource.RUSAGE_SELF)
+
+        started: float = time.monotonic()
+
+        if self.__arguments.runtime == "asyncio":
+            self.__run_asyncio(configuration)
+
+        else:
+            self.__run_threaded(configuration)
+
+        elapsed: float = time.monotonic() - started
+
+        usage_after: resource.struct_rusage = resource.getrusage(resource.RUSAGE_SELF)
+
+        self.__redis.close()
+
+        return self.__build_report(registers, elapsed, usage_before, usage_after)
+
+    # -----------------------------------------------------------------------------
+
+    def __run_threaded(self, configuration: dict) -> None:
+        exchanges = Exchanges(configuration.get("exchanges"), configuration.get("queues").get("exchanges"))
+        storages = Storages(configuration.get("storages"), configuration.get("queues").get("storages"))
+        connectors = Connectors([], configuration.get("queues").get("connectors"))
+        triggers = Trigger(configuration.get("queues").get("triggers"))
+
+        device_property_cache.subscribe()
+        channel_property_cache.subscribe()
+
+        device_property_cache.initialize()
+        channel_property_cache.initialize()
+
+        connectors.open()
+
+        self.__drive()
+
+        for service in (connectors, exchanges, storages, triggers):
+            service.close()
+            service.join(timeout=3.0)
+
+        app_dispatcher.close()
+
+    # -----------------------------------------------------------------------------
+
+    def __run_asyncio(self, configuration: dict) -> None:
+        runtime = AsyncGatewayRuntime(configuration)
+
+        async def run() -> None:
+            event_loop = asyncio.get_running_loop()
+
+            runtime_task = event_loop.create_task(runtime.run())
+
+            await event_loop.run_in_executor(None, self.__drive)
+
+            runtime.stop()
+
+            await runtime_task
+
+        asyncio.run(run())
+
+    # -----------------------------------------------------------------------------
+
+    def __drive(self) -> None:
+        # Let services finish loading
+        time.sleep(self.__arguments.warmup)
+
+        self.__bus.start()
+
+        time.sleep(self.__arguments.duration)
+
+        self.__bus.close()
+        self.__bus.join()
+
+        # Wait for values still travelling through pipeline
+        deadline: float = time.monotonic() + self.__arguments.drain_timeout
+        delivered: int = -1
+
+        while time.monotonic() < deadline and delivered != len(self.__latencies):
+            delivered = len(self.__latencies)
+
+            time.sleep(0.5)
+
+    # -----------------------------------------------------------------------------
+
+    def __on_publish(self, channel: bytes, message: bytes) -> None:
+        now: float = time.monotonic()
+
+        try:
+            data: dict = json.loads(message).get("data", {})
+
+            sent: float or None = self.__bus.delivered(str(data.get("id")), float(data.get("value")))
+
+        except (ValueError, TypeError, AttributeError):
+            return
+
+        if sent is not None:
+            with self.__lock:
+                self.__latencies.append(now - sent)
+                self.__delivered_at.append(now)
+
+    # -----------------------------------------------------------------------------
+
+    def __build_report(
+        self,
+        registers: List[uuid.UUID],
+        elapsed: float,
+        usage_before: resource.struct_rusage,
+        usage_after: resource.struct_rusage,
+    ) -> dict:
+        latencies: List[float] = sorted(self.__latencies)
+
+        cpu_user: float = usage_after.ru_utime - usage_before.ru_utime
+        cpu_system: float = usage_after.ru_stime - usage_before.ru_stime
+
+        # Throughput is measured only while bus was producing values
+        window: float = self.__arguments.duration
+        window_end: float = min(self.__delivered_at) + window if len(self.__delivered_at) > 0 else 0
+        sustained: int = len([delivered for delivered in self.__delivered_at if delivered <= window_end])
+
+        return {
+            "commit": self.__get_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "parameters": {
+                "runtime": self.__arguments.runtime,
+                "devices": self.__arguments.devices,
+                "registers": self.__arguments.registers,
+                "properties": len(registers),
+                "duration": self.__arguments.duration,
+                "rate": self.__arguments.rate,
+            },
+            "sent": self.__bus.sent_count,
+            "delivered": len(latencies),
+            "sent_per_second": round(self.__bus.sent_count / window, 2),
+            "updates_per_second": round(sustained / window, 2),
+            "latency_ms": {
+                "p50": self.__percentile(latencies, 50),
+                "p90": self.__percentile(latencies, 90),
+                "p99": self.__percentile(latencies, 99),
+                "max": round(latencies[-1] * 1000, 3) if len(latencies) > 0 else None,
+            },
+            "cpu": {
+                "user_seconds": round(cpu_user, 3),
+                "system_seconds": round(cpu_system, 3),
+                "percent": round((cpu_user + cpu_system) / elapsed * 100, 1),
+            },
+            # Linux reports maximum resident set size in kilobytes
+            "max_rss_kb": usage_after.ru_maxrss,
+            "stages": {
+                stage.name: {
+                    "processed": stage.processed,
+                    "dropped": stage.dropped,
+                    "mean_wait_ms": self.__mean(stage.wait),
+                    "mean_processing_ms": self.__mean(stage.processing),
+                }
+                for stage in app_metrics.stages()
+            },
+        }
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __percentile(values: List[float], percentile: int) -> float or None:
+        if len(values) == 0:
+            return None
+
+        index: int = min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))
+
+        return round(values[index] * 1000, 3)
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __mean(histogram: Histogram) -> float or None:
+        buckets, total, count = histogram.snapshot()
+
+        return round(total / count * 1000, 3) if count > 0 else None
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __get_commit() -> str or None:
+        try:
+            return (
+                subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL)
+                .decode("utf-8")
+                .strip()
+            )
+
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    @orm.db_session
+    def __create_devices(devices_count: int, registers_count: int) -> List[uuid.UUID]:
+        registers: List[uuid.UUID] = []
+
+        for device_index in range(devices_count):
+            device = DeviceEntity(
+                identifier="benchmark-device-{}".format(device_index),
+                key=entity_key_generator.generate(),
+                name="Benchmark device {}".format(device_index),
+                state=DeviceStates.STATE_RUNNING,
+                enabled=True,
+                hardware_manufacturer="fastybird",
+                hardware_model="custom",
+                firmware_manufacturer="fastybird",
+            )
+
+            channel = ChannelEntity(
+                identifier="registers",
+                key=entity_key_generator.generate(),
+                device=device,
+            )
+
+            for register_index in range(registers_count):
+                channel_property = ChannelPropertyEntity(
+                    identifier="register-{}".format(register_index),
+                    key=entity_key_generator.generate(),
+                    settable=True,
+                    queryable=True,
+                    data_type=DataType.DATA_TYPE_FLOAT,
+                    channel=channel,
+                )
+
+                registers.append(channel_property.property_id)
+
+        return registers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FastyBird gateway end-to-end pipeline benchmark")
+    parser.add_argument("--devices", type=int, default=10, help="Count of simulated bus devices")
+    parser.add_argument("--registers", type=int, default=16, help="Count of registers of each device")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of producing values")
+    parser.add_argument("--rate", type=float, default=0.0, help="Produced values per second, 0 for unlimited")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds to wait for services to start")
+    parser.add_argument("--drain-timeout", type=float, default=10.0, help="Seconds to wait for in-flight values")
+    parser.add_argument("--runtime", choices=("threaded", "asyncio"), default="threaded")
+    parser.add_argument("--output", type=str, default=None, help="JSON file for results, stdout if omitted")
+
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    report: dict = PipelineBenchmark(arguments).run()
+
+    content: str = json.dumps(report, indent=4)
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(content + "\n")
+
+    print(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,594 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# App dependencies
+import fnmatch
+import hashlib
+import json
+import socket
+import socketserver
+from threading import Lock, Thread
+from typing import Callable, Dict, List, Set, Tuple
+
+# App libs
+from miniserver_gateway.storages.redis import RedisDeviceHashLayout, RedisKeysLayout
+
+
+#
+# Redis protocol reply
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Benchmarks
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class RespEncoder:
+    @staticmethod
+    def encode(value: object) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+
+        if isinstance(value, RespStatus):
+            return b"+" + value.status + b"\r\n"
+
+        if isinstance(value, RespError):
+            return b"-" + value.message + b"\r\n"
+
+        if isinstance(value, bool):
+            return b":" + (b"1" if value else b"0") + b"\r\n"
+
+        if isinstance(value, int):
+            return b":" + str(value).encode() + b"\r\n"
+
+        if isinstance(value, (list, tuple)):
+            return b"*" + str(len(value)).encode() + b"\r\n" + b"".join(RespEncoder.encode(item) for item in value)
+
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+
+        return b"$" + str(len(value)).encode() + b"\r\n" + bytes(value) + b"\r\n"
+
+
+class RespStatus:
+    __slots__ = ("status",)
+
+    def __init__(self, status: bytes) -> None:
+        self.status = status
+
+
+class RespError:
+    __slots__ = ("message",)
+
+    def __init__(self, message: bytes) -> None:
+        self.message = message
+
+
+OK = RespStatus(b"OK")
+PONG = RespStatus(b"PONG")
+
+
+#
+# In-process Redis stand-in
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Benchmarks
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class InMemoryRedisServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal Redis server speaking RESP, good enough for storages and exchanges clients
+
+    Real redis-py client talks to it over loopback, so client side serialization
+    and network round trips are part of measured pipeline
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    data: Dict[bytes, bytes]
+    hashes: Dict[bytes, Dict[bytes, bytes]]
+    subscribers: Dict[bytes, Set["RedisRequestHandler"]]
+    pattern_subscribers: Dict[bytes, Set["RedisRequestHandler"]]
+    config: Dict[bytes, bytes]
+    scripts: Dict[bytes, Callable[["InMemoryRedisServer", List[bytes], List[bytes]], object]]
+
+    lock: Lock
+
+    __publish_listeners: List[Callable[[bytes, bytes], None]]
+    __scripts_handlers: Dict[bytes, Callable[["InMemoryRedisServer", List[bytes], List[bytes]], object]]
+    __thread: Thread
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.data = {}
+        self.hashes = {}
+        self.subscribers = {}
+        self.pattern_subscribers = {}
+        self.config = {b"notify-keyspace-events": b""}
+        self.scripts = {}
+
+        self.lock = Lock()
+
+        self.__publish_listeners = []
+        self.__scripts_handlers = {}
+
+        self.register_script(RedisKeysLayout.WRITE_SCRIPT, StorageScripts.write)
+        self.register_script(RedisDeviceHashLayout.WRITE_SCRIPT, StorageScripts.write_record)
+
+        super().__init__((host, port), RedisRequestHandler)
+
+        self.__thread = Thread(target=self.serve_forever, name="Redis stand-in server", daemon=True)
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    # -----------------------------------------------------------------------------
+
+    def start(self) -> None:
+        self.__thread.start()
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    # -----------------------------------------------------------------------------
+
+    def add_publish_listener(self, listener: Callable[[bytes, bytes], None]) -> None:
+        """Observe every published message in-process, without subscribing over network"""
+        self.__publish_listeners.append(listener)
+
+    # -----------------------------------------------------------------------------
+
+    def register_script(
+        self, source: str, handler: Callable[["InMemoryRedisServer", List[bytes], List[bytes]], object]
+    ) -> None:
+        """Lua is not available, known scripts are executed by their native implementation"""
+        self.__scripts_handlers[hashlib.sha1(source.encode("utf-8")).hexdigest().encode()] = handler
+
+    # -----------------------------------------------------------------------------
+
+    def load_script(self, source: bytes) -> bytes or None:
+        sha: bytes = hashlib.sha1(source).hexdigest().encode()
+
+        if sha not in self.__scripts_handlers:
+            return None
+
+        self.scripts[sha] = self.__scripts_handlers[sha]
+
+        return sha
+
+    # -----------------------------------------------------------------------------
+
+    def publish(self, channel: bytes, message: bytes) -> int:
+        for listener in self.__publish_listeners:
+            listener(channel, message)
+
+        with self.lock:
+            receivers: List[RedisRequestHandler] = list(self.subscribers.get(channel, set()))
+
+            pattern_receivers: List[Tuple[bytes, RedisRequestHandler]] = [
+                (pattern, receiver)
+                for pattern, pattern_subscribers in self.pattern_subscribers.items()
+                if fnmatch.fnmatchcase(channel.decode("utf-8"), pattern.decode("utf-8"))
+                for receiver in pattern_subscribers
+            ]
+
+        for receiver in receivers:
+            receiver.push([b"message", channel, message])
+
+        for pattern, receiver in pattern_receivers:
+            receiver.push([b"pmessage", pattern, channel, message])
+
+        return len(receivers) + len(pattern_receivers)
+
+    # -----------------------------------------------------------------------------
+
+    def notify_keyspace(self, key: bytes, event: bytes) -> None:
+        """Keyspace notification is published only when enabled by configuration, as Redis does"""
+        if b"K" in self.config.get(b"notify-keyspace-events", b""):
+            self.publish(b"__keyspace@0__:" + key, event)
+
+
+#
+# Stand-in connection handler
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Benchmarks
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class RedisRequestHandler(socketserver.StreamRequestHandler):
+    server: InMemoryRedisServer
+
+    __write_lock: Lock
+    __channels: Set[bytes]
+    __patterns: Set[bytes]
+    __changes: List[Tuple[bytes, bytes]]
+
+    # -----------------------------------------------------------------------------
+
+    def setup(self) -> None:
+        super().setup()
+
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.__write_lock = Lock()
+        self.__channels = set()
+        self.__patterns = set()
+        self.__changes = []
+
+    # -----------------------------------------------------------------------------
+
+    def handle(self) -> None:
+        try:
+            while True:
+                command: List[bytes] or None = self.__read_command()
+
+                if command is None:
+                    break
+
+                if len(command) == 0:
+                    continue
+
+                self.__execute(command)
+
+        except (ConnectionError, OSError):
+            pass
+
+        finally:
+            with self.server.lock:
+                for channel in self.__channels:
+                    self.server.subscribers.get(channel, set()).discard(self)
+
+                for pattern in self.__patterns:
+                    self.server.pattern_subscribers.get(pattern, set()).discard(self)
+
+    # -----------------------------------------------------------------------------
+
+    def push(self, reply: object) -> None:
+        try:
+            with self.__write_lock:
+                self.wfile.write(RespEncoder.encode(reply))
+                self.wfile.flush()
+
+        except (ConnectionError, OSError, ValueError):
+            pass
+
+    # -----------------------------------------------------------------------------
+
+    def __read_command(self) -> List[bytes] or None:
+        line: bytes = self.rfile.readline()
+
+        if not line:
+            return None
+
+        if not line.startswith(b"*"):
+            # Inline command
+            return line.strip().split()
+
+        arguments: List[bytes] = []
+
+        for _ in range(int(line[1:])):
+            length: int = int(self.rfile.readline()[1:])
+
+            arguments.append(self.rfile.read(length + 2)[:-2])
+
+        return arguments
+
+    # -----------------------------------------------------------------------------
+
+    def __execute(self, command: List[bytes]) -> None:
+        name: bytes = command[0].upper()
+        arguments: List[bytes] = command[1:]
+
+        server: InMemoryRedisServer = self.server
+
+        if name in (b"SUBSCRIBE", b"UNSUBSCRIBE"):
+            for channel in arguments:
+                with server.lock:
+                    if name == b"SUBSCRIBE":
+                        server.subscribers.setdefault(channel, set()).add(self)
+                        self.__channels.add(channel)
+
+                    else:
+                        server.subscribers.get(channel, set()).discard(self)
+                        self.__channels.discard(channel)
+
+                self.push([name.lower(), channel, len(self.__channels) + len(self.__patterns)])
+
+            return
+
+        if name in (b"PSUBSCRIBE", b"PUNSUBSCRIBE"):
+            for pattern in arguments:
+                with server.lock:
+                    if name == b"PSUBSCRIBE":
+                        server.pattern_subscribers.setdefault(pattern, set()).add(self)
+                        self.__patterns.add(pattern)
+
+                    else:
+                        server.pattern_subscribers.get(pattern, set()).discard(self)
+                        self.__patterns.discard(pattern)
+
+                self.push([name.lower(), pattern, len(self.__channels) + len(self.__patterns)])
+
+            return
+
+        if name == b"PUBLISH":
+            self.push(server.publish(arguments[0], arguments[1]))
+
+            return
+
+        with server.lock:
+            reply: object = self.__execute_data_command(name, arguments)
+
+        self.push(reply)
+
+        # Notifications are published after reply, outside of data lock
+        changes: List[Tuple[bytes, bytes]] = self.__changes
+        self.__changes = []
+
+        for key, event in changes:
+            server.notify_keyspace(key, event)
+
+    # -----------------------------------------------------------------------------
+
+    def __execute_data_command(self, name: bytes, arguments: List[bytes]) -> object:
+        server: InMemoryRedisServer = self.server
+
+        if name == b"PING":
+            return PONG
+
+        if name == b"CONFIG":
+            subcommand: bytes = arguments[0].upper()
+
+            if subcommand == b"GET":
+                return [arguments[1], server.config[arguments[1]]] if arguments[1] in server.config else []
+
+            if subcommand == b"SET":
+                server.config[arguments[1]] = arguments[2]
+
+                return OK
+
+        if name in (b"SELECT", b"AUTH", b"CLIENT", b"FLUSHDB", b"FLUSHALL"):
+            if name in (b"FLUSHDB", b"FLUSHALL"):
+                server.data.clear()
+                server.hashes.clear()
+
+            return OK
+
+        if name == b"SCRIPT":
+            subcommand: bytes = arguments[0].upper()
+
+            if subcommand == b"LOAD":
+                sha: bytes or None = server.load_script(arguments[1])
+
+                return sha if sha is not None else RespError(b"ERR script is not supported by stand-in")
+
+            if subcommand == b"EXISTS":
+                return [int(sha in server.scripts) for sha in arguments[1:]]
+
+            if subcommand == b"FLUSH":
+                server.scripts.clear()
+
+                return OK
+
+        if name == b"EVALSHA":
+            handler: Callable[[InMemoryRedisServer, List[bytes], List[bytes]], object] or None = server.scripts.get(
+                arguments[0].lower()
+            )
+
+            if handler is None:
+                return RespError(b"NOSCRIPT No matching script. Please use EVAL.")
+
+            keys_count: int = int(arguments[1])
+            keys: List[bytes] = arguments[2:2 + keys_count]
+
+            stored: List[object] = [(server.data.get(key), dict(server.hashes.get(key, {}))) for key in keys]
+
+            reply: object = handler(server, keys, arguments[2 + keys_count:])
+
+            for key, (previous, previous_fields) in zip(keys, stored):
+                if server.data.get(key) is not previous:
+                    self.__changes.append((key, b"set"))
+
+                elif server.hashes.get(key, {}) != previous_fields:
+                    self.__changes.append((key, b"hset"))
+
+            return reply
+
+        if name == b"MEMORY":
+            # Payload size only, real server adds its own overhead of every key and field
+            if arguments[0].upper() == b"USAGE":
+                if arguments[1] in server.data:
+                    return len(arguments[1]) + len(server.data[arguments[1]])
+
+                if arguments[1] in server.hashes:
+                    return len(arguments[1]) + sum(
+                        len(field) + len(value) for field, value in server.hashes[arguments[1]].items()
+                    )
+
+                return None
+
+        if name == b"GET":
+            return server.data.get(arguments[0])
+
+        if name == b"MGET":
+            return [server.data.get(key) for key in arguments]
+
+        if name == b"SET":
+            server.data[arguments[0]] = arguments[1]
+
+            self.__changes.append((arguments[0], b"set"))
+
+            return OK
+
+        if name == b"DEL":
+            removed: int = 0
+
+            for key in arguments:
+                if server.data.pop(key, None) is not None or server.hashes.pop(key, None) is not None:
+                    removed += 1
+
+                    self.__changes.append((key, b"del"))
+
+            return removed
+
+        if name == b"EXISTS":
+            return sum(1 for key in arguments if key in server.data or key in server.hashes)
+
+        if name == b"HSET":
+            fields: Dict[bytes, bytes] = server.hashes.setdefault(arguments[0], {})
+            created: int = 0
+
+            for index in range(1, len(arguments) - 1, 2):
+                created += int(arguments[index] not in fields)
+                fields[arguments[index]] = arguments[index + 1]
+
+            self.__changes.append((arguments[0], b"hset"))
+
+            return created
+
+        if name == b"HGET":
+            return server.hashes.get(arguments[0], {}).get(arguments[1])
+
+        if name == b"HMGET":
+            fields: Dict[bytes, bytes] = server.hashes.get(arguments[0], {})
+
+            return [fields.get(field) for field in arguments[1:]]
+
+        if name == b"HGETALL":
+            reply: List[bytes] = []
+
+            for field, value in server.hashes.get(arguments[0], {}).items():
+                reply.extend([field, value])
+
+            return reply
+
+        if name == b"HDEL":
+            fields: Dict[bytes, bytes] = server.hashes.get(arguments[0], {})
+
+            removed: int = sum(1 for field in arguments[1:] if fields.pop(field, None) is not None)
+
+            if removed > 0:
+                self.__changes.append((arguments[0], b"hdel"))
+
+            # Redis removes hash without any field
+            if arguments[0] in server.hashes and len(fields) == 0:
+                server.hashes.pop(arguments[0])
+
+            return removed
+
+        return RespError(b"ERR unknown command '" + name.lower() + b"'")
+
+
+#
+# Native implementation of storages scripts
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Benchmarks
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class StorageScripts:
+    @staticmethod
+    def write(server: InMemoryRedisServer, keys: List[bytes], arguments: List[bytes]) -> List[object]:
+        """Same merge of stored data as RedisKeysLayout.WRITE_SCRIPT is doing"""
+        stored: bytes or None = server.data.get(keys[0])
+        data: dict or None = None
+
+        if stored is not None:
+            try:
+                decoded: object = json.loads(stored)
+
+            except ValueError:
+                decoded = None
+
+            if isinstance(decoded, dict) and "value" in decoded and "expected" in decoded and "pending" in decoded:
+                data = decoded
+
+        received: object = json.loads(arguments[2])
+
+        if arguments[0] == b"value":
+            if (
+                data is not None
+                and data["value"] is not None
+                and data["value"] == received
+                and data["pending"] is not True
+            ):
+                return [0, stored]
+
+            value, expected, pending = received, None, False
+
+            if data is not None and data["expected"] is not None and data["expected"] != received:
+                expected, pending = data["expected"], True
+
+        else:
+            if data is not None and data["value"] is not None and data["value"] == received:
+                return [0, stored]
+
+            value, expected, pending = data["value"] if data is not None else None, received, True
+
+        content: bytes = json.dumps(
+            {"id": arguments[1].decode("utf-8"), "value": value, "expected": expected, "pending": pending}
+        ).encode("utf-8")
+
+        server.data[keys[0]] = content
+
+        return [1, content]
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def write_record(server: InMemoryRedisServer, keys: List[bytes], arguments: List[bytes]) -> List[object]:
+        """Same merge of stored binary records as RedisDeviceHashLayout.WRITE_SCRIPT is doing"""
+        stored: bytes or None = server.hashes.get(keys[0], {}).get(arguments[1])
+        data: Tuple[bool, bytes, bytes] or None = None
+
+        if stored is not None and len(stored) >= 3:
+            length: int = stored[1] * 256 + stored[2]
+
+            if len(stored) >= 3 + length:
+                data = (stored[0] == 1, stored[3:3 + length], stored[3 + length:])
+
+        received: bytes = arguments[2]
+
+        if arguments[0] == b"value":
+            if data is not None and data[1] != b"" and data[1] == received and not data[0]:
+                return [0, stored]
+
+            value, expected, pending = received, b"", 0
+
+            if data is not None and data[2] != b"" and data[2] != received:
+                expected, pending = data[2], 1
+
+        else:
+            if data is not None and data[1] != b"" and data[1] == received:
+                return [0, stored]
+
+            value, expected, pending = data[1] if data is not None else b"", received, 1
+
+        record: bytes = bytes([pending, len(value) // 256, len(value) % 256]) + value + expected
+
+        server.hashes.setdefault(keys[0], {})[arguments[1]] = record
+
+        return [1, record]
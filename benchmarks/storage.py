@@ -0,0 +1,323 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""
+Redis storage write throughput benchmark
+
+Property values are written to Redis storage one by one, as storages container
+was doing it, and in batches as they are drained from storages queue. Both paths
+are measured with empty and with warm storage cache. Reading of properties shows
+hits and evictions of storage cache limited by its size, reading of whole devices
+is measured with empty cache. Every storage layout is measured separately, memory
+used by its keys is reported too.
+
+Local Redis server is used when its port is provided, in-process Redis stand-in otherwise.
+Stand-in reports only size of stored payload as memory usage.
+
+Usage: python -m benchmarks.storage --properties 1000 --devices 10 --rounds 5 --batch-size 100 --port 6379
+"""
+
+# App dependencies
+import argparse
+import json
+import logging
+import platform
+import time
+import uuid
+from typing import Dict, List, Tuple
+from redis import Redis
+
+# App libs
+from benchmarks.redis_server import InMemoryRedisServer
+from miniserver_gateway.db.cache import ChannelPropertyItem
+from miniserver_gateway.db.types import DataType
+from miniserver_gateway.storages.redis import RedisStorage, RedisStorageSettings
+from miniserver_gateway.storages.storages import StorageItem
+
+log = logging.getLogger("benchmark")
+
+
+#
+# Storage benchmark
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Benchmarks
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class StorageBenchmark:
+    __arguments: argparse.Namespace
+
+    __items: List[ChannelPropertyItem]
+    __devices: Dict[uuid.UUID, List[ChannelPropertyItem]]
+    __sequence: int = 0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, arguments: argparse.Namespace) -> None:
+        self.__arguments = arguments
+
+        # Properties are spread evenly over devices, every device has one channel
+        channels: List[Tuple[uuid.UUID, uuid.UUID]] = [
+            (uuid.uuid4(), uuid.uuid4()) for _ in range(max(1, arguments.devices))
+        ]
+
+        self.__items = [
+            ChannelPropertyItem(
+                uuid.uuid4(),
+                "benchmark-{}".format(index),
+                "register-{}".format(index),
+                True,
+                True,
+                DataType(DataType.DATA_TYPE_FLOAT),
+                None,
+                None,
+                channels[index % len(channels)][0],
+                channels[index % len(channels)][1],
+            )
+            for index in range(arguments.properties)
+        ]
+
+        self.__devices = {}
+
+        for item in self.__items:
+            self.__devices.setdefault(item.device, []).append(item)
+
+    # -----------------------------------------------------------------------------
+
+    def run(self) -> dict:
+        server: InMemoryRedisServer or None = None
+
+        port: int or None = self.__arguments.port
+
+        if port is None:
+            server = InMemoryRedisServer()
+            server.start()
+
+            port = server.port
+
+        results: dict = {}
+
+        try:
+            for layout in self.__arguments.layouts:
+                results[layout] = self.__measure_layout(port, layout)
+
+        finally:
+            if server is not None:
+                server.close()
+
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "parameters": {
+                "properties": self.__arguments.properties,
+                "devices": len(self.__devices),
+                "rounds": self.__arguments.rounds,
+                "batch_size": self.__arguments.batch_size,
+                "cache_size": self.__arguments.cache_size,
+                "cache_ttl": self.__arguments.cache_ttl,
+                "server": "redis" if server is None else "in-process",
+            },
+            "results": results,
+        }
+
+    # -----------------------------------------------------------------------------
+
+    def __measure_layout(self, port: int, layout: str) -> dict:
+        storage = RedisStorage(
+            {
+                "host": self.__arguments.host,
+                "port": port,
+                "cache_size": self.__arguments.cache_size,
+                "cache_ttl": self.__arguments.cache_ttl,
+                "layout": layout,
+            }
+        )
+
+        results: dict = {}
+
+        try:
+            for name, writer in (("per_item", self.__write_per_item), ("batched", self.__write_batched)):
+                for cache in ("cold", "warm"):
+                    results["{}_{}".format(name, cache)] = self.__measure(storage, writer, cache == "cold")
+
+            results["reads"] = self.__measure_reads(storage)
+            results["device_reads"] = self.__measure_device_reads(storage)
+
+        finally:
+            storage.close()
+
+        results["memory"] = self.__measure_memory(port, layout)
+
+        return results
+
+    # -----------------------------------------------------------------------------
+
+    def __measure(self, storage: RedisStorage, writer, cold: bool) -> dict:
+        written: int = 0
+        elapsed: float = 0.0
+
+        for _ in range(self.__arguments.rounds):
+            # Every round writes changed values, so nothing could be skipped
+            self.__sequence += 1
+
+            values: List[Tuple[ChannelPropertyItem, float]] = [(item, float(self.__sequence)) for item in self.__items]
+
+            if cold:
+                storage.clear_cache()
+
+            started: float = time.perf_counter()
+
+            written += writer(storage, values)
+
+            elapsed += time.perf_counter() - started
+
+        return {
+            "written": written,
+            "seconds": round(elapsed, 3),
+            "values_per_second": round(written / elapsed, 2) if elapsed > 0 else None,
+        }
+
+    # -----------------------------------------------------------------------------
+
+    def __measure_reads(self, storage: RedisStorage) -> dict:
+        # Counters of reads only, writes are storing their results into cache too
+        storage.clear_cache()
+
+        stats: dict = storage.cache_stats
+
+        started: float = time.perf_counter()
+
+        for _ in range(self.__arguments.rounds):
+            for item in self.__items:
+                storage.read_property_data(item)
+
+        elapsed: float = time.perf_counter() - started
+
+        reads: int = self.__arguments.rounds * len(self.__items)
+
+        return {
+            "read": reads,
+            "seconds": round(elapsed, 3),
+            "reads_per_second": round(reads / elapsed, 2) if elapsed > 0 else None,
+            "cache": {
+                key: value - stats.get(key) if key != "size" else value for key, value in storage.cache_stats.items()
+            },
+        }
+
+    # -----------------------------------------------------------------------------
+
+    def __measure_device_reads(self, storage: RedisStorage) -> dict:
+        elapsed: float = 0.0
+
+        for _ in range(self.__arguments.rounds):
+            # Every device is loaded from Redis, not from cache
+            storage.clear_cache()
+
+            started: float = time.perf_counter()
+
+            for items in self.__devices.values():
+                storage.read_properties_data(items)
+
+            elapsed += time.perf_counter() - started
+
+        reads: int = self.__arguments.rounds * len(self.__devices)
+
+        return {
+            "read": reads,
+            "seconds": round(elapsed, 3),
+            "milliseconds_per_device": round(elapsed * 1000 / reads, 3) if reads > 0 else None,
+        }
+
+    # -----------------------------------------------------------------------------
+
+    def __measure_memory(self, port: int, layout: str) -> dict:
+        storage_layout = RedisStorage.create_layout(layout)
+
+        keys: List[str] = list({storage_layout.get_key(item): True for item in self.__items}.keys())
+
+        redis_client = Redis(host=self.__arguments.host, port=port)
+
+        try:
+            used: int = sum([redis_client.memory_usage(key) or 0 for key in keys])
+
+        finally:
+            redis_client.close()
+
+        return {
+            "keys": len(keys),
+            "bytes": used,
+            "bytes_per_property": round(used / len(self.__items), 2) if len(self.__items) > 0 else None,
+        }
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __write_per_item(storage: RedisStorage, values: List[Tuple[ChannelPropertyItem, float]]) -> int:
+        return len([True for item, value in values if storage.write_property_value(item, value)])
+
+    # -----------------------------------------------------------------------------
+
+    def __write_batched(self, storage: RedisStorage, values: List[Tuple[ChannelPropertyItem, float]]) -> int:
+        written: int = 0
+
+        batch_size: int = self.__arguments.batch_size
+
+        for offset in range(0, len(values), batch_size):
+            results: List[StorageItem or None] = storage.write_properties_values(values[offset:offset + batch_size])
+
+            written += len([True for result in results if result])
+
+        return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FastyBird gateway Redis storage benchmark")
+    parser.add_argument("--properties", type=int, default=1000, help="Count of written properties")
+    parser.add_argument("--devices", type=int, default=10, help="Count of devices properties belong to")
+    parser.add_argument(
+        "--layouts",
+        type=str,
+        nargs="+",
+        choices=[RedisStorageSettings.LAYOUT_KEYS, RedisStorageSettings.LAYOUT_DEVICE_HASH],
+        default=[RedisStorageSettings.LAYOUT_KEYS, RedisStorageSettings.LAYOUT_DEVICE_HASH],
+        help="Storage layouts to be measured",
+    )
+    parser.add_argument("--rounds", type=int, default=5, help="Count of values written to every property")
+    parser.add_argument("--batch-size", type=int, default=100, help="Count of values written in one batch")
+    parser.add_argument("--cache-size", type=int, default=10000, help="Count of properties kept in storage cache")
+    parser.add_argument("--cache-ttl", type=float, default=None, help="Seconds to keep property in storage cache")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="Redis server port, in-process server if omitted")
+    parser.add_argument("--output", type=str, default=None, help="JSON file for results, stdout if omitted")
+
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    report: dict = StorageBenchmark(arguments).run()
+
+    content: str = json.dumps(report, indent=4)
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(content + "\n")
+
+    print(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,13 +20,17 @@ import time
 import uuid
 from abc import ABC, abstractmethod
 from pony.orm import core as orm
-from queue import Queue, Full as QueueFull
-from threading import Thread
-from typing import Dict, List, Set
+from queue import Full as QueueFull
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, Set, Tuple
 
 # App libs
 from miniserver_gateway.connectors.events import ConnectorPropertyValueEvent
 from miniserver_gateway.connectors.queue import (
+    CreateOrUpdateConfigurationQueueItem,
+    CreateOrUpdatePropertyQueueItem,
+    DeleteConfigurationQueueItem,
+    DeletePropertyQueueItem,
     CreateOrUpdateDeviceQueueItem,
     CreateOrUpdateDeviceConfigurationQueueItem,
     DeleteDeviceConfigurationQueueItem,
@@ -42,6 +46,7 @@ from miniserver_gateway.db.cache import (
     DevicePropertyItem,
     ChannelPropertyItem,
 )
+from miniserver_gateway.db.events import DatabaseEntitiesChangedEvent, EntityChangedType
 from miniserver_gateway.db.models import (
     ConnectorEntity,
     DeviceEntity,
@@ -51,15 +56,18 @@ from miniserver_gateway.db.models import (
     ChannelPropertyEntity,
     ChannelConfigurationEntity,
 )
+from miniserver_gateway.db.transactions import entities_changes
 from miniserver_gateway.db.types import DeviceStates, DataType
-from miniserver_gateway.db.utils import EntityKeyHash
+from miniserver_gateway.db.utils import entity_key_generator
 from miniserver_gateway.events.dispatcher import app_dispatcher
 from miniserver_gateway.exceptions.invalid_argument import InvalidArgumentException
 from miniserver_gateway.storages.events import StoragePropertyStoredEvent
 from miniserver_gateway.triggers.events import TriggerActionFiredEvent
-from miniserver_gateway.types.types import ModulesOrigins
+from miniserver_gateway.types.types import ModulesOrigins, QueueOverflowPolicy
 from miniserver_gateway.utils.libraries import LibrariesUtils
+from miniserver_gateway.utils.metrics import StageMetrics, app_metrics
 from miniserver_gateway.utils.properties import PropertiesUtils
+from miniserver_gateway.utils.queue import PipelineQueue, PipelineQueueSettings, QueueUtils
 
 log = logging.getLogger("connectors")
 
@@ -89,6 +97,308 @@ class ConnectorsSettings:
 
         return None
 
+    # -----------------------------------------------------------------------------
+
+    def is_isolated(self, connector_type: str) -> bool:
+        """Check if connector should run in its own process"""
+        for connector in self.__connectors:
+            if connector.get("type") == connector_type:
+                return bool(connector.get("process", False))
+
+        return False
+
+
+#
+# Database writes batching settings
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Connectors
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class ConnectorsBatchSettings:
+    __size: int = 100
+    __window: float = 0.05
+    __states_interval: float = 1.0
+    __fingerprints_ttl: float = 300.0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, config: dict or None) -> None:
+        config = config if config is not None else {}
+
+        self.__size = max(1, int(config.get("batch_size", 100)))
+        self.__window = max(0, int(config.get("batch_time", 50))) / 1000
+        self.__states_interval = max(0, int(config.get("states_interval", 1000))) / 1000
+        self.__fingerprints_ttl = max(0, int(config.get("fingerprints_ttl", 300000))) / 1000
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def size(self) -> int:
+        """Maximal count of records written in one transaction"""
+        return self.__size
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def window(self) -> float:
+        """Maximal waiting time in seconds for more records to be written together"""
+        return self.__window
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def states_interval(self) -> float:
+        """Interval in seconds in which changed devices states are written, zero disables write-behind"""
+        return self.__states_interval
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def fingerprints_ttl(self) -> float:
+        """Seconds for which written record is trusted to be unchanged, zero disables skipping of records"""
+        return self.__fingerprints_ttl
+
+
+#
+# Write-behind buffer of devices states
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Connectors
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class DevicesStatesWriter(Thread):
+    """
+    Connectors are reporting device state on every received packet
+
+    Only last reported state of each device is kept and written in interval,
+    state equal to already written one is not written again, so flapping
+    device or repeated reports are not reaching database and exchanges.
+    State is written when its record is persisted, state which could not
+    be persisted is pending again
+    """
+
+    __stopped: bool = False
+
+    __writer: Callable[[CreateOrUpdateDeviceQueueItem], bool]
+    __interval: float
+
+    __pending: Dict[uuid.UUID, CreateOrUpdateDeviceQueueItem]
+    __flushed: Dict[uuid.UUID, DeviceStates]
+    __written: Dict[uuid.UUID, DeviceStates]
+
+    __lock: Lock
+    __wakeup: Event
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, writer: Callable[[CreateOrUpdateDeviceQueueItem], bool], interval: float) -> None:
+        super().__init__(name="Devices states writer thread", daemon=True)
+
+        self.__writer = writer
+        self.__interval = interval
+
+        self.__pending = {}
+        self.__flushed = {}
+        self.__written = {}
+
+        self.__lock = Lock()
+        self.__wakeup = Event()
+
+    # -----------------------------------------------------------------------------
+
+    def run(self) -> None:
+        while not self.__stopped:
+            self.__wakeup.wait(self.__interval)
+
+            self.flush()
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        self.__stopped = True
+        self.__wakeup.set()
+
+        # Last states have to be written before connectors queue is closed
+        self.flush()
+
+    # -----------------------------------------------------------------------------
+
+    def update(self, record: CreateOrUpdateDeviceQueueItem) -> None:
+        with self.__lock:
+            # State which is being written is compared, it will be written before pending one
+            if self.__flushed.get(record.device_id, self.__written.get(record.device_id)) == record.state:
+                # Device returned to already written state
+                self.__pending.pop(record.device_id, None)
+
+            else:
+                self.__pending[record.device_id] = record
+
+    # -----------------------------------------------------------------------------
+
+    def replaced(self, device_id: uuid.UUID, state: DeviceStates) -> None:
+        """State is written together with other device attributes, older pending state is not valid"""
+        with self.__lock:
+            self.__pending.pop(device_id, None)
+            self.__flushed[device_id] = state
+
+    # -----------------------------------------------------------------------------
+
+    def persisted(self, record: CreateOrUpdateDeviceQueueItem) -> None:
+        with self.__lock:
+            self.__written[record.device_id] = record.state
+
+            if self.__flushed.get(record.device_id) == record.state:
+                self.__flushed.pop(record.device_id)
+
+    # -----------------------------------------------------------------------------
+
+    def failed(self, record: CreateOrUpdateDeviceQueueItem) -> None:
+        """Record could not be queued or written, it is written again unless newer state is pending"""
+        with self.__lock:
+            if self.__flushed.get(record.device_id) == record.state:
+                self.__flushed.pop(record.device_id)
+
+            # Written state is unknown after failure
+            self.__written.pop(record.device_id, None)
+
+            # Newer state is already being written
+            if record.device_id not in self.__pending and record.device_id not in self.__flushed:
+                self.__pending[record.device_id] = record
+
+    # -----------------------------------------------------------------------------
+
+    def flush(self) -> None:
+        with self.__lock:
+            records: List[CreateOrUpdateDeviceQueueItem] = list(self.__pending.values())
+
+            self.__pending = {}
+
+            for record in records:
+                self.__flushed[record.device_id] = record.state
+
+        for record in records:
+            if not self.__writer(record):
+                self.failed(record)
+
+
+#
+# Fingerprints of written records
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Connectors
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class RecordsFingerprints:
+    """
+    Mirror of last written connectors records
+
+    Connectors are propagating whole devices structure repeatedly, records equal
+    to already written ones are recognized without loading entities from database.
+    Fingerprint is dropped when writing fails or entity is changed by other writer.
+    Entities could be changed by other processes too, so fingerprint expires after ttl
+    """
+
+    __fingerprints: Dict[uuid.UUID, Tuple[tuple, float]]
+    __ttl: float
+
+    __skipped: int = 0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, ttl: float = 300.0) -> None:
+        self.__fingerprints = {}
+        self.__ttl = ttl
+        self.__skipped = 0
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def skipped(self) -> int:
+        return self.__skipped
+
+    # -----------------------------------------------------------------------------
+
+    def matches(self, record: object) -> bool:
+        entity_id: uuid.UUID or None = self.__get_entity_id(record)
+
+        if entity_id is None or isinstance(record, self.__DELETE_RECORDS):
+            return False
+
+        stored: Tuple[tuple, float] or None = self.__fingerprints.get(entity_id)
+
+        if stored is None:
+            return False
+
+        if stored[1] <= time.monotonic():
+            self.__fingerprints.pop(entity_id, None)
+
+            return False
+
+        if stored[0] == self.__get_fingerprint(record):
+            self.__skipped += 1
+
+            return True
+
+        return False
+
+    # -----------------------------------------------------------------------------
+
+    def store(self, record: object) -> None:
+        """Remember successfully written record"""
+        entity_id: uuid.UUID or None = self.__get_entity_id(record)
+
+        if entity_id is None:
+            return
+
+        if isinstance(record, self.__DELETE_RECORDS) or self.__ttl <= 0:
+            self.__fingerprints.pop(entity_id, None)
+
+        else:
+            self.__fingerprints[entity_id] = (self.__get_fingerprint(record), time.monotonic() + self.__ttl)
+
+    # -----------------------------------------------------------------------------
+
+    def invalidate(self, entity_id: uuid.UUID) -> None:
+        self.__fingerprints.pop(entity_id, None)
+
+    # -----------------------------------------------------------------------------
+
+    def invalidate_record(self, record: object) -> None:
+        entity_id: uuid.UUID or None = self.__get_entity_id(record)
+
+        if entity_id is not None:
+            self.invalidate(entity_id)
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __get_entity_id(record: object) -> uuid.UUID or None:
+        if isinstance(record, CreateOrUpdateDeviceQueueItem):
+            return record.device_id
+
+        elif isinstance(record, (CreateOrUpdatePropertyQueueItem, DeletePropertyQueueItem)):
+            return record.property_id
+
+        elif isinstance(record, (CreateOrUpdateConfigurationQueueItem, DeleteConfigurationQueueItem)):
+            return record.configuration_id
+
+        return None
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __get_fingerprint(record: object) -> tuple:
+        # Records are plain value objects, their whole content is compared
+        return type(record).__name__, tuple(sorted(record.__dict__.items()))
+
+    # -----------------------------------------------------------------------------
+
+    __DELETE_RECORDS: Tuple[type, ...] = (DeletePropertyQueueItem, DeleteConfigurationQueueItem)
+
 
 #
 # Connectors container
@@ -102,24 +412,59 @@ class Connectors(Thread):
     __stopped: bool = False
 
     __settings: ConnectorsSettings
+    __database_configuration: dict
 
     __connectors: Set["ConnectorInterface"] = set()
-    __queue: Queue
+    __queue: PipelineQueue
+    __batch_settings: ConnectorsBatchSettings
+    __states_writer: DevicesStatesWriter
+    __fingerprints: RecordsFingerprints
+
+    __metrics: StageMetrics
+
+    # Values are sent by connectors threads, stage is resolved only once
+    __values_metrics: StageMetrics = app_metrics.stage("connectors.values")
 
     __SHUTDOWN_WAITING_DELAY: int = 3.0
 
+    __DATABASE_RECORDS: Tuple[type, ...] = (
+        CreateOrUpdateDeviceQueueItem,
+        CreateOrUpdateDeviceConfigurationQueueItem,
+        DeleteDeviceConfigurationQueueItem,
+        CreateOrUpdateChannelPropertyQueueItem,
+        DeleteChannelPropertyQueueItem,
+        CreateOrUpdateChannelConfigurationQueueItem,
+        DeleteChannelConfigurationQueueItem,
+    )
+
     # -----------------------------------------------------------------------------
 
-    def __init__(self, config: List[Dict[str, str]]) -> None:
+    def __init__(
+        self,
+        config: List[Dict[str, str]],
+        queue_config: dict or None = None,
+        database_config: dict or None = None,
+    ) -> None:
         super().__init__()
 
         self.__settings = ConnectorsSettings(config)
+        self.__database_configuration = database_config if database_config is not None else {}
 
         app_dispatcher.add_listener(StoragePropertyStoredEvent.EVENT_NAME, self.__publish_storage_value_event)
         app_dispatcher.add_listener(TriggerActionFiredEvent.EVENT_NAME, self.__publish_trigger_value_event)
+        app_dispatcher.add_listener(DatabaseEntitiesChangedEvent.EVENT_NAME, self.__entities_changed_event)
 
         # Queue for consuming incoming data from connectors
-        self.__queue = Queue(maxsize=1000)
+        # By default, new record is refused when queue is full, so producer knows it was not written
+        self.__metrics = app_metrics.stage("connectors")
+        self.__queue = PipelineQueue(
+            PipelineQueueSettings(queue_config, QueueOverflowPolicy(QueueOverflowPolicy.POLICY_DROP_NEWEST)),
+            metrics=self.__metrics,
+        )
+        self.__batch_settings = ConnectorsBatchSettings(queue_config)
+
+        self.__fingerprints = RecordsFingerprints(self.__batch_settings.fingerprints_ttl)
+        self.__states_writer = DevicesStatesWriter(self.__enqueue_device_record, self.__batch_settings.states_interval)
 
         # Process gateway connectors
         self.__load()
@@ -135,40 +480,69 @@ class Connectors(Thread):
 
         # All records have to be processed before thread is closed
         while True:
-            if not self.__queue.empty():
-                record = self.__queue.get()
+            # Wait for incoming records and give short time to producers to queue more of them
+            self.process_records(
+                QueueUtils.collect(self.__queue, self.__batch_settings.size, self.__batch_settings.window)
+            )
+
+            if self.__stopped and self.__queue.empty():
+                break
+
+    # -----------------------------------------------------------------------------
 
-                if isinstance(record, CreateOrUpdateDeviceQueueItem):
-                    self.__process_device_record(record)
+    @property
+    def queue(self) -> PipelineQueue:
+        return self.__queue
 
-                elif isinstance(record, CreateOrUpdateDeviceConfigurationQueueItem) or isinstance(
-                    record, DeleteDeviceConfigurationQueueItem
-                ):
-                    self.__process_device_configuration_record(record)
+    # -----------------------------------------------------------------------------
 
-                elif isinstance(record, CreateOrUpdateChannelPropertyQueueItem) or isinstance(
-                    record, DeleteChannelPropertyQueueItem
-                ):
-                    self.__process_channel_property_record(record)
+    def process_record(self, record: object) -> None:
+        self.process_records([record])
 
-                elif isinstance(record, UpdatePropertyExpectedQueueItem):
-                    self.__process_property_expected_record(record)
+    # -----------------------------------------------------------------------------
 
-                elif isinstance(record, CreateOrUpdateChannelConfigurationQueueItem) or isinstance(
-                    record, DeleteChannelConfigurationQueueItem
-                ):
-                    self.__process_channel_configuration_record(record)
+    def process_records(self, records: List[object]) -> None:
+        """Records changing database are written in transactions with up to batch size records"""
+        batch: List[object] = []
 
-            if self.__stopped and self.__queue.empty():
-                break
+        for record in records:
+            if isinstance(record, self.__DATABASE_RECORDS):
+                # Record equal to last written one would not change anything
+                if self.__fingerprints.matches(record):
+                    self.__record_persisted(record)
 
-            time.sleep(0.001)
+                    continue
+
+                batch.append(record)
+
+                if len(batch) >= self.__batch_settings.size:
+                    self.__process_database_records(batch)
+
+                    batch = []
+
+            else:
+                # Keep records order, previously collected records are written first
+                if len(batch) > 0:
+                    self.__process_database_records(batch)
+
+                    batch = []
+
+                if isinstance(record, UpdatePropertyExpectedQueueItem):
+                    with self.__metrics.measure():
+                        self.__process_property_expected_record(record)
+
+        if len(batch) > 0:
+            self.__process_database_records(batch)
 
     # -----------------------------------------------------------------------------
 
-    def open(self) -> None:
-        # Start main thread
-        self.start()
+    def open(self, threaded: bool = True) -> None:
+        # Start main thread, in asyncio runtime queue is consumed by event loop
+        if threaded:
+            self.start()
+
+        if self.__batch_settings.states_interval > 0:
+            self.__states_writer.start()
 
         for connector in self.__connectors:
             try:
@@ -182,6 +556,10 @@ class Connectors(Thread):
     # -----------------------------------------------------------------------------
 
     def close(self) -> None:
+        app_dispatcher.remove_listener(StoragePropertyStoredEvent.EVENT_NAME, self.__publish_storage_value_event)
+        app_dispatcher.remove_listener(TriggerActionFiredEvent.EVENT_NAME, self.__publish_trigger_value_event)
+        app_dispatcher.remove_listener(DatabaseEntitiesChangedEvent.EVENT_NAME, self.__entities_changed_event)
+
         # Process all registered connectors...
         for connector in self.__connectors:
             try:
@@ -206,22 +584,49 @@ class Connectors(Thread):
             if not one_alive:
                 waiting_for_closing = False
 
+        # Write last reported devices states
+        self.__states_writer.close()
+
         self.__stopped = True
 
+        # Wake up main thread to finish queued records
+        QueueUtils.wake_up(self.__queue)
+
+        log.info(
+            "Connectors queue dropped {} records and skipped {} unchanged records".format(
+                self.__queue.dropped, self.__fingerprints.skipped
+            )
+        )
+
     # -----------------------------------------------------------------------------
 
     def add_or_edit_device(
         self, connector_id: uuid.UUID, device_id: uuid.UUID, identifier: str, state: DeviceStates, **kwargs
     ) -> None:
-        try:
-            self.__queue.put(
-                CreateOrUpdateDeviceQueueItem(
-                    connector_id=connector_id, device_id=device_id, identifier=identifier, state=state, **kwargs
-                )
-            )
+        record: CreateOrUpdateDeviceQueueItem = CreateOrUpdateDeviceQueueItem(
+            connector_id=connector_id, device_id=device_id, identifier=identifier, state=state, **kwargs
+        )
 
-        except QueueFull:
-            log.error("Connectors processing queue is full. New messages could not be added")
+        self.__states_writer.replaced(device_id, state)
+
+        if not self.__enqueue_device_record(record):
+            self.__states_writer.failed(record)
+
+    # -----------------------------------------------------------------------------
+
+    def update_device_state(
+        self, connector_id: uuid.UUID, device_id: uuid.UUID, identifier: str, state: DeviceStates
+    ) -> None:
+        """Device state is written with delay, only last reported state is written"""
+        record: CreateOrUpdateDeviceQueueItem = CreateOrUpdateDeviceQueueItem(
+            connector_id=connector_id, device_id=device_id, identifier=identifier, state=state
+        )
+
+        if self.__batch_settings.states_interval > 0:
+            self.__states_writer.update(record)
+
+        else:
+            self.__enqueue_device_record(record)
 
     # -----------------------------------------------------------------------------
 
@@ -234,7 +639,7 @@ class Connectors(Thread):
         **kwargs
     ) -> None:
         try:
-            self.__queue.put(
+            self.__queue.enqueue(
                 CreateOrUpdateDeviceConfigurationQueueItem(
                     device_id=device_id,
                     configuration_id=configuration_id,
@@ -251,7 +656,7 @@ class Connectors(Thread):
 
     def delete_device_configuration(self, configuration_id: uuid.UUID) -> None:
         try:
-            self.__queue.put(DeleteDeviceConfigurationQueueItem(configuration_id=configuration_id))
+            self.__queue.enqueue(DeleteDeviceConfigurationQueueItem(configuration_id=configuration_id))
 
         except QueueFull:
             log.error("Connectors processing queue is full. New messages could not be added")
@@ -268,7 +673,7 @@ class Connectors(Thread):
         **kwargs
     ) -> None:
         try:
-            self.__queue.put(
+            self.__queue.enqueue(
                 CreateOrUpdateChannelPropertyQueueItem(
                     device_id=device_id,
                     channel_id=channel_id,
@@ -286,7 +691,7 @@ class Connectors(Thread):
 
     def delete_channel_property(self, property_id: uuid.UUID) -> None:
         try:
-            self.__queue.put(DeleteChannelPropertyQueueItem(property_id=property_id))
+            self.__queue.enqueue(DeleteChannelPropertyQueueItem(property_id=property_id))
 
         except QueueFull:
             log.error("Connectors processing queue is full. New messages could not be added")
@@ -303,7 +708,7 @@ class Connectors(Thread):
         **kwargs
     ) -> None:
         try:
-            self.__queue.put(
+            self.__queue.enqueue(
                 CreateOrUpdateChannelConfigurationQueueItem(
                     device_id=device_id,
                     channel_id=channel_id,
@@ -321,58 +726,63 @@ class Connectors(Thread):
 
     def delete_channel_configuration(self, configuration_id: uuid.UUID) -> None:
         try:
-            self.__queue.put(DeleteChannelConfigurationQueueItem(configuration_id=configuration_id))
+            self.__queue.enqueue(DeleteChannelConfigurationQueueItem(configuration_id=configuration_id))
 
         except QueueFull:
             log.error("Connectors processing queue is full. New messages could not be added")
 
     # -----------------------------------------------------------------------------
 
-    @staticmethod
+    @classmethod
     def send_device_property_to_storage(
+        cls,
         property_id: uuid.UUID,
         actual_value: bool or int or float or str or None,
         previous_value: bool or int or float or str or None = None,
     ) -> None:
-        device_property = device_property_cache.get_property_by_id(property_id)
-
-        if device_property is not None:
-            app_dispatcher.dispatch(
-                ConnectorPropertyValueEvent.EVENT_NAME,
-                ConnectorPropertyValueEvent(
-                    ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
-                    device_property,
-                    PropertiesUtils.normalize_value(device_property, actual_value),
-                    PropertiesUtils.normalize_value(device_property, previous_value),
-                ),
+        # Measure preparing of connector value, dispatching is measured by events queues
+        with cls.__values_metrics.measure():
+            device_property = device_property_cache.get_property_by_id(property_id)
+
+            if device_property is None:
+                log.warning("Device property: {} was not found in registry".format(property_id.__str__()))
+
+                return
+
+            event = ConnectorPropertyValueEvent(
+                ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
+                device_property,
+                PropertiesUtils.normalize_value(device_property, actual_value),
+                PropertiesUtils.normalize_value(device_property, previous_value),
             )
 
-        else:
-            log.warning("Device property: {} was not found in registry".format(property_id.__str__()))
+        app_dispatcher.dispatch(ConnectorPropertyValueEvent.EVENT_NAME, event)
 
     # -----------------------------------------------------------------------------
 
-    @staticmethod
+    @classmethod
     def send_channel_property_to_storage(
+        cls,
         property_id: uuid.UUID,
         actual_value: bool or int or float or str or None,
         previous_value: bool or int or float or str or None = None,
     ) -> None:
-        channel_property = channel_property_cache.get_property_by_id(property_id)
-
-        if channel_property is not None:
-            app_dispatcher.dispatch(
-                ConnectorPropertyValueEvent.EVENT_NAME,
-                ConnectorPropertyValueEvent(
-                    ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
-                    channel_property,
-                    PropertiesUtils.normalize_value(channel_property, actual_value),
-                    PropertiesUtils.normalize_value(channel_property, previous_value),
-                ),
+        with cls.__values_metrics.measure():
+            channel_property = channel_property_cache.get_property_by_id(property_id)
+
+            if channel_property is None:
+                log.warning("Channel property: {} was not found in registry".format(property_id.__str__()))
+
+                return
+
+            event = ConnectorPropertyValueEvent(
+                ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
+                channel_property,
+                PropertiesUtils.normalize_value(channel_property, actual_value),
+                PropertiesUtils.normalize_value(channel_property, previous_value),
             )
 
-        else:
-            log.warning("Channel property: {} was not found in registry".format(property_id.__str__()))
+        app_dispatcher.dispatch(ConnectorPropertyValueEvent.EVENT_NAME, event)
 
     # -----------------------------------------------------------------------------
 
@@ -390,13 +800,39 @@ class Connectors(Thread):
 
     # -----------------------------------------------------------------------------
 
+    def __entities_changed_event(self, event: DatabaseEntitiesChangedEvent) -> None:
+        for change in event.events:
+            # Changes of own writes are matching stored fingerprints, only removed entity makes them invalid
+            if event.source is self.__fingerprints and change.action_type != EntityChangedType.ENTITY_DELETED:
+                continue
+
+            entity_id: str or None = change.data.get("id")
+
+            if entity_id is not None:
+                self.__fingerprints.invalidate(uuid.UUID(entity_id))
+
+    # -----------------------------------------------------------------------------
+
+    def __enqueue_device_record(self, record: CreateOrUpdateDeviceQueueItem) -> bool:
+        try:
+            self.__queue.enqueue(record)
+
+            return True
+
+        except QueueFull:
+            log.error("Connectors processing queue is full. New messages could not be added")
+
+        return False
+
+    # -----------------------------------------------------------------------------
+
     def __publish_value_event(
         self,
         item: DevicePropertyItem or ChannelPropertyItem,
         value: str or int or float or bool,
     ) -> None:
         try:
-            self.__queue.put(UpdatePropertyExpectedQueueItem(item=item, expected=value))
+            self.__queue.enqueue(UpdatePropertyExpectedQueueItem(item=item, expected=value))
 
         except QueueFull:
             log.error("Connectors processing queue is full. New messages could not be added")
@@ -416,6 +852,16 @@ class Connectors(Thread):
                 log.error("Classname for configured connector: {} is not configured".format(connector.type))
                 continue
 
+            if self.__settings.is_isolated(connector.type):
+                from miniserver_gateway.connectors.process import ConnectorProcess
+
+                # Connector will be loaded in its own process
+                self.__connectors.add(
+                    ConnectorProcess(self, connector, connector_classname, self.__database_configuration)
+                )
+
+                continue
+
             try:
                 # Try to import connector class
                 connector_class = LibrariesUtils.check_and_import_connector(connector.type, connector_classname)
@@ -431,7 +877,84 @@ class Connectors(Thread):
 
     # -----------------------------------------------------------------------------
 
-    @orm.db_session
+    def __process_database_records(self, records: List[object]) -> None:
+        try:
+            with self.__metrics.measure():
+                # Whole batch is committed at once...
+                with entities_changes.session(self.__fingerprints):
+                    for record in records:
+                        self.__process_database_record(record)
+
+            for record in records:
+                self.__record_persisted(record)
+
+            return
+
+        except Exception as e:
+            if len(records) == 1:
+                self.__record_failed(records[0])
+
+                log.error("Error on writing connector record to database")
+                log.exception(e)
+
+                return
+
+            log.warning("Batch of {} connector records could not be written: {}".format(len(records), e))
+
+        # ...failed batch is rolled back and its records are written one by one to isolate failing record
+        for record in records:
+            try:
+                with self.__metrics.measure():
+                    with entities_changes.session(self.__fingerprints):
+                        self.__process_database_record(record)
+
+                self.__record_persisted(record)
+
+            except Exception as e:
+                self.__record_failed(record)
+
+                log.error("Error on writing connector record to database")
+                log.exception(e)
+
+    # -----------------------------------------------------------------------------
+
+    def __record_persisted(self, record: object) -> None:
+        self.__fingerprints.store(record)
+
+        if isinstance(record, CreateOrUpdateDeviceQueueItem):
+            self.__states_writer.persisted(record)
+
+    # -----------------------------------------------------------------------------
+
+    def __record_failed(self, record: object) -> None:
+        self.__fingerprints.invalidate_record(record)
+
+        if isinstance(record, CreateOrUpdateDeviceQueueItem):
+            self.__states_writer.failed(record)
+
+    # -----------------------------------------------------------------------------
+
+    def __process_database_record(self, record: object) -> None:
+        if isinstance(record, CreateOrUpdateDeviceQueueItem):
+            self.__process_device_record(record)
+
+        elif isinstance(record, CreateOrUpdateDeviceConfigurationQueueItem) or isinstance(
+            record, DeleteDeviceConfigurationQueueItem
+        ):
+            self.__process_device_configuration_record(record)
+
+        elif isinstance(record, CreateOrUpdateChannelPropertyQueueItem) or isinstance(
+            record, DeleteChannelPropertyQueueItem
+        ):
+            self.__process_channel_property_record(record)
+
+        elif isinstance(record, CreateOrUpdateChannelConfigurationQueueItem) or isinstance(
+            record, DeleteChannelConfigurationQueueItem
+        ):
+            self.__process_channel_configuration_record(record)
+
+    # -----------------------------------------------------------------------------
+
     def __process_device_record(self, record: CreateOrUpdateDeviceQueueItem) -> None:
         device: DeviceEntity or None = DeviceEntity.get(device_id=record.device_id)
 
@@ -441,7 +964,7 @@ class Connectors(Thread):
             device: DeviceEntity = DeviceEntity(
                 device_id=record.device_id,
                 identifier=record.identifier,
-                key=EntityKeyHash.encode(int(time.time_ns() / 1000)),
+                key=entity_key_generator.generate(),
                 state=record.state,
                 enabled=True,
             )
@@ -462,7 +985,6 @@ class Connectors(Thread):
 
     # -----------------------------------------------------------------------------
 
-    @orm.db_session
     def __process_device_configuration_record(
         self,
         record: CreateOrUpdateDeviceConfigurationQueueItem or DeleteDeviceConfigurationQueueItem,
@@ -479,7 +1001,7 @@ class Connectors(Thread):
                     device_configuration: DeviceConfigurationEntity = DeviceConfigurationEntity(
                         device=device,
                         configuration_id=record.configuration_id,
-                        key=EntityKeyHash.encode(int(time.time_ns() / 1000)),
+                        key=entity_key_generator.generate(),
                         identifier=record.configuration_identifier,
                         data_type=record.data_type,
                     )
@@ -497,7 +1019,6 @@ class Connectors(Thread):
 
     # -----------------------------------------------------------------------------
 
-    @orm.db_session
     def __process_channel_property_record(
         self,
         record: CreateOrUpdateChannelPropertyQueueItem or DeleteChannelPropertyQueueItem,
@@ -511,7 +1032,7 @@ class Connectors(Thread):
                 if channel is None:
                     channel: ChannelEntity = ChannelEntity(
                         channel_id=record.channel_id,
-                        key=EntityKeyHash.encode(int(time.time_ns() / 1000)),
+                        key=entity_key_generator.generate(),
                         device=device,
                         identifier=record.channel_identifier,
                     )
@@ -530,18 +1051,12 @@ class Connectors(Thread):
 
                 self.__update_channel_property_entity(channel_property, **record.attributes)
 
-                # Refresh repository cache
-                channel_property_cache.clear_cache()
-
         elif isinstance(record, DeleteChannelPropertyQueueItem):
             channel_property: ChannelPropertyEntity = ChannelPropertyEntity.get(property_id=record.property_id)
 
             if channel_property is not None:
                 channel_property.delete()
 
-                # Refresh repository cache
-                channel_property_cache.clear_cache()
-
         else:
             raise InvalidArgumentException("Provided queue item is not valid")
 
@@ -560,7 +1075,6 @@ class Connectors(Thread):
 
     # -----------------------------------------------------------------------------
 
-    @orm.db_session
     def __process_channel_configuration_record(
         self,
         record: CreateOrUpdateChannelConfigurationQueueItem or DeleteChannelConfigurationQueueItem,
@@ -584,7 +1098,7 @@ class Connectors(Thread):
                     channel_configuration: ChannelConfigurationEntity = ChannelConfigurationEntity(
                         channel=channel,
                         configuration_id=record.configuration_id,
-                        key=EntityKeyHash.encode(int(time.time_ns() / 1000)),
+                        key=entity_key_generator.generate(),
                         identifier=record.configuration_identifier,
                         data_type=record.data_type,
                     )
@@ -23,7 +23,7 @@ import time
 
 # App libs
 from miniserver_gateway.db.models import ConnectorEntity, DeviceConnectorEntity
-from miniserver_gateway.db.utils import EntityKeyHash
+from miniserver_gateway.db.utils import entity_key_generator
 from miniserver_gateway.db.types import DeviceStates, DataType
 from miniserver_gateway.exceptions.invalid_state import InvalidStateException
 from miniserver_gateway.connectors.connectors import log, Connectors, ConnectorInterface
@@ -355,8 +355,8 @@ class FbBusConnector(ConnectorInterface, FbBusConnectorInterface, Thread):
     # -----------------------------------------------------------------------------
 
     def propagate_device_state(self, device: DeviceEntity) -> None:
-        # Notify gateway about state
-        self.__container.add_or_edit_device(
+        # Notify gateway about state, gateway writes only state changes
+        self.__container.update_device_state(
             connector_id=self.__connector.connector_id,
             device_id=device.get_id(),
             identifier=device.get_serial_number(),
@@ -459,7 +459,7 @@ class FbBusConnector(ConnectorInterface, FbBusConnectorInterface, Thread):
     ) -> RegisterEntity or None:
         register: RegisterEntity = RegisterEntity(
             uuid.uuid4(),
-            EntityKeyHash.encode(int(time.time_ns() / 1000)),
+            entity_key_generator.generate(),
             uuid.uuid4(),
             device.get_id(),
             register_address,
@@ -0,0 +1,523 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# App dependencies
+import logging
+import multiprocessing
+import uuid
+from logging.handlers import QueueHandler
+from multiprocessing.connection import Connection
+from pony.orm import core as orm
+from threading import Event, Lock, RLock, Thread
+from typing import Dict, List, Set, Tuple
+
+# App libs
+from miniserver_gateway.connectors.connectors import log, Connectors, ConnectorInterface
+from miniserver_gateway.db.cache import channel_property_cache, device_property_cache
+from miniserver_gateway.db.events import DatabaseEntitiesChangedEvent, DatabaseEntityChangedEvent
+from miniserver_gateway.db.models import ConnectorEntity
+from miniserver_gateway.db.utils import DatabaseUtils, EntityKeyGenerator, entity_key_generator
+from miniserver_gateway.events.dispatcher import app_dispatcher
+from miniserver_gateway.utils.libraries import LibrariesUtils
+
+
+#
+# Messages exchanged between gateway and connector process
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Connectors
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class ConnectorProcessMessages:
+    # Gateway -> connector
+    PUBLISH: str = "publish"
+    ENTITIES_CHANGED: str = "entities_changed"
+    CLOSE: str = "close"
+
+    # Connector -> gateway, log record to be handled by gateway loggers
+    LOG: str = "log"
+
+    # Connector -> gateway, these are names of container methods
+    CONTAINER_METHODS: Tuple[str, ...] = (
+        "add_or_edit_device",
+        "update_device_state",
+        "add_or_edit_device_configuration",
+        "delete_device_configuration",
+        "add_or_edit_channel_property",
+        "delete_channel_property",
+        "add_or_edit_channel_configuration",
+        "delete_channel_configuration",
+        "send_device_property_to_storage",
+        "send_channel_property_to_storage",
+    )
+
+
+#
+# Connectors container proxy used inside connector process
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Connectors
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class ConnectorProcessContainer:
+    """Forward container calls from connector process to gateway process"""
+
+    __connection: Connection
+    __lock: RLock
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, connection: Connection) -> None:
+        self.__connection = connection
+        # Log record could be emitted while message is being sent
+        self.__lock = RLock()
+
+    # -----------------------------------------------------------------------------
+
+    def add_or_edit_device(self, **kwargs) -> None:
+        self.__send("add_or_edit_device", kwargs)
+
+    # -----------------------------------------------------------------------------
+
+    def update_device_state(self, **kwargs) -> None:
+        self.__send("update_device_state", kwargs)
+
+    # -----------------------------------------------------------------------------
+
+    def add_or_edit_device_configuration(self, **kwargs) -> None:
+        self.__send("add_or_edit_device_configuration", kwargs)
+
+    # -----------------------------------------------------------------------------
+
+    def delete_device_configuration(self, configuration_id: uuid.UUID) -> None:
+        self.__send("delete_device_configuration", {"configuration_id": configuration_id})
+
+    # -----------------------------------------------------------------------------
+
+    def add_or_edit_channel_property(self, **kwargs) -> None:
+        self.__send("add_or_edit_channel_property", kwargs)
+
+    # -----------------------------------------------------------------------------
+
+    def delete_channel_property(self, property_id: uuid.UUID) -> None:
+        self.__send("delete_channel_property", {"property_id": property_id})
+
+    # -----------------------------------------------------------------------------
+
+    def add_or_edit_channel_configuration(self, **kwargs) -> None:
+        self.__send("add_or_edit_channel_configuration", kwargs)
+
+    # -----------------------------------------------------------------------------
+
+    def delete_channel_configuration(self, configuration_id: uuid.UUID) -> None:
+        self.__send("delete_channel_configuration", {"configuration_id": configuration_id})
+
+    # -----------------------------------------------------------------------------
+
+    def send_device_property_to_storage(self, **kwargs) -> None:
+        self.__send("send_device_property_to_storage", kwargs)
+
+    # -----------------------------------------------------------------------------
+
+    def send_channel_property_to_storage(self, **kwargs) -> None:
+        self.__send("send_channel_property_to_storage", kwargs)
+
+    # -----------------------------------------------------------------------------
+
+    def send_log(self, record: logging.LogRecord) -> None:
+        self.__send(ConnectorProcessMessages.LOG, {"record": record})
+
+    # -----------------------------------------------------------------------------
+
+    def __send(self, method: str, arguments: dict) -> None:
+        # Connection is shared by all connector threads
+        with self.__lock:
+            self.__connection.send((method, arguments))
+
+
+#
+# Log handler of connector process
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Connectors
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class ConnectorProcessLogHandler(QueueHandler):
+    """Forward log records to gateway process, where they are handled by configured handlers"""
+
+    __container: ConnectorProcessContainer
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, container: ConnectorProcessContainer) -> None:
+        super().__init__(None)
+
+        self.__container = container
+
+    # -----------------------------------------------------------------------------
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.__container.send_log(record)
+
+        except (BrokenPipeError, OSError):
+            # Gateway process has gone, there is nobody to handle record
+            pass
+
+
+#
+# Connector isolated in child process
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Connectors
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class ConnectorProcess(ConnectorInterface):
+    """
+    Gateway side of connector running in its own process
+
+    Connector process is restarted when it unexpectedly exits
+    """
+
+    __stopped: bool = False
+
+    __container: Connectors
+
+    __connector_id: uuid.UUID
+    __connector_type: str
+    __connector_classname: str
+    __node: int
+
+    __database_configuration: dict
+
+    __process: multiprocessing.Process or None = None
+    __connection: Connection or None = None
+    __lock: Lock
+
+    __restart_event: Event
+
+    # Entity keys generator nodes used by connectors processes, gateway process is node zero
+    __used_nodes: Set[int] = set()
+    __nodes_lock: Lock = Lock()
+
+    __POLL_INTERVAL: float = 0.5
+    __RESTART_DELAY: float = 1.0
+    __SHUTDOWN_WAITING_DELAY: float = 3.0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(
+        self,
+        container: Connectors,
+        connector: ConnectorEntity,
+        connector_classname: str,
+        database_configuration: dict,
+    ) -> None:
+        Thread.__init__(self)
+
+        self.__container = container
+
+        self.__connector_id = connector.connector_id
+        self.__connector_type = connector.type
+        self.__connector_classname = connector_classname
+        # Restarted process keeps its node
+        self.__node = self.__acquire_node()
+
+        self.__database_configuration = database_configuration
+
+        self.__lock = Lock()
+        self.__restart_event = Event()
+
+        # Threading config...
+        self.setDaemon(True)
+        self.setName("Connector process watcher: {}".format(connector.type))
+
+    # -----------------------------------------------------------------------------
+
+    def open(self) -> None:
+        self.__stopped = False
+
+        self.__start_process()
+
+        # Properties caches of connector process are patched by changes committed in gateway
+        app_dispatcher.add_listener(DatabaseEntitiesChangedEvent.EVENT_NAME, self.__entities_changed)
+
+        # Start messages receiving thread
+        self.start()
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        self.__stopped = True
+
+        app_dispatcher.remove_listener(DatabaseEntitiesChangedEvent.EVENT_NAME, self.__entities_changed)
+
+        self.__restart_event.set()
+
+        self.__send((ConnectorProcessMessages.CLOSE, {}))
+
+        if self.__process is not None:
+            self.__process.join(timeout=self.__SHUTDOWN_WAITING_DELAY)
+
+            if self.__process.is_alive():
+                log.warning("Connector process: {} was not terminated in time".format(self.__connector_type))
+
+                self.__process.terminate()
+                self.__process.join(timeout=self.__SHUTDOWN_WAITING_DELAY)
+
+        self.__release_node()
+
+    # -----------------------------------------------------------------------------
+
+    def run(self) -> None:
+        while not self.__stopped:
+            try:
+                if self.__connection.poll(self.__POLL_INTERVAL):
+                    self.__handle_message(self.__connection.recv())
+
+                    continue
+
+            except (EOFError, OSError):
+                # Connection was closed by child process
+                pass
+
+            if not self.__stopped and not self.__process.is_alive():
+                log.error(
+                    "Connector process: {} exited with code: {}. Restarting...".format(
+                        self.__connector_type, self.__process.exitcode
+                    )
+                )
+
+                # Do not restart crashing connector in tight loop
+                if self.__restart_event.wait(self.__RESTART_DELAY):
+                    break
+
+                self.__start_process()
+
+        # Deliver messages sent by connector while it was closing
+        try:
+            while self.__connection.poll(0):
+                self.__handle_message(self.__connection.recv())
+
+        except (EOFError, OSError):
+            pass
+
+    # -----------------------------------------------------------------------------
+
+    def publish(self, property_id: uuid.UUID, expected: bool or int or float or str or None) -> None:
+        self.__send((ConnectorProcessMessages.PUBLISH, {"property_id": property_id, "expected": expected}))
+
+    # -----------------------------------------------------------------------------
+
+    def __entities_changed(self, event: DatabaseEntitiesChangedEvent) -> None:
+        # Entities could not be sent to other process, only their serialized data
+        changes: List[tuple] = [
+            (change.origin, change.entity_type, change.action_type, change.data, change.parents)
+            for change in event.events
+        ]
+
+        self.__send((ConnectorProcessMessages.ENTITIES_CHANGED, {"changes": changes}))
+
+    # -----------------------------------------------------------------------------
+
+    def __start_process(self) -> None:
+        gateway_connection, connector_connection = multiprocessing.Pipe()
+
+        process = multiprocessing.get_context("spawn").Process(
+            target=run_connector_process,
+            args=(
+                self.__connector_id,
+                self.__connector_type,
+                self.__connector_classname,
+                self.__node,
+                self.__database_configuration,
+                self.__get_logging_levels(),
+                connector_connection,
+            ),
+            name="Connector process: {}".format(self.__connector_type),
+            daemon=True,
+        )
+
+        process.start()
+
+        # Child end of the pipe is owned by child process
+        connector_connection.close()
+
+        with self.__lock:
+            self.__process = process
+            self.__connection = gateway_connection
+
+        log.info("Connector: {} was started in process: {}".format(self.__connector_type, process.pid))
+
+    # -----------------------------------------------------------------------------
+
+    def __send(self, message: Tuple[str, dict]) -> None:
+        with self.__lock:
+            if self.__connection is None:
+                return
+
+            try:
+                self.__connection.send(message)
+
+            except (BrokenPipeError, OSError):
+                log.warning("Connector process: {} is not reachable".format(self.__connector_type))
+
+    # -----------------------------------------------------------------------------
+
+    def __handle_message(self, message: Tuple[str, Dict[str, object]]) -> None:
+        method, arguments = message
+
+        if method == ConnectorProcessMessages.LOG:
+            record: logging.LogRecord = arguments.get("record")
+
+            logging.getLogger(record.name).handle(record)
+
+            return
+
+        if method not in ConnectorProcessMessages.CONTAINER_METHODS:
+            log.warning("Received unknown message: {} from connector process".format(method))
+
+            return
+
+        try:
+            getattr(self.__container, method)(**arguments)
+
+        except Exception as e:
+            log.error("Error on processing message: {} from connector process".format(method))
+            log.exception(e)
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __acquire_node() -> int:
+        with ConnectorProcess.__nodes_lock:
+            for node in range(1, EntityKeyGenerator.MAX_NODE + 1):
+                if node not in ConnectorProcess.__used_nodes:
+                    ConnectorProcess.__used_nodes.add(node)
+
+                    return node
+
+        raise RuntimeError("All entity keys generator nodes are used by connectors processes")
+
+    # -----------------------------------------------------------------------------
+
+    def __release_node(self) -> None:
+        with ConnectorProcess.__nodes_lock:
+            ConnectorProcess.__used_nodes.discard(self.__node)
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __get_logging_levels() -> Dict[str, int]:
+        """Levels of configured loggers, records filtered out by gateway are not sent by connector process"""
+        levels: Dict[str, int] = {"": logging.getLogger().level}
+
+        for name, logger in logging.root.manager.loggerDict.items():
+            if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+                levels[name] = logger.level
+
+        return levels
+
+
+def run_connector_process(
+    connector_id: uuid.UUID,
+    connector_type: str,
+    connector_classname: str,
+    node: int,
+    database_configuration: dict,
+    logging_levels: Dict[str, int],
+    connection: Connection,
+) -> None:
+    """Connector process entrypoint"""
+    container = ConnectorProcessContainer(connection)
+
+    # Spawned process has no logging configuration, records are handled by gateway handlers
+    logging.getLogger().handlers = [ConnectorProcessLogHandler(container)]
+
+    for name, level in logging_levels.items():
+        logging.getLogger(name if name != "" else None).setLevel(level)
+
+    process_log = logging.getLogger("connectors")
+
+    # Keys created by connector could not collide with keys of gateway nor other connectors
+    entity_key_generator.set_node(node)
+
+    DatabaseUtils.bind(database_configuration)
+
+    # Changes committed by gateway are forwarded by gateway
+    device_property_cache.subscribe()
+    channel_property_cache.subscribe()
+
+    connector_class = LibrariesUtils.check_and_import_connector(connector_type, connector_classname)
+
+    if connector_class is None:
+        process_log.error("Connector class: {} could not be loaded".format(connector_classname))
+
+        raise SystemExit(1)
+
+    with orm.db_session:
+        connector_entity: ConnectorEntity or None = ConnectorEntity.get(connector_id=connector_id)
+
+        if connector_entity is None:
+            process_log.error("Connector: {} was not found in database".format(connector_id.__str__()))
+
+            raise SystemExit(1)
+
+        connector: ConnectorInterface = connector_class(container, connector_entity)
+
+    connector.open()
+
+    while connector.is_alive():
+        try:
+            if not connection.poll(0.5):
+                continue
+
+            method, arguments = connection.recv()
+
+        except (EOFError, OSError):
+            # Gateway process has gone
+            break
+
+        if method == ConnectorProcessMessages.PUBLISH:
+            connector.publish(arguments.get("property_id"), arguments.get("expected"))
+
+        elif method == ConnectorProcessMessages.ENTITIES_CHANGED:
+            app_dispatcher.dispatch(
+                DatabaseEntitiesChangedEvent.EVENT_NAME,
+                DatabaseEntitiesChangedEvent(
+                    [
+                        DatabaseEntityChangedEvent(origin, None, action_type, data, entity_type, parents)
+                        for origin, entity_type, action_type, data, parents in arguments.get("changes")
+                    ]
+                ),
+            )
+
+        elif method == ConnectorProcessMessages.CLOSE:
+            connector.close()
+            connector.join(timeout=3.0)
+
+            app_dispatcher.close()
+
+            raise SystemExit(0)
+
+    # Connector thread has died or gateway has gone, process will be restarted by gateway
+    connector.close()
+
+    raise SystemExit(1)
@@ -15,14 +15,13 @@
 #     limitations under the License.
 
 # App dependencies
-import time
 import uuid
 from abc import ABC
 from typing import Dict
 
 # App libs
 from miniserver_gateway.db.cache import DevicePropertyItem, ChannelPropertyItem
-from miniserver_gateway.db.utils import EntityKeyHash
+from miniserver_gateway.db.utils import entity_key_generator
 from miniserver_gateway.db.types import DeviceStates, DataType
 
 
@@ -130,7 +129,7 @@ class CreateOrUpdatePropertyQueueItem(QueueItem):
         if "key" in self.__attributes.keys():
             return self.__attributes.get("key")
 
-        return EntityKeyHash.encode(int(time.time_ns() / 1000))
+        return entity_key_generator.generate()
 
     # -----------------------------------------------------------------------------
 
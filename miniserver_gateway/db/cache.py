@@ -17,15 +17,40 @@
 # App dependencies
 import uuid
 from abc import abstractmethod
+from types import MappingProxyType
 from pony.orm import core as orm
-from typing import Dict, Set, Tuple
+from threading import RLock
+from typing import Callable, Dict, FrozenSet, List, Mapping, Tuple, Type
 
 # App libs
-from miniserver_gateway.db.models import DevicePropertyEntity, ChannelPropertyEntity
+from miniserver_gateway.db.events import DatabaseEntitiesChangedEvent, EntityChangedType
+from miniserver_gateway.db.models import db, ChannelEntity, DevicePropertyEntity, ChannelPropertyEntity
 from miniserver_gateway.db.types import DataType
+from miniserver_gateway.events.dispatcher import app_dispatcher
 
 
 class PropertyItem:
+    """
+    Immutable cache record
+
+    Format is parsed and serialized form is rendered once when item is created,
+    values processing is only reading prepared attributes
+    """
+
+    __slots__ = (
+        "__id",
+        "__key",
+        "__identifier",
+        "__settable",
+        "__queryable",
+        "__data_type",
+        "__unit",
+        "__format",
+        "__device_id",
+        "__parsed_format",
+        "__array",
+    )
+
     __id: uuid.UUID
     __key: str
     __identifier: str
@@ -37,6 +62,12 @@ class PropertyItem:
 
     __device_id: uuid.UUID
 
+    __parsed_format: Tuple[int, int] or Tuple[float, float] or FrozenSet[str] or None
+    __array: Mapping[str, str or int or bool or None]
+
+    # Same enum values are usually used by many properties, one parsed set is shared by all of them
+    __ENUM_FORMATS: Dict[str, FrozenSet[str]] = {}
+
     # -----------------------------------------------------------------------------
 
     def __init__(
@@ -62,6 +93,10 @@ class PropertyItem:
 
         self.__device_id = device_id
 
+        self.__parsed_format = self.__parse_format(property_data_type, property_format)
+        # Read-only view is shared by all callers, so it is not copied with every use
+        self.__array = MappingProxyType(self.__render_array())
+
     # -----------------------------------------------------------------------------
 
     @property
@@ -118,31 +153,18 @@ class PropertyItem:
 
     # -----------------------------------------------------------------------------
 
-    def get_format(self) -> Tuple[int, int] or Tuple[float, float] or Set[str]:
-        if self.__format is None:
-            return None
-
-        if self.__data_type is not None:
-            if self.__data_type == DataType.DATA_TYPE_INT:
-                min_value, max_value, *rest = self.__format.split(":") + [None, None]
-
-                if min_value is not None and max_value is not None and int(min_value) <= int(max_value):
-                    return int(min_value), int(max_value)
+    def get_format(self) -> Tuple[int, int] or Tuple[float, float] or FrozenSet[str] or None:
+        return self.__parsed_format
 
-            elif self.__data_type == DataType.DATA_TYPE_FLOAT:
-                min_value, max_value, *rest = self.__format.split(":") + [None, None]
-
-                if min_value is not None and max_value is not None and float(min_value) <= float(max_value):
-                    return float(min_value), float(max_value)
-
-            elif self.__data_type == DataType.DATA_TYPE_ENUM:
-                return set([x.strip() for x in self.__format.split(",")])
+    # -----------------------------------------------------------------------------
 
-        return None
+    def to_array(self) -> Mapping[str, str or int or bool or None]:
+        """Read-only serialized item, callers extending it have to create their own dictionary"""
+        return self.__array
 
     # -----------------------------------------------------------------------------
 
-    def to_array(self) -> Dict[str, str or int or bool or None]:
+    def __render_array(self) -> Dict[str, str or int or bool or None]:
         if isinstance(self.data_type, DataType):
             data_type = self.data_type.value
 
@@ -163,12 +185,51 @@ class PropertyItem:
             "format": self.format,
         }
 
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __parse_format(
+        data_type: DataType or None,
+        property_format: str or None,
+    ) -> Tuple[int, int] or Tuple[float, float] or FrozenSet[str] or None:
+        if property_format is None or data_type is None:
+            return None
+
+        try:
+            if data_type == DataType.DATA_TYPE_INT:
+                min_value, max_value, *rest = property_format.split(":") + [None, None]
+
+                if min_value is not None and max_value is not None and int(min_value) <= int(max_value):
+                    return int(min_value), int(max_value)
+
+            elif data_type == DataType.DATA_TYPE_FLOAT:
+                min_value, max_value, *rest = property_format.split(":") + [None, None]
+
+                if min_value is not None and max_value is not None and float(min_value) <= float(max_value):
+                    return float(min_value), float(max_value)
+
+            elif data_type == DataType.DATA_TYPE_ENUM:
+                if property_format not in PropertyItem.__ENUM_FORMATS:
+                    PropertyItem.__ENUM_FORMATS[property_format] = frozenset(
+                        [x.strip() for x in property_format.split(",")]
+                    )
+
+                return PropertyItem.__ENUM_FORMATS[property_format]
+
+        except ValueError:
+            # Invalid format is ignored, same as not configured one
+            pass
+
+        return None
+
 
 class DevicePropertyItem(PropertyItem):
-    pass
+    __slots__ = ()
 
 
 class ChannelPropertyItem(PropertyItem):
+    __slots__ = ("__channel_id",)
+
     __channel_id: uuid.UUID
 
     # -----------------------------------------------------------------------------
@@ -206,20 +267,196 @@ class ChannelPropertyItem(PropertyItem):
         return self.__channel_id
 
 
+class PropertiesSnapshot:
+    """
+    Immutable version of cache content
+
+    Snapshot is never modified once published, writers create new snapshot
+    and readers are using reference they obtained without any locking
+    """
+
+    __slots__ = ("__generation", "__items", "__keys_index", "__identifiers_index")
+
+    __generation: int
+    __items: Dict[uuid.UUID, DevicePropertyItem or ChannelPropertyItem]
+    __keys_index: Dict[str, DevicePropertyItem or ChannelPropertyItem]
+    __identifiers_index: Dict[Tuple[uuid.UUID, uuid.UUID or None, str], DevicePropertyItem or ChannelPropertyItem]
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(
+        self,
+        generation: int,
+        items: Dict[uuid.UUID, DevicePropertyItem or ChannelPropertyItem],
+        keys_index: Dict[str, DevicePropertyItem or ChannelPropertyItem],
+        identifiers_index: Dict[Tuple[uuid.UUID, uuid.UUID or None, str], DevicePropertyItem or ChannelPropertyItem],
+    ) -> None:
+        self.__generation = generation
+        self.__items = items
+        self.__keys_index = keys_index
+        self.__identifiers_index = identifiers_index
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def generation(self) -> int:
+        return self.__generation
+
+    # -----------------------------------------------------------------------------
+
+    def get_by_id(self, property_id: uuid.UUID) -> DevicePropertyItem or ChannelPropertyItem or None:
+        return self.__items.get(property_id)
+
+    # -----------------------------------------------------------------------------
+
+    def get_by_key(self, property_key: str) -> DevicePropertyItem or ChannelPropertyItem or None:
+        return self.__keys_index.get(property_key)
+
+    # -----------------------------------------------------------------------------
+
+    def get_by_identifier(
+        self,
+        identifier_key: Tuple[uuid.UUID, uuid.UUID or None, str],
+    ) -> DevicePropertyItem or ChannelPropertyItem or None:
+        return self.__identifiers_index.get(identifier_key)
+
+    # -----------------------------------------------------------------------------
+
+    def items(self) -> List[DevicePropertyItem or ChannelPropertyItem]:
+        return list(self.__items.values())
+
+    # -----------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    # -----------------------------------------------------------------------------
+
+    @classmethod
+    def create(
+        cls,
+        generation: int,
+        items: List[DevicePropertyItem or ChannelPropertyItem],
+    ) -> "PropertiesSnapshot":
+        data: Dict[uuid.UUID, DevicePropertyItem or ChannelPropertyItem] = {}
+        keys_index: Dict[str, DevicePropertyItem or ChannelPropertyItem] = {}
+        identifiers_index: Dict[Tuple[uuid.UUID, uuid.UUID or None, str], PropertyItem] = {}
+
+        for item in items:
+            data[item.property_id] = item
+            keys_index[item.key] = item
+            identifiers_index[cls.get_identifier_index_key(item)] = item
+
+        return cls(generation, data, keys_index, identifiers_index)
+
+    # -----------------------------------------------------------------------------
+
+    def with_item(self, generation: int, item: DevicePropertyItem or ChannelPropertyItem) -> "PropertiesSnapshot":
+        """Copy of snapshot with added or replaced item, entries of replaced item are removed from all indexes"""
+        snapshot: PropertiesSnapshot = self.without_item(generation, item.property_id)
+
+        snapshot.__items[item.property_id] = item
+        snapshot.__keys_index[item.key] = item
+        snapshot.__identifiers_index[self.get_identifier_index_key(item)] = item
+
+        return snapshot
+
+    # -----------------------------------------------------------------------------
+
+    def without_item(self, generation: int, property_id: uuid.UUID) -> "PropertiesSnapshot":
+        """Copy of snapshot without given item"""
+        data: Dict[uuid.UUID, DevicePropertyItem or ChannelPropertyItem] = dict(self.__items)
+        keys_index: Dict[str, DevicePropertyItem or ChannelPropertyItem] = dict(self.__keys_index)
+        identifiers_index: Dict[Tuple[uuid.UUID, uuid.UUID or None, str], PropertyItem] = dict(self.__identifiers_index)
+
+        item: DevicePropertyItem or ChannelPropertyItem or None = data.pop(property_id, None)
+
+        if item is not None:
+            if keys_index.get(item.key) is item:
+                del keys_index[item.key]
+
+            identifier_key: Tuple[uuid.UUID, uuid.UUID or None, str] = self.get_identifier_index_key(item)
+
+            if identifiers_index.get(identifier_key) is item:
+                del identifiers_index[identifier_key]
+
+        return PropertiesSnapshot(generation, data, keys_index, identifiers_index)
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def get_identifier_index_key(
+        item: DevicePropertyItem or ChannelPropertyItem,
+    ) -> Tuple[uuid.UUID, uuid.UUID or None, str]:
+        if isinstance(item, ChannelPropertyItem):
+            return item.device, item.channel(), item.identifier
+
+        return item.device, None, item.identifier
+
+
 class PropertiesRepository:
-    _cache: Dict[str, ChannelPropertyItem or DevicePropertyItem] or None = None
+    """
+    Copy-on-write properties cache
+
+    Readers are taking published snapshot reference without locking, only one
+    writer at a time is allowed to build and publish new snapshot. Every published
+    snapshot has higher generation, so consumers could detect cache change
+
+    Changes received while cache is loaded from database are recorded and replayed
+    over loaded items, so cache could be loaded while gateway is already running
+    """
+
+    _snapshot: PropertiesSnapshot or None = None
+
+    __generation: int = 0
+    __subscribed: bool = False
+
+    __writer_lock: RLock
+    __loader_lock: RLock
+    __publish_listeners: List[Callable[[PropertiesSnapshot], None]]
+
+    # Changes received during loading, item is None for removed property
+    __recorded_changes: List[Tuple[uuid.UUID, DevicePropertyItem or ChannelPropertyItem or None]] or None = None
 
     # -----------------------------------------------------------------------------
 
-    def get_property_by_id(self, property_id: uuid.UUID) -> DevicePropertyItem or ChannelPropertyItem or None:
-        if self._cache is None:
-            self.initialize()
+    def __init__(self) -> None:
+        self.__writer_lock = RLock()
+        self.__loader_lock = RLock()
+        self.__publish_listeners = []
+
+    # -----------------------------------------------------------------------------
 
+    @property
+    def generation(self) -> int:
+        """Generation of actually published snapshot, changed with every cache modification"""
+        return self.get_snapshot().generation
+
+    # -----------------------------------------------------------------------------
+
+    def get_snapshot(self) -> PropertiesSnapshot:
+        snapshot: PropertiesSnapshot or None = self._snapshot
+
+        if snapshot is not None:
+            return snapshot
+
+        with self.__loader_lock:
+            # Other reader could load cache meanwhile
+            if self._snapshot is None:
+                self.initialize()
+
+            return self._snapshot
+
+    # -----------------------------------------------------------------------------
+
+    def get_property_by_id(self, property_id: uuid.UUID) -> DevicePropertyItem or ChannelPropertyItem or None:
         try:
-            if property_id.__str__() in self._cache:
-                return self._cache[property_id.__str__()]
+            if not isinstance(property_id, uuid.UUID):
+                property_id = uuid.UUID(str(property_id))
 
-        except TypeError:
+            return self.get_snapshot().get_by_id(property_id)
+
+        except (TypeError, ValueError):
             pass
 
         return None
@@ -227,13 +464,8 @@ class PropertiesRepository:
     # -----------------------------------------------------------------------------
 
     def get_property_by_key(self, property_key: str) -> DevicePropertyItem or ChannelPropertyItem or None:
-        if self._cache is None:
-            self.initialize()
-
         try:
-            for record in self._cache.values():
-                if record.key == property_key:
-                    return record
+            return self.get_snapshot().get_by_key(property_key)
 
         except TypeError:
             pass
@@ -242,57 +474,359 @@ class PropertiesRepository:
 
     # -----------------------------------------------------------------------------
 
+    def get_property_by_identifier(
+        self,
+        device_id: uuid.UUID,
+        property_identifier: str,
+        channel_id: uuid.UUID or None = None,
+    ) -> DevicePropertyItem or ChannelPropertyItem or None:
+        return self.get_snapshot().get_by_identifier((device_id, channel_id, property_identifier))
+
+    # -----------------------------------------------------------------------------
+
+    def restore(self, items: List[DevicePropertyItem or ChannelPropertyItem]) -> None:
+        """Publish items restored from persisted snapshot, they are served until cache is initialized from database"""
+        self._set_items(items)
+
+    # -----------------------------------------------------------------------------
+
+    def add_publish_listener(self, listener: Callable[[PropertiesSnapshot], None]) -> None:
+        """Listener is called by writer with every published snapshot, so it has to be cheap"""
+        with self.__writer_lock:
+            self.__publish_listeners.append(listener)
+
+    # -----------------------------------------------------------------------------
+
+    def remove_publish_listener(self, listener: Callable[[PropertiesSnapshot], None]) -> None:
+        with self.__writer_lock:
+            if listener in self.__publish_listeners:
+                self.__publish_listeners.remove(listener)
+
+    # -----------------------------------------------------------------------------
+
     def clear_cache(self) -> None:
-        self._cache = None
+        """Drop published snapshot, it will be loaded again by first reader"""
+        with self.__writer_lock:
+            self._snapshot = None
+
+    # -----------------------------------------------------------------------------
+
+    def subscribe(self) -> None:
+        """Keep loaded cache in sync with database by patching changed entries"""
+        if not self.__subscribed:
+            app_dispatcher.add_listener(DatabaseEntitiesChangedEvent.EVENT_NAME, self.__entities_changed)
+
+            self.__subscribed = True
+
+    # -----------------------------------------------------------------------------
+
+    def unsubscribe(self) -> None:
+        if self.__subscribed:
+            app_dispatcher.remove_listener(DatabaseEntitiesChangedEvent.EVENT_NAME, self.__entities_changed)
+
+            self.__subscribed = False
 
     # -----------------------------------------------------------------------------
 
-    @abstractmethod
     def initialize(self) -> None:
+        """Full rebuild of cache from database"""
+        with self.__loader_lock:
+            with self.__writer_lock:
+                self.__recorded_changes = []
+
+            try:
+                items: List[DevicePropertyItem or ChannelPropertyItem] = self._load_items()
+
+            except Exception:
+                with self.__writer_lock:
+                    self.__recorded_changes = None
+
+                raise
+
+            with self.__writer_lock:
+                snapshot: PropertiesSnapshot = PropertiesSnapshot.create(self.__generation + 1, items)
+
+                for property_id, item in self.__recorded_changes:
+                    if item is None:
+                        snapshot = snapshot.without_item(snapshot.generation, property_id)
+
+                    else:
+                        snapshot = snapshot.with_item(snapshot.generation, item)
+
+                self.__recorded_changes = None
+
+                self.__publish(snapshot)
+
+    # -----------------------------------------------------------------------------
+
+    @abstractmethod
+    def _load_items(self) -> List[DevicePropertyItem or ChannelPropertyItem]:
+        """Load all cache items from database"""
+        pass
+
+    # -----------------------------------------------------------------------------
+
+    @abstractmethod
+    def _get_entity_type(self) -> Type[orm.Entity]:
+        pass
+
+    # -----------------------------------------------------------------------------
+
+    @abstractmethod
+    def _create_item(
+        self, data: Dict[str, str or bool or None], parents: Dict[str, str]
+    ) -> DevicePropertyItem or ChannelPropertyItem:
+        """Create cache item from serialized entity and identifiers of its parents"""
         pass
 
+    # -----------------------------------------------------------------------------
+
+    def _set_items(self, items: List[DevicePropertyItem or ChannelPropertyItem]) -> None:
+        """Replace whole cache content"""
+        with self.__writer_lock:
+            self.__publish(PropertiesSnapshot.create(self.__generation + 1, items))
+
+    # -----------------------------------------------------------------------------
+
+    def _set_item(self, item: DevicePropertyItem or ChannelPropertyItem) -> None:
+        with self.__writer_lock:
+            if self.__recorded_changes is not None:
+                self.__recorded_changes.append((item.property_id, item))
+
+            if self._snapshot is None:
+                return
+
+            self.__publish(self._snapshot.with_item(self.__generation + 1, item))
+
+    # -----------------------------------------------------------------------------
+
+    def _remove_item(self, property_id: uuid.UUID) -> None:
+        with self.__writer_lock:
+            if self.__recorded_changes is not None:
+                self.__recorded_changes.append((property_id, None))
+
+            if self._snapshot is None or self._snapshot.get_by_id(property_id) is None:
+                return
+
+            self.__publish(self._snapshot.without_item(self.__generation + 1, property_id))
+
+    # -----------------------------------------------------------------------------
+
+    def __publish(self, snapshot: PropertiesSnapshot) -> None:
+        # Single reference assignment is atomic, readers see old or new snapshot, never partial one
+        self.__generation = snapshot.generation
+        self._snapshot = snapshot
+
+        for listener in self.__publish_listeners:
+            listener(snapshot)
+
+    # -----------------------------------------------------------------------------
+
+    def __entities_changed(self, event: DatabaseEntitiesChangedEvent) -> None:
+        for change in event.events:
+            if not issubclass(change.entity_type, self._get_entity_type()):
+                continue
+
+            if change.action_type == EntityChangedType.ENTITY_DELETED:
+                self._remove_item(uuid.UUID(change.data.get("id")))
+
+            else:
+                self._set_item(self._create_item(change.data, change.parents))
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def _get_data_type(data_type: str or None) -> DataType or None:
+        if data_type is None:
+            return None
+
+        try:
+            return DataType(data_type)
+
+        except ValueError:
+            return None
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def _select_rows(sql: str, attributes: List[orm.Attribute]) -> List[Tuple]:
+        """Raw rows are converted by converters of entities attributes, no entity instance is created"""
+        converters: list = [attribute.converters[0] for attribute in attributes]
+
+        return [
+            tuple(None if value is None else converter.sql2py(value) for converter, value in zip(converters, row))
+            for row in db.select(sql)
+        ]
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return db.provider.quote_name(name)
+
 
 class DevicesPropertiesCache(PropertiesRepository):
     @orm.db_session
-    def initialize(self) -> None:
-        data: dict = {}
-
-        for entity in DevicePropertyEntity.select():
-            data[entity.property_id.__str__()] = DevicePropertyItem(
-                property_id=entity.property_id,
-                property_identifier=entity.identifier,
-                property_key=entity.key,
-                property_settable=entity.settable,
-                property_queryable=entity.queryable,
-                property_data_type=entity.data_type,
-                property_format=entity.format,
-                property_unit=entity.unit,
-                device_id=entity.device.device_id,
+    def _load_items(self) -> List[DevicePropertyItem]:
+        items: List[DevicePropertyItem] = []
+
+        # Device identifier is foreign key column, so properties table is enough
+        attributes: List[orm.Attribute] = [
+            DevicePropertyEntity.property_id,
+            DevicePropertyEntity.key,
+            DevicePropertyEntity.identifier,
+            DevicePropertyEntity.settable,
+            DevicePropertyEntity.queryable,
+            DevicePropertyEntity.data_type,
+            DevicePropertyEntity.unit,
+            DevicePropertyEntity.format,
+            DevicePropertyEntity.device,
+        ]
+
+        sql: str = "SELECT {} FROM {}".format(
+            ", ".join([self._quote(attribute.column) for attribute in attributes]),
+            self._quote(DevicePropertyEntity._table_),
+        )
+
+        for row in self._select_rows(sql, attributes):
+            property_id, key, identifier, settable, queryable, data_type, unit, property_format, device_id = row
+
+            items.append(
+                DevicePropertyItem(
+                    property_id=property_id,
+                    property_identifier=identifier,
+                    property_key=key,
+                    property_settable=settable,
+                    property_queryable=queryable,
+                    property_data_type=self._get_data_type(data_type),
+                    property_format=property_format,
+                    property_unit=unit,
+                    device_id=device_id,
+                )
             )
 
-        self._cache = data
+        return items
+
+    # -----------------------------------------------------------------------------
+
+    def _get_entity_type(self) -> Type[orm.Entity]:
+        return DevicePropertyEntity
+
+    # -----------------------------------------------------------------------------
+
+    def _create_item(self, data: Dict[str, str or bool or None], parents: Dict[str, str]) -> DevicePropertyItem:
+        return DevicePropertyItem(
+            property_id=uuid.UUID(data.get("id")),
+            property_identifier=data.get("identifier"),
+            property_key=data.get("key"),
+            property_settable=data.get("settable"),
+            property_queryable=data.get("queryable"),
+            property_data_type=self._get_data_type(data.get("data_type")),
+            property_format=data.get("format"),
+            property_unit=data.get("unit"),
+            device_id=uuid.UUID(parents.get("device")),
+        )
 
 
 class ChannelsPropertiesCache(PropertiesRepository):
     @orm.db_session
-    def initialize(self) -> None:
-        data: dict = {}
-
-        for entity in ChannelPropertyEntity.select():
-            data[entity.property_id.__str__()] = ChannelPropertyItem(
-                property_id=entity.property_id,
-                property_identifier=entity.identifier,
-                property_key=entity.key,
-                property_settable=entity.settable,
-                property_queryable=entity.queryable,
-                property_data_type=entity.data_type,
-                property_format=entity.format,
-                property_unit=entity.unit,
-                device_id=entity.channel.device.device_id,
-                channel_id=entity.channel.channel_id,
+    def _load_items(self) -> List[ChannelPropertyItem]:
+        items: List[ChannelPropertyItem] = []
+
+        # Properties are joined with their channels in one query, device is not loaded lazily for each property
+        properties_attributes: List[orm.Attribute] = [
+            ChannelPropertyEntity.property_id,
+            ChannelPropertyEntity.key,
+            ChannelPropertyEntity.identifier,
+            ChannelPropertyEntity.settable,
+            ChannelPropertyEntity.queryable,
+            ChannelPropertyEntity.data_type,
+            ChannelPropertyEntity.unit,
+            ChannelPropertyEntity.format,
+            ChannelPropertyEntity.channel,
+        ]
+
+        sql: str = "SELECT {}, c.{} FROM {} p INNER JOIN {} c ON c.{} = p.{}".format(
+            ", ".join(["p.{}".format(self._quote(attribute.column)) for attribute in properties_attributes]),
+            self._quote(ChannelEntity.device.column),
+            self._quote(ChannelPropertyEntity._table_),
+            self._quote(ChannelEntity._table_),
+            self._quote(ChannelEntity.channel_id.column),
+            self._quote(ChannelPropertyEntity.channel.column),
+        )
+
+        for row in self._select_rows(sql, properties_attributes + [ChannelEntity.device]):
+            (
+                property_id,
+                key,
+                identifier,
+                settable,
+                queryable,
+                data_type,
+                unit,
+                property_format,
+                channel_id,
+                device_id,
+            ) = row
+
+            items.append(
+                ChannelPropertyItem(
+                    property_id=property_id,
+                    property_identifier=identifier,
+                    property_key=key,
+                    property_settable=settable,
+                    property_queryable=queryable,
+                    property_data_type=self._get_data_type(data_type),
+                    property_format=property_format,
+                    property_unit=unit,
+                    device_id=device_id,
+                    channel_id=channel_id,
+                )
+            )
+
+        return items
+
+    # -----------------------------------------------------------------------------
+
+    def _get_entity_type(self) -> Type[orm.Entity]:
+        return ChannelPropertyEntity
+
+    # -----------------------------------------------------------------------------
+
+    def _create_item(self, data: Dict[str, str or bool or None], parents: Dict[str, str]) -> ChannelPropertyItem:
+        property_id: uuid.UUID = uuid.UUID(data.get("id"))
+        channel_id: uuid.UUID = uuid.UUID(parents.get("channel"))
+
+        # Device is sent only with created property, property never moves to other channel
+        if parents.get("device") is not None:
+            device_id: uuid.UUID = uuid.UUID(parents.get("device"))
+
+        else:
+            cached: ChannelPropertyItem or None = (
+                self._snapshot.get_by_id(property_id) if self._snapshot is not None else None
             )
 
-        self._cache = data
+            device_id: uuid.UUID = cached.device if cached is not None else self.__load_channel_device(channel_id)
+
+        return ChannelPropertyItem(
+            property_id=property_id,
+            property_identifier=data.get("identifier"),
+            property_key=data.get("key"),
+            property_settable=data.get("settable"),
+            property_queryable=data.get("queryable"),
+            property_data_type=self._get_data_type(data.get("data_type")),
+            property_format=data.get("format"),
+            property_unit=data.get("unit"),
+            device_id=device_id,
+            channel_id=channel_id,
+        )
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    @orm.db_session
+    def __load_channel_device(channel_id: uuid.UUID) -> uuid.UUID:
+        return ChannelEntity[channel_id].device.device_id
 
 
 device_property_cache = DevicesPropertiesCache()
@@ -18,6 +18,7 @@
 from abc import ABC
 from enum import Enum, unique
 from pony.orm import core as orm
+from typing import Dict, List, Type
 from whistle import Event
 
 # App libs
@@ -48,18 +49,45 @@ class EntityChangedType(Enum):
 # @author         Adam Kadlec <adam.kadlec@fastybird.com>
 #
 class DatabaseEntityChangedEvent(ABC, Event):
+    """
+    Change of one entity, changes are emitted in batches by DatabaseEntitiesChangedEvent
+
+    Change received from other process has no entity, only its type and serialized data
+
+    Identifiers of parent entities are not part of published entity data, they are
+    kept separately for consumers like properties caches
+    """
+
     __origin: ModulesOrigins
-    __entity: orm.Entity
+    __entity: orm.Entity or None
+    __entity_type: Type[orm.Entity]
+    __data: Dict[str, str or int or bool or None]
+    __parents: Dict[str, str]
     __action_type: EntityChangedType
 
-    EVENT_NAME: str = "database.entityChanged"
-
     # -----------------------------------------------------------------------------
 
-    def __init__(self, origin: ModulesOrigins, entity: orm.Entity, action_type: EntityChangedType) -> None:
+    def __init__(
+        self,
+        origin: ModulesOrigins,
+        entity: orm.Entity or None,
+        action_type: EntityChangedType,
+        data: Dict[str, str or int or bool or None] or None = None,
+        entity_type: Type[orm.Entity] or None = None,
+        parents: Dict[str, str] or None = None,
+    ) -> None:
         self.__origin = origin
         self.__entity = entity
+        self.__entity_type = entity_type if entity is None else type(entity)
         self.__action_type = action_type
+        self.__parents = parents if parents is not None else {}
+
+        if data is not None:
+            self.__data = data
+
+        else:
+            # Entity could be accessed only in its db session, so its data are serialized immediately
+            self.__data = entity.to_array() if hasattr(entity, "to_array") else {}
 
     # -----------------------------------------------------------------------------
 
@@ -70,11 +98,66 @@ class DatabaseEntityChangedEvent(ABC, Event):
     # -----------------------------------------------------------------------------
 
     @property
-    def entity(self) -> orm.Entity:
+    def entity(self) -> orm.Entity or None:
         return self.__entity
 
     # -----------------------------------------------------------------------------
 
+    @property
+    def entity_type(self) -> Type[orm.Entity]:
+        return self.__entity_type
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def data(self) -> Dict[str, str or int or bool or None]:
+        """Serialized entity data captured when event was created"""
+        return self.__data
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def parents(self) -> Dict[str, str]:
+        """Identifiers of parent entities, e.g. device and channel of property"""
+        return self.__parents
+
+    # -----------------------------------------------------------------------------
+
     @property
     def action_type(self) -> EntityChangedType:
         return self.__action_type
+
+
+#
+# Database has committed changed entities
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Database
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class DatabaseEntitiesChangedEvent(ABC, Event):
+    __events: List[DatabaseEntityChangedEvent]
+    __source: object or None
+
+    EVENT_NAME: str = "database.entitiesChanged"
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, events: List[DatabaseEntityChangedEvent], source: object or None = None) -> None:
+        self.__events = events
+        self.__source = source
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def events(self) -> List[DatabaseEntityChangedEvent]:
+        """Changes in order of their first occurrence, each entity is present only once"""
+        return self.__events
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def source(self) -> object or None:
+        """Source of database session which committed changes"""
+        return self.__source
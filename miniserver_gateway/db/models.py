@@ -26,8 +26,8 @@ from enum import Enum
 # App libs
 from miniserver_gateway.db.converters import EnumConverter
 from miniserver_gateway.db.events import DatabaseEntityChangedEvent, EntityChangedType
+from miniserver_gateway.db.transactions import entities_changes
 from miniserver_gateway.db.types import DeviceStates, DataType, ConditionOperators
-from miniserver_gateway.events.dispatcher import app_dispatcher
 from miniserver_gateway.types.types import ModulesOrigins
 
 # Create database accessor
@@ -140,13 +140,12 @@ class DeviceEntity(db.Entity):
         self.created_at = datetime.datetime.now()
 
     def after_insert(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_CREATED),
-            ),
+            )
         )
 
     def before_update(self) -> None:
@@ -157,13 +156,12 @@ class DeviceEntity(db.Entity):
         self.updated_at = datetime.datetime.now()
 
     def after_update(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_UPDATED),
-            ),
+            )
         )
 
 
@@ -206,30 +204,44 @@ class DevicePropertyEntity(db.Entity):
             "format": self.format,
         }
 
+    def get_parents(self) -> Dict[str, str]:
+        # Device is referenced by its primary key, it is not loaded
+        return {"device": self.device.device_id.__str__()}
+
     def before_insert(self) -> None:
         self.created_at = datetime.datetime.now()
 
     def after_insert(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_CREATED),
-            ),
+                parents=self.get_parents(),
+            )
         )
 
     def before_update(self) -> None:
         self.updated_at = datetime.datetime.now()
 
     def after_update(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_UPDATED),
-            ),
+                parents=self.get_parents(),
+            )
+        )
+
+    def before_delete(self) -> None:
+        entities_changes.record(
+            DatabaseEntityChangedEvent(
+                ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
+                self,
+                EntityChangedType(EntityChangedType.ENTITY_DELETED),
+                parents=self.get_parents(),
+            )
         )
 
 
@@ -369,26 +381,24 @@ class DeviceConfigurationEntity(db.Entity):
         self.created_at = datetime.datetime.now()
 
     def after_insert(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_CREATED),
-            ),
+            )
         )
 
     def before_update(self) -> None:
         self.updated_at = datetime.datetime.now()
 
     def after_update(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_UPDATED),
-            ),
+            )
         )
 
 
@@ -467,26 +477,24 @@ class ChannelEntity(db.Entity):
         self.created_at = datetime.datetime.now()
 
     def after_insert(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_CREATED),
-            ),
+            )
         )
 
     def before_update(self) -> None:
         self.updated_at = datetime.datetime.now()
 
     def after_update(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_UPDATED),
-            ),
+            )
         )
 
 
@@ -529,30 +537,49 @@ class ChannelPropertyEntity(db.Entity):
             "format": self.format,
         }
 
+    def get_parents(self, with_device: bool = False) -> Dict[str, str]:
+        # Channel is referenced by its primary key, its device is loaded only when requested
+        parents: Dict[str, str] = {"channel": self.channel.channel_id.__str__()}
+
+        if with_device:
+            parents["device"] = self.channel.device.device_id.__str__()
+
+        return parents
+
     def before_insert(self) -> None:
         self.created_at = datetime.datetime.now()
 
     def after_insert(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_CREATED),
-            ),
+                parents=self.get_parents(with_device=True),
+            )
         )
 
     def before_update(self) -> None:
         self.updated_at = datetime.datetime.now()
 
     def after_update(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_UPDATED),
-            ),
+                parents=self.get_parents(),
+            )
+        )
+
+    def before_delete(self) -> None:
+        entities_changes.record(
+            DatabaseEntityChangedEvent(
+                ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
+                self,
+                EntityChangedType(EntityChangedType.ENTITY_DELETED),
+                parents=self.get_parents(),
+            )
         )
 
 
@@ -692,26 +719,24 @@ class ChannelConfigurationEntity(db.Entity):
         self.created_at = datetime.datetime.now()
 
     def after_insert(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_CREATED),
-            ),
+            )
         )
 
     def before_update(self) -> None:
         self.updated_at = datetime.datetime.now()
 
     def after_update(self) -> None:
-        app_dispatcher.dispatch(
-            DatabaseEntityChangedEvent.EVENT_NAME,
+        entities_changes.record(
             DatabaseEntityChangedEvent(
                 ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
                 self,
                 EntityChangedType(EntityChangedType.ENTITY_UPDATED),
-            ),
+            )
         )
 
 
@@ -0,0 +1,474 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# App dependencies
+import logging
+import os
+import struct
+import time
+import uuid
+import zlib
+from threading import Event, Thread
+from typing import List, Tuple
+
+# App libs
+from miniserver_gateway.db.cache import (
+    ChannelPropertyItem,
+    DevicePropertyItem,
+    PropertiesRepository,
+    PropertiesSnapshot,
+    channel_property_cache,
+    device_property_cache,
+)
+from miniserver_gateway.db.types import DataType
+
+log = logging.getLogger("database")
+
+
+#
+# Properties cache snapshot settings
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Database
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class PersistenceSettings:
+    __enabled: bool = False
+    __directory: str
+    __write_delay: float = 1.0
+    __retry_interval: float = 5.0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, config: dict or None, default_directory: str = ".") -> None:
+        config = config if config is not None else {}
+
+        self.__enabled = bool(config.get("enabled", False))
+        self.__directory = str(config.get("directory", default_directory))
+        self.__write_delay = float(config.get("write_delay", 1.0))
+        self.__retry_interval = float(config.get("retry_interval", 5.0))
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def write_delay(self) -> float:
+        """Changes published meanwhile are written to file at once"""
+        return self.__write_delay
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def retry_interval(self) -> float:
+        """Delay between attempts to reconcile cache with database"""
+        return self.__retry_interval
+
+
+#
+# Binary snapshot format
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Database
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class PropertiesSnapshotCodec:
+    """
+    Compact binary representation of properties cache
+
+    Header (magic, version, items count) is followed by items with fixed part
+    (uuids as raw bytes and flags) and length prefixed strings. Whole content
+    is protected by trailing checksum, so partially written file is refused
+    """
+
+    MAGIC: bytes = b"FBPC"
+    VERSION: int = 1
+
+    __HEADER: struct.Struct = struct.Struct("<4sBI")
+    __ITEM: struct.Struct = struct.Struct("<16s16s16sB")
+    __STRING_LENGTH: struct.Struct = struct.Struct("<H")
+    __CHECKSUM: struct.Struct = struct.Struct("<I")
+
+    __NONE_LENGTH: int = 0xFFFF
+
+    __FLAG_SETTABLE: int = 0x01
+    __FLAG_QUERYABLE: int = 0x02
+    __FLAG_CHANNEL: int = 0x04
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def encode(items: List[DevicePropertyItem or ChannelPropertyItem]) -> bytes:
+        """ValueError is raised when item string is too long to be stored"""
+        chunks: List[bytes] = [
+            PropertiesSnapshotCodec.__HEADER.pack(
+                PropertiesSnapshotCodec.MAGIC, PropertiesSnapshotCodec.VERSION, len(items)
+            )
+        ]
+
+        for item in items:
+            flags: int = 0
+
+            if item.settable:
+                flags |= PropertiesSnapshotCodec.__FLAG_SETTABLE
+
+            if item.queryable:
+                flags |= PropertiesSnapshotCodec.__FLAG_QUERYABLE
+
+            channel_id: bytes = bytes(16)
+
+            if isinstance(item, ChannelPropertyItem):
+                flags |= PropertiesSnapshotCodec.__FLAG_CHANNEL
+                channel_id = item.channel().bytes
+
+            chunks.append(
+                PropertiesSnapshotCodec.__ITEM.pack(item.property_id.bytes, item.device.bytes, channel_id, flags)
+            )
+
+            for value in (
+                item.key,
+                item.identifier,
+                item.data_type.value if isinstance(item.data_type, DataType) else item.data_type,
+                item.unit,
+                item.format,
+            ):
+                chunks.append(PropertiesSnapshotCodec.__encode_string(value))
+
+        content: bytes = b"".join(chunks)
+
+        return content + PropertiesSnapshotCodec.__CHECKSUM.pack(zlib.crc32(content))
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def decode(content: bytes) -> List[DevicePropertyItem or ChannelPropertyItem]:
+        if len(content) < PropertiesSnapshotCodec.__HEADER.size + PropertiesSnapshotCodec.__CHECKSUM.size:
+            raise ValueError("Snapshot is too short")
+
+        data: memoryview = memoryview(content)[: -PropertiesSnapshotCodec.__CHECKSUM.size]
+
+        (checksum,) = PropertiesSnapshotCodec.__CHECKSUM.unpack_from(content, len(data))
+
+        if zlib.crc32(data) != checksum:
+            raise ValueError("Snapshot checksum does not match")
+
+        magic, version, count = PropertiesSnapshotCodec.__HEADER.unpack_from(data, 0)
+
+        if magic != PropertiesSnapshotCodec.MAGIC or version != PropertiesSnapshotCodec.VERSION:
+            raise ValueError("Unsupported snapshot format")
+
+        offset: int = PropertiesSnapshotCodec.__HEADER.size
+        items: List[DevicePropertyItem or ChannelPropertyItem] = []
+
+        for _ in range(count):
+            property_id, device_id, channel_id, flags = PropertiesSnapshotCodec.__ITEM.unpack_from(data, offset)
+            offset += PropertiesSnapshotCodec.__ITEM.size
+
+            strings: List[str or None] = []
+
+            for _ in range(5):
+                value, offset = PropertiesSnapshotCodec.__decode_string(data, offset)
+                strings.append(value)
+
+            key, identifier, data_type, unit, property_format = strings
+
+            arguments: dict = {
+                "property_id": uuid.UUID(bytes=property_id),
+                "property_key": key,
+                "property_identifier": identifier,
+                "property_settable": bool(flags & PropertiesSnapshotCodec.__FLAG_SETTABLE),
+                "property_queryable": bool(flags & PropertiesSnapshotCodec.__FLAG_QUERYABLE),
+                "property_data_type": PropertiesRepository._get_data_type(data_type),
+                "property_unit": unit,
+                "property_format": property_format,
+                "device_id": uuid.UUID(bytes=device_id),
+            }
+
+            if flags & PropertiesSnapshotCodec.__FLAG_CHANNEL:
+                items.append(ChannelPropertyItem(**arguments, channel_id=uuid.UUID(bytes=channel_id)))
+
+            else:
+                items.append(DevicePropertyItem(**arguments))
+
+        if offset != len(data):
+            raise ValueError("Snapshot contains unexpected data")
+
+        return items
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __encode_string(value: str or None) -> bytes:
+        if value is None:
+            return PropertiesSnapshotCodec.__STRING_LENGTH.pack(PropertiesSnapshotCodec.__NONE_LENGTH)
+
+        encoded: bytes = value.encode("utf-8")
+
+        # Maximal length is reserved for None
+        if len(encoded) >= PropertiesSnapshotCodec.__NONE_LENGTH:
+            raise ValueError("String of {} bytes is too long for snapshot".format(len(encoded)))
+
+        return PropertiesSnapshotCodec.__STRING_LENGTH.pack(len(encoded)) + encoded
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __decode_string(data: memoryview, offset: int) -> Tuple[str or None, int]:
+        (length,) = PropertiesSnapshotCodec.__STRING_LENGTH.unpack_from(data, offset)
+        offset += PropertiesSnapshotCodec.__STRING_LENGTH.size
+
+        if length == PropertiesSnapshotCodec.__NONE_LENGTH:
+            return None, offset
+
+        return str(data[offset : offset + length], "utf-8"), offset + length
+
+
+#
+# Properties cache persisted to local file
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Database
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class PropertiesSnapshotStore(Thread):
+    """
+    Cache is restored from file on start, so values could flow before database is loaded
+
+    Thread reconciles restored cache with database and then writes every
+    published snapshot to file, changes are coalesced by write delay
+    """
+
+    __repository: PropertiesRepository
+    __file_path: str
+    __settings: PersistenceSettings
+
+    __reconcile: bool = False
+    __pending: PropertiesSnapshot or None = None
+
+    __stopped: bool = False
+    __wakeup: Event
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, repository: PropertiesRepository, file_path: str, settings: PersistenceSettings) -> None:
+        super().__init__(name="Properties snapshot: {}".format(os.path.basename(file_path)), daemon=True)
+
+        self.__repository = repository
+        self.__file_path = file_path
+        self.__settings = settings
+
+        self.__wakeup = Event()
+
+    # -----------------------------------------------------------------------------
+
+    def open(self) -> None:
+        items: List[DevicePropertyItem or ChannelPropertyItem] or None = self.load()
+
+        if items is not None:
+            self.__repository.restore(items)
+
+            # Database is loaded in thread, restored items are served meanwhile
+            self.__reconcile = True
+
+        else:
+            self.__repository.initialize()
+
+        self.__repository.add_publish_listener(self.__snapshot_published)
+
+        if items is None:
+            # Create file for next start
+            self.__pending = self.__repository.get_snapshot()
+
+        self.start()
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        self.__repository.remove_publish_listener(self.__snapshot_published)
+
+        self.__stopped = True
+        self.__wakeup.set()
+
+    # -----------------------------------------------------------------------------
+
+    def load(self) -> List[DevicePropertyItem or ChannelPropertyItem] or None:
+        if not os.path.isfile(self.__file_path):
+            return None
+
+        try:
+            started: float = time.monotonic()
+
+            with open(self.__file_path, "rb") as snapshot_file:
+                items: List[DevicePropertyItem or ChannelPropertyItem] = PropertiesSnapshotCodec.decode(
+                    snapshot_file.read()
+                )
+
+            log.info(
+                "Restored {} properties from snapshot: {} in {:.1f} ms".format(
+                    len(items), self.__file_path, (time.monotonic() - started) * 1000
+                )
+            )
+
+            return items
+
+        except (OSError, ValueError, struct.error) as e:
+            log.warning("Properties snapshot: {} could not be loaded: {}".format(self.__file_path, e))
+
+        return None
+
+    # -----------------------------------------------------------------------------
+
+    def run(self) -> None:
+        if self.__reconcile:
+            self.__reconcile_database()
+
+        while not self.__stopped:
+            self.__wakeup.wait()
+
+            # Collect changes published in short time and write them at once
+            if not self.__stopped:
+                time.sleep(self.__settings.write_delay)
+
+            self.__wakeup.clear()
+
+            self.__write()
+
+        # Last published snapshot has to be stored before gateway is stopped
+        self.__write()
+
+    # -----------------------------------------------------------------------------
+
+    def __reconcile_database(self) -> None:
+        while not self.__stopped:
+            try:
+                self.__repository.initialize()
+
+                log.info("Properties restored from snapshot: {} were reconciled with database".format(self.__file_path))
+
+                return
+
+            except Exception as e:
+                log.error("Properties could not be loaded from database, snapshot content is used")
+                log.exception(e)
+
+            self.__wakeup.wait(self.__settings.retry_interval)
+
+    # -----------------------------------------------------------------------------
+
+    def __snapshot_published(self, snapshot: PropertiesSnapshot) -> None:
+        self.__pending = snapshot
+        self.__wakeup.set()
+
+    # -----------------------------------------------------------------------------
+
+    def __write(self) -> None:
+        snapshot: PropertiesSnapshot or None = self.__pending
+
+        if snapshot is None:
+            return
+
+        self.__pending = None
+
+        temporary_path: str = "{}.tmp".format(self.__file_path)
+
+        try:
+            with open(temporary_path, "wb") as snapshot_file:
+                snapshot_file.write(PropertiesSnapshotCodec.encode(snapshot.items()))
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+
+            # Readers never see partially written file
+            os.replace(temporary_path, self.__file_path)
+
+        except (OSError, ValueError, struct.error) as e:
+            log.error("Properties snapshot: {} could not be written".format(self.__file_path))
+            log.exception(e)
+
+
+#
+# Properties caches persistence
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Database
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class CachePersistence:
+    __settings: PersistenceSettings
+    __stores: List[PropertiesSnapshotStore]
+
+    __SHUTDOWN_WAITING_DELAY: float = 3.0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, settings: PersistenceSettings) -> None:
+        self.__settings = settings
+        self.__stores = []
+
+    # -----------------------------------------------------------------------------
+
+    def open(self) -> None:
+        """Load properties caches, subscribed first so no change is missed while loading"""
+        device_property_cache.subscribe()
+        channel_property_cache.subscribe()
+
+        if not self.__settings.enabled:
+            device_property_cache.initialize()
+            channel_property_cache.initialize()
+
+            return
+
+        os.makedirs(self.__settings.directory, exist_ok=True)
+
+        for repository, file_name in (
+            (device_property_cache, "devices_properties.snapshot"),
+            (channel_property_cache, "channels_properties.snapshot"),
+        ):
+            store: PropertiesSnapshotStore = PropertiesSnapshotStore(
+                repository,
+                os.path.join(self.__settings.directory, file_name),
+                self.__settings,
+            )
+            store.open()
+
+            self.__stores.append(store)
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        for store in self.__stores:
+            store.close()
+
+        for store in self.__stores:
+            store.join(timeout=self.__SHUTDOWN_WAITING_DELAY)
+
+            if store.is_alive():
+                log.warning("Thread: {} was not terminated in time".format(store.name))
+
+        self.__stores = []
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# App dependencies
+from contextlib import contextmanager
+from threading import local
+from typing import Dict, Iterator, List, Tuple
+from pony.orm import core as orm
+
+# App libs
+from miniserver_gateway.db.events import DatabaseEntitiesChangedEvent, DatabaseEntityChangedEvent, EntityChangedType
+from miniserver_gateway.events.dispatcher import app_dispatcher
+
+# First action type, parents known from all changes and last change of entity
+RecordedChange = Tuple[EntityChangedType, Dict[str, str], DatabaseEntityChangedEvent]
+
+
+#
+# Entities changes collected in database session
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Database
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class EntitiesChangesCollector:
+    """
+    Entities changes made in session are emitted as one batch after session is committed
+
+    Every entity is reported only once with its latest data, changes of rolled back
+    session are discarded. Changes made outside of collector session are emitted
+    immediately as batch with single change. Session could be marked by its source,
+    so writer could recognize its own changes
+    """
+
+    __local: local
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self) -> None:
+        self.__local = local()
+
+    # -----------------------------------------------------------------------------
+
+    @contextmanager
+    def session(self, source: object or None = None) -> Iterator[None]:
+        """Database session emitting collected changes after successful commit"""
+        depth: int = getattr(self.__local, "depth", 0)
+
+        # Nested session is part of outer one, including its source
+        if depth > 0:
+            self.__local.depth = depth + 1
+
+            try:
+                yield
+
+            finally:
+                self.__local.depth = depth
+
+            return
+
+        self.__local.depth = 1
+        self.__local.changes = {}
+
+        try:
+            with orm.db_session:
+                yield
+
+        except Exception:
+            self.__local.changes = {}
+
+            raise
+
+        finally:
+            self.__local.depth = 0
+
+        changes: Dict[Tuple, RecordedChange] = self.__local.changes
+
+        self.__local.changes = {}
+
+        events: List[DatabaseEntityChangedEvent] = []
+
+        for first_action_type, parents, event in changes.values():
+            merged: DatabaseEntityChangedEvent or None = self.__merge(first_action_type, parents, event)
+
+            if merged is not None:
+                events.append(merged)
+
+        self.__emit(events, source)
+
+    # -----------------------------------------------------------------------------
+
+    def record(self, event: DatabaseEntityChangedEvent) -> None:
+        if getattr(self.__local, "depth", 0) == 0:
+            self.__emit([event])
+
+            return
+
+        entity_id: str or None = event.data.get("id")
+
+        # Entities without identifier could not be merged
+        key: Tuple = (event.entity_type, entity_id) if entity_id is not None else (event.entity_type, id(event))
+
+        first: RecordedChange or None = self.__local.changes.get(key)
+
+        # Entity keeps its position in batch and first action type, data are taken from last change
+        # and parents known from any of changes are kept
+        self.__local.changes[key] = (
+            first[0] if first is not None else event.action_type,
+            {**first[1], **event.parents} if first is not None else event.parents,
+            event,
+        )
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __merge(
+        first_action_type: EntityChangedType, parents: Dict[str, str], event: DatabaseEntityChangedEvent
+    ) -> DatabaseEntityChangedEvent or None:
+        if event.action_type == EntityChangedType.ENTITY_DELETED:
+            # Entity created and deleted in same session was never visible
+            return None if first_action_type == EntityChangedType.ENTITY_CREATED else event
+
+        if first_action_type == EntityChangedType.ENTITY_CREATED:
+            action_type: EntityChangedType = EntityChangedType.ENTITY_CREATED
+
+        else:
+            action_type: EntityChangedType = EntityChangedType.ENTITY_UPDATED
+
+        if action_type == event.action_type and parents == event.parents:
+            return event
+
+        return DatabaseEntityChangedEvent(event.origin, event.entity, action_type, event.data, parents=parents)
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __emit(events: List[DatabaseEntityChangedEvent], source: object or None = None) -> None:
+        if len(events) > 0:
+            app_dispatcher.dispatch(
+                DatabaseEntitiesChangedEvent.EVENT_NAME, DatabaseEntitiesChangedEvent(events, source)
+            )
+
+
+entities_changes = EntitiesChangesCollector()
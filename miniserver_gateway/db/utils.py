@@ -15,11 +15,21 @@
 #     limitations under the License.
 
 # App dependencies
-import math
+import logging
+import os
+import time
+from pony.orm import core as orm
+from threading import Lock
+from typing import Dict, List
+
+# App libs
+from miniserver_gateway.db.models import db
+
+log = logging.getLogger("database")
 
 
 #
-# Entity key generator
+# Entity key hash
 #
 # @package        FastyBird:MiniServer!
 # @subpackage     Database
@@ -27,51 +37,355 @@ import math
 # @author         Adam Kadlec <adam.kadlec@fastybird.com>
 #
 class EntityKeyHash:
+    """
+    Short textual representation of entity key number
+
+    Digits are written from the least significant one, only integer arithmetic is used,
+    so encoding is exact for any length of number
+    """
+
     ALPHABET: str = "bcdfghjklmnpqrstvwxyz0123456789BCDFGHJKLMNPQRSTVWXYZ"
 
     BASE: int = len(ALPHABET)
 
     MAX_LEN: int = 6
 
+    # Every key has at least MAX_LEN characters
+    __PAD: int = BASE ** (MAX_LEN - 1)
+
+    __DIGITS: Dict[str, int] = {character: index for index, character in enumerate(ALPHABET)}
+
     # -----------------------------------------------------------------------------
 
     @staticmethod
     def encode(n: int) -> str:
-        pad = EntityKeyHash.MAX_LEN - 1
-        n = int(n + pow(EntityKeyHash.BASE, pad))
+        return EntityKeyHash.encode_many([n])[0]
+
+    # -----------------------------------------------------------------------------
 
-        s = []
-        t = int(math.log(n, EntityKeyHash.BASE))
+    @staticmethod
+    def encode_many(numbers: List[int]) -> List[str]:
+        """Encode whole batch of numbers with shared lookups"""
+        alphabet: str = EntityKeyHash.ALPHABET
+        base: int = EntityKeyHash.BASE
+        pad: int = EntityKeyHash.__PAD
+
+        keys: List[str] = []
+
+        for n in numbers:
+            n = int(n) + pad
+
+            characters: List[str] = []
+
+            while True:
+                n, digit = divmod(n, base)
 
-        while True:
-            bcp = int(pow(EntityKeyHash.BASE, t))
-            a = int(n / bcp) % EntityKeyHash.BASE
-            s.append(EntityKeyHash.ALPHABET[a:a + 1])
-            n = n - (a * bcp)
-            t -= 1
+                characters.append(alphabet[digit])
 
-            if t < 0:
-                break
+                if n == 0:
+                    break
 
-        return "".join(reversed(s))
+            keys.append("".join(characters))
+
+        return keys
 
     # -----------------------------------------------------------------------------
 
     @staticmethod
     def decode(n: str) -> int:
-        n = "".join(reversed(n))
-        s = 0
-        l = len(n) - 1
-        t = 0
-
-        while True:
-            bcpow = int(pow(EntityKeyHash.BASE, l - t))
-            s = s + EntityKeyHash.ALPHABET.index(n[t:t + 1]) * bcpow
-            t += 1
-            if t > l:
-                break
-
-        pad = EntityKeyHash.MAX_LEN - 1
-        s = int(s - pow(EntityKeyHash.BASE, pad))
-
-        return int(s)
+        digits: Dict[str, int] = EntityKeyHash.__DIGITS
+
+        s: int = 0
+
+        for character in reversed(n):
+            s = s * EntityKeyHash.BASE + digits[character]
+
+        return s - EntityKeyHash.__PAD
+
+
+#
+# Entity key generator
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Database
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class EntityKeyGenerator:
+    """
+    Unique and monotonic entity keys
+
+    Key number is composed of milliseconds since epoch, sequence number in millisecond
+    and node number of process. When sequence is exhausted or clock goes back, keys are
+    taken from next milliseconds, so generator never waits and never repeats a key
+
+    Every process generating keys needs its own node number. Gateway process is node
+    zero, connectors processes are spawned with node assigned by gateway
+    """
+
+    __node: int
+
+    __last_timestamp: int = -1
+    __sequence: int = 0
+
+    __lock: Lock
+
+    # 2021-01-01 00:00:00 UTC
+    EPOCH: int = 1609459200000
+
+    SEQUENCE_BITS: int = 12
+    NODE_BITS: int = 10
+
+    MAX_NODE: int = (1 << NODE_BITS) - 1
+
+    __SEQUENCE_MASK: int = (1 << SEQUENCE_BITS) - 1
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, node: int = 0) -> None:
+        self.__lock = Lock()
+
+        self.set_node(node)
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def node(self) -> int:
+        return self.__node
+
+    # -----------------------------------------------------------------------------
+
+    def set_node(self, node: int) -> None:
+        if not 0 <= node <= self.MAX_NODE:
+            raise ValueError("Node number has to be between 0 and {}".format(self.MAX_NODE))
+
+        with self.__lock:
+            self.__node = node
+
+            # Keys of other node could not collide, sequence starts again
+            self.__last_timestamp = -1
+            self.__sequence = 0
+
+    # -----------------------------------------------------------------------------
+
+    def generate(self) -> str:
+        return EntityKeyHash.encode(self.generate_numbers(1)[0])
+
+    # -----------------------------------------------------------------------------
+
+    def generate_many(self, count: int) -> List[str]:
+        """Keys for bulk creation, whole range is reserved at once"""
+        return EntityKeyHash.encode_many(self.generate_numbers(count))
+
+    # -----------------------------------------------------------------------------
+
+    def generate_numbers(self, count: int) -> List[int]:
+        numbers: List[int] = []
+
+        with self.__lock:
+            node: int = self.__node
+
+            timestamp: int = time.time_ns() // 1000000 - self.EPOCH
+
+            if timestamp > self.__last_timestamp:
+                self.__last_timestamp = timestamp
+                self.__sequence = 0
+
+            else:
+                self.__sequence += 1
+
+            for _ in range(count):
+                if self.__sequence > self.__SEQUENCE_MASK:
+                    # Millisecond is exhausted, continue with next one
+                    self.__last_timestamp += 1
+                    self.__sequence = 0
+
+                numbers.append(
+                    (self.__last_timestamp << (self.SEQUENCE_BITS + self.NODE_BITS))
+                    | (self.__sequence << self.NODE_BITS)
+                    | node
+                )
+
+                self.__sequence += 1
+
+            # Sequence points to last used number
+            self.__sequence -= 1
+
+        return numbers
+
+
+entity_key_generator = EntityKeyGenerator()
+
+
+#
+# Database connection settings
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Database
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class DatabaseSettings:
+    """
+    Database provider configuration
+
+    MySQL server is used by default, embedded SQLite database is intended for
+    small gateways where running database server is too expensive
+    """
+
+    __provider: str
+    __host: str
+    __user: str
+    __passwd: str
+    __db: str
+    __filename: str
+    __create_tables: bool
+    __pragmas: Dict[str, str or int]
+
+    PROVIDER_MYSQL: str = "mysql"
+    PROVIDER_SQLITE: str = "sqlite"
+
+    # WAL journal lets connectors processes read while gateway is writing
+    __SQLITE_PRAGMAS: Dict[str, str or int] = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -8000,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+    }
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, config: dict or None, default_directory: str = ".") -> None:
+        config = config if config is not None else {}
+
+        self.__provider = str(config.get("provider", self.PROVIDER_MYSQL)).lower()
+
+        if self.__provider not in (self.PROVIDER_MYSQL, self.PROVIDER_SQLITE):
+            raise ValueError("Database provider: {} is not supported".format(self.__provider))
+
+        self.__host = str(config.get("host", "127.0.0.1"))
+        self.__user = str(config.get("user", "root"))
+        self.__passwd = str(config.get("passwd", ""))
+        self.__db = str(config.get("db", "miniserver_app"))
+
+        # Relative database file is placed next to configuration
+        self.__filename = os.path.join(default_directory, str(config.get("filename", "miniserver_app.sqlite")))
+
+        # MySQL schema is managed by devices module, SQLite database is created by gateway
+        self.__create_tables = bool(config.get("create_tables", self.__provider == self.PROVIDER_SQLITE))
+
+        self.__pragmas = dict(self.__SQLITE_PRAGMAS)
+        self.__pragmas.update(config.get("pragmas", {}) or {})
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def provider(self) -> str:
+        return self.__provider
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def host(self) -> str:
+        return self.__host
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def user(self) -> str:
+        return self.__user
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def passwd(self) -> str:
+        return self.__passwd
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def db(self) -> str:
+        return self.__db
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def filename(self) -> str:
+        return os.path.abspath(self.__filename) if self.__filename != ":memory:" else self.__filename
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def create_tables(self) -> bool:
+        return self.__create_tables
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def pragmas(self) -> Dict[str, str or int]:
+        return self.__pragmas
+
+    # -----------------------------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        """Resolved configuration, passed to connectors processes"""
+        return {
+            "provider": self.__provider,
+            "host": self.__host,
+            "user": self.__user,
+            "passwd": self.__passwd,
+            "db": self.__db,
+            "filename": self.filename,
+            "create_tables": self.__create_tables,
+            "pragmas": self.__pragmas,
+        }
+
+
+#
+# Database connection utils
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Database
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class DatabaseUtils:
+    @staticmethod
+    def bind(configuration: dict or None) -> None:
+        """Bind database accessor to configured database and map entities"""
+        settings: DatabaseSettings = DatabaseSettings(configuration)
+
+        if settings.provider == DatabaseSettings.PROVIDER_SQLITE:
+            # Every new connection has to be tuned, pragmas are not persisted in database file
+            @db.on_connect(provider=DatabaseSettings.PROVIDER_SQLITE)
+            def configure_sqlite_connection(database: orm.Database, connection) -> None:
+                DatabaseUtils.apply_pragmas(connection, settings.pragmas)
+
+            db.bind(provider=settings.provider, filename=settings.filename, create_db=settings.create_tables)
+
+        else:
+            db.bind(
+                provider=settings.provider,
+                host=settings.host,
+                user=settings.user,
+                passwd=settings.passwd,
+                db=settings.db,
+            )
+
+        db.generate_mapping(create_tables=settings.create_tables)
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def apply_pragmas(connection, pragmas: Dict[str, str or int]) -> None:
+        cursor = connection.cursor()
+
+        for name, value in pragmas.items():
+            cursor.execute("PRAGMA {} = {}".format(name, value))
+
+        # Journal mode could be refused, e.g. for in-memory database
+        cursor.execute("PRAGMA journal_mode")
+
+        log.debug("SQLite connection opened with journal mode: {}".format(cursor.fetchone()[0]))
@@ -15,6 +15,307 @@
 #     limitations under the License.
 
 # App dependencies
-from whistle import EventDispatcher
+import logging
+from queue import Full as QueueFull
+from threading import Lock, Thread, current_thread
+from typing import Callable, Dict, List, Set, Tuple
+from whistle import Event
 
-app_dispatcher = EventDispatcher()
+# App libs
+from miniserver_gateway.utils.metrics import StageMetrics, app_metrics
+from miniserver_gateway.utils.queue import PipelineQueue, PipelineQueueSettings, QueueUtils
+
+log = logging.getLogger("events")
+
+
+#
+# Event listener delivery worker
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Events
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class ListenerWorker(Thread):
+    """
+    Worker delivering events to all listeners of one object
+
+    Events of all listeners of same object are queued in one queue, so e.g. subscribe and
+    unsubscribe of one client are always delivered in order they were dispatched
+    """
+
+    __stopped: bool = False
+
+    __name: str
+    __listeners: Set[Tuple[str, Callable[[Event], None]]]
+
+    __queue: PipelineQueue
+
+    __metrics: StageMetrics
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, name: str, settings: PipelineQueueSettings) -> None:
+        super().__init__()
+
+        self.__name = name
+        self.__listeners = set()
+
+        # Workers of same listener class are reported as one stage
+        self.__metrics = app_metrics.stage("listener:{}".format(name))
+
+        # Queue for events waiting for delivery to listeners
+        self.__queue = PipelineQueue(settings, metrics=self.__metrics)
+
+        # Threading config...
+        self.setDaemon(True)
+        self.setName("Events listener thread: {}".format(name))
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def dropped(self) -> int:
+        return self.__queue.dropped
+
+    # -----------------------------------------------------------------------------
+
+    def has_listeners(self) -> bool:
+        return len(self.__listeners) > 0
+
+    # -----------------------------------------------------------------------------
+
+    def add_listener(self, event_id: str, listener: Callable[[Event], None]) -> None:
+        self.__listeners = self.__listeners | {(event_id, listener)}
+
+    # -----------------------------------------------------------------------------
+
+    def remove_listener(self, event_id: str, listener: Callable[[Event], None]) -> None:
+        """Queued events of removed listener are dropped"""
+        self.__listeners = self.__listeners - {(event_id, listener)}
+
+    # -----------------------------------------------------------------------------
+
+    def run(self) -> None:
+        self.__stopped = False
+
+        # All events of registered listeners have to be delivered before thread is closed
+        while True:
+            for event_id, listener, event in QueueUtils.consume(self.__queue):
+                self.deliver(event_id, listener, event)
+
+            if self.__stopped and self.__queue.empty():
+                break
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        self.__stopped = True
+
+        # Wake up thread to deliver queued events
+        QueueUtils.wake_up(self.__queue)
+
+    # -----------------------------------------------------------------------------
+
+    def enqueue(self, event_id: str, listener: Callable[[Event], None], event: Event) -> None:
+        try:
+            self.__queue.enqueue((event_id, listener, event))
+
+        except QueueFull:
+            log.error("Listener queue for event: {} is full. Event could not be delivered".format(event_id))
+
+    # -----------------------------------------------------------------------------
+
+    def deliver(self, event_id: str, listener: Callable[[Event], None], event: Event) -> None:
+        # Listener was removed after event was queued or previous listener stopped event propagation
+        if (event_id, listener) not in self.__listeners or event.propagation_stopped:
+            return
+
+        try:
+            with self.__metrics.measure():
+                listener(event)
+
+        except Exception as e:
+            log.error("Error on delivering event: {}".format(event_id))
+            log.exception(e)
+
+
+#
+# Asynchronous event dispatcher
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Events
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class AsyncEventDispatcher:
+    """
+    Event dispatcher delivering events to listeners in their own threads
+
+    Listeners of each object share one bounded queue, so slow listener is not blocking
+    producer nor other objects and events order is kept across all listeners of object
+
+    Listeners are called in ascending priority order as in whistle. Stopped propagation
+    skips listeners which did not receive event yet, listeners of other objects could
+    receive it already in their own threads
+    """
+
+    __listeners: Dict[str, List[Tuple[int, Callable[[Event], None], ListenerWorker]]]
+    __workers: Dict[int, ListenerWorker]
+
+    __settings: PipelineQueueSettings
+    __synchronous: bool = False
+
+    __lock: Lock
+
+    __SHUTDOWN_WAITING_DELAY: float = 3.0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, synchronous: bool = False) -> None:
+        self.__listeners = {}
+        self.__workers = {}
+
+        self.__settings = PipelineQueueSettings({})
+        self.__synchronous = synchronous
+
+        self.__lock = Lock()
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def synchronous(self) -> bool:
+        return self.__synchronous
+
+    # -----------------------------------------------------------------------------
+
+    def set_synchronous(self, synchronous: bool) -> None:
+        """Deliver events in producer thread, intended for testing"""
+        self.__synchronous = synchronous
+
+    # -----------------------------------------------------------------------------
+
+    def configure(self, settings: PipelineQueueSettings) -> None:
+        """Set queue settings for listeners registered afterwards"""
+        self.__settings = settings
+
+    # -----------------------------------------------------------------------------
+
+    def add_listener(self, event_id: str, listener: Callable[[Event], None], priority: int = 0) -> None:
+        owner: object = self.__get_owner(listener)
+
+        started: ListenerWorker or None = None
+
+        with self.__lock:
+            worker: ListenerWorker or None = self.__workers.get(id(owner))
+
+            if worker is None:
+                worker = ListenerWorker(
+                    owner.__class__.__name__ if owner is not listener else listener.__qualname__,
+                    self.__settings,
+                )
+
+                self.__workers[id(owner)] = worker
+
+                started = worker
+
+            worker.add_listener(event_id, listener)
+
+            listeners: List[Tuple[int, Callable[[Event], None], ListenerWorker]] = list(
+                self.__listeners.get(event_id, [])
+            )
+            listeners.append((priority, listener, worker))
+            # Sorting is stable, so listeners with same priority keep order they were added in
+            listeners.sort(key=lambda record: record[0])
+
+            # Listeners list is replaced, so dispatching could iterate it without lock
+            self.__listeners[event_id] = listeners
+
+        if started is not None:
+            started.start()
+
+    # -----------------------------------------------------------------------------
+
+    def remove_listener(self, event_id: str, listener: Callable[[Event], None]) -> None:
+        owner: object = self.__get_owner(listener)
+
+        removed: ListenerWorker or None = None
+
+        with self.__lock:
+            self.__listeners[event_id] = [
+                record for record in self.__listeners.get(event_id, []) if record[1] != listener
+            ]
+
+            worker: ListenerWorker or None = self.__workers.get(id(owner))
+
+            if worker is None:
+                return
+
+            worker.remove_listener(event_id, listener)
+
+            # Worker is stopped together with last listener of its object
+            if not worker.has_listeners():
+                removed = self.__workers.pop(id(owner))
+
+        if removed is not None:
+            removed.close()
+
+    # -----------------------------------------------------------------------------
+
+    def has_listeners(self, event_id: str or None = None) -> bool:
+        if event_id is None:
+            return any(len(listeners) > 0 for listeners in self.__listeners.values())
+
+        return len(self.__listeners.get(event_id, [])) > 0
+
+    # -----------------------------------------------------------------------------
+
+    def get_listeners(self, event_id: str) -> List[Callable[[Event], None]]:
+        return [listener for priority, listener, worker in self.__listeners.get(event_id, [])]
+
+    # -----------------------------------------------------------------------------
+
+    def dispatch(self, event_id: str, event: Event or None = None) -> Event:
+        if event is None:
+            event = Event()
+
+        event.dispatcher = self
+        event.name = event_id
+
+        for priority, listener, worker in self.__listeners.get(event_id, []):
+            if event.propagation_stopped:
+                break
+
+            if self.__synchronous:
+                worker.deliver(event_id, listener, event)
+
+            else:
+                worker.enqueue(event_id, listener, event)
+
+        return event
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        """Deliver all queued events and stop listeners threads"""
+        with self.__lock:
+            workers: List[ListenerWorker] = list(self.__workers.values())
+
+            self.__listeners = {}
+            self.__workers = {}
+
+        for worker in workers:
+            worker.close()
+
+        for worker in workers:
+            if worker is not current_thread():
+                worker.join(timeout=self.__SHUTDOWN_WAITING_DELAY)
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __get_owner(listener: Callable[[Event], None]) -> object:
+        # Bound methods of one object share worker, plain functions have own worker
+        return getattr(listener, "__self__", listener)
+
+
+app_dispatcher = AsyncEventDispatcher()
@@ -15,11 +15,13 @@
 #     limitations under the License.
 
 # App dependencies
+import asyncio
 import json
 import logging
 import time
 from abc import ABC, abstractmethod
-from queue import Queue, Full as QueueFull
+import uuid
+from queue import Full as QueueFull
 from threading import Thread
 from typing import Dict, List, Set
 
@@ -30,18 +32,21 @@ from miniserver_gateway.db.cache import (
     DevicePropertyItem,
     ChannelPropertyItem,
 )
-from miniserver_gateway.db.events import DatabaseEntityChangedEvent
+from miniserver_gateway.db.events import DatabaseEntitiesChangedEvent
 from miniserver_gateway.events.dispatcher import app_dispatcher
 from miniserver_gateway.exchanges.events import ExchangePropertyExpectedValueEvent
 from miniserver_gateway.exchanges.queue import (
     PublishPropertyValueQueueItem,
     PublishEntityQueueItem,
+    PublishEntitiesQueueItem,
 )
 from miniserver_gateway.exchanges.utils import ExchangeRoutingUtils
 from miniserver_gateway.exchanges.types import RoutingKeys
 from miniserver_gateway.storages.events import StoragePropertyStoredEvent
 from miniserver_gateway.utils.libraries import LibrariesUtils
-from miniserver_gateway.types.types import ModulesOrigins
+from miniserver_gateway.utils.metrics import StageMetrics, app_metrics
+from miniserver_gateway.utils.queue import PipelineQueue, PipelineQueueSettings, QueueUtils
+from miniserver_gateway.types.types import ModulesOrigins, QueueOverflowPolicy
 
 log = logging.getLogger("exchanges")
 
@@ -82,23 +87,43 @@ class Exchanges(Thread):
     __settings: ExchangeSettings
 
     __exchanges: Set["ExchangeInterface"] = set()
+    __batch_exchanges: Set["ExchangeInterface"] = set()
 
-    __queue: Queue
+    __queue: PipelineQueue
+
+    __event_loop: asyncio.AbstractEventLoop or None = None
+
+    __metrics: StageMetrics
+    __publish_metrics: StageMetrics
 
     __SHUTDOWN_WAITING_DELAY: int = 3.0
 
     # -----------------------------------------------------------------------------
 
-    def __init__(self, config: List[Dict[str, str]]) -> None:
+    def __init__(
+        self,
+        config: List[Dict[str, str]],
+        queue_config: dict or None = None,
+        event_loop: asyncio.AbstractEventLoop or None = None,
+    ) -> None:
         super().__init__()
 
         self.__settings = ExchangeSettings(config)
+        self.__event_loop = event_loop
 
         app_dispatcher.add_listener(StoragePropertyStoredEvent.EVENT_NAME, self.__publish_stored_value)
-        app_dispatcher.add_listener(DatabaseEntityChangedEvent.EVENT_NAME, self.__publish_entity)
+        app_dispatcher.add_listener(DatabaseEntitiesChangedEvent.EVENT_NAME, self.__publish_entities)
+
+        self.__metrics = app_metrics.stage("exchanges")
+        self.__publish_metrics = app_metrics.stage("exchanges.publish")
 
         # Queue for consuming incoming data from connectors
-        self.__queue = Queue(maxsize=1000)
+        self.__queue = PipelineQueue(
+            PipelineQueueSettings(queue_config, QueueOverflowPolicy(QueueOverflowPolicy.POLICY_COALESCE)),
+            key=self.__get_record_key,
+            mergeable=(PublishPropertyValueQueueItem,),
+            metrics=self.__metrics,
+        )
 
         # Process storages services
         self.__load()
@@ -106,8 +131,10 @@ class Exchanges(Thread):
         # Threading config...
         self.setDaemon(True)
         self.setName("Exchange thread")
-        # ...and starting
-        self.start()
+
+        # ...and starting, in asyncio runtime queue is consumed by event loop
+        if event_loop is None:
+            self.start()
 
     # -----------------------------------------------------------------------------
 
@@ -115,28 +142,54 @@ class Exchanges(Thread):
         self.__stopped = False
 
         while True:
-            if not self.__queue.empty():
-                record = self.__queue.get()
-
-                if isinstance(record, PublishPropertyValueQueueItem):
-                    self.__process_property_value_record(record)
-
-                elif isinstance(record, PublishEntityQueueItem):
-                    self.__process_entity_record(record)
+            # Wait for incoming records and process all of them
+            for record in QueueUtils.consume(self.__queue):
+                self.process_record(record)
 
             # All records have to be processed before thread is closed
             if self.__stopped and self.__queue.empty():
                 break
 
-            time.sleep(0.001)
+    # -----------------------------------------------------------------------------
+
+    @property
+    def queue(self) -> PipelineQueue:
+        return self.__queue
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def event_loop(self) -> asyncio.AbstractEventLoop or None:
+        """Event loop of asyncio runtime or None for threaded runtime"""
+        return self.__event_loop
+
+    # -----------------------------------------------------------------------------
+
+    def process_record(self, record: object) -> None:
+        with self.__metrics.measure():
+            if isinstance(record, PublishPropertyValueQueueItem):
+                self.__process_property_value_record(record)
+
+            elif isinstance(record, PublishEntitiesQueueItem):
+                self.__process_entities_record(record)
 
     # -----------------------------------------------------------------------------
 
     def close(self) -> None:
         """Stop exchanges main thread"""
 
+        app_dispatcher.remove_listener(StoragePropertyStoredEvent.EVENT_NAME, self.__publish_stored_value)
+        app_dispatcher.remove_listener(DatabaseEntitiesChangedEvent.EVENT_NAME, self.__publish_entities)
+
         self.__stopped = True
 
+        # Wake up main thread to finish queued records
+        QueueUtils.wake_up(self.__queue)
+
+        log.info(
+            "Exchange queue merged {} and dropped {} records".format(self.__queue.merged, self.__queue.dropped)
+        )
+
         for exchange in self.__exchanges:
             try:
                 # Send terminate cmd to all sub-exchanges
@@ -197,7 +250,7 @@ class Exchanges(Thread):
 
         try:
             if isinstance(event.record, DevicePropertyItem) or isinstance(event.record, ChannelPropertyItem):
-                self.__queue.put(
+                self.__queue.enqueue(
                     PublishPropertyValueQueueItem(
                         event.origin,
                         event.record,
@@ -215,20 +268,37 @@ class Exchanges(Thread):
 
     # -----------------------------------------------------------------------------
 
-    def __publish_entity(self, event: DatabaseEntityChangedEvent) -> None:
-        """Process database entity changed event"""
+    def __publish_entities(self, event: DatabaseEntitiesChangedEvent) -> None:
+        """Process database entities changed event, whole committed batch is one queue record"""
 
-        try:
-            routing_key = ExchangeRoutingUtils.get_entity_routing_key(type(event.entity), event.action_type)
+        entities: List[PublishEntityQueueItem] = []
+
+        for change in event.events:
+            routing_key = ExchangeRoutingUtils.get_entity_routing_key(change.entity_type, change.action_type)
 
             if routing_key is not None:
-                self.__queue.put(PublishEntityQueueItem(event.origin, routing_key, event.entity.to_array()))
+                entities.append(PublishEntityQueueItem(change.origin, routing_key, change.data))
+
+        if len(entities) == 0:
+            return
+
+        try:
+            self.__queue.enqueue(PublishEntitiesQueueItem(entities))
 
         except QueueFull:
             log.error("Exchange processing queue is full. New messages could not be added")
 
     # -----------------------------------------------------------------------------
 
+    @staticmethod
+    def __get_record_key(record: object) -> uuid.UUID or None:
+        if isinstance(record, PublishPropertyValueQueueItem):
+            return record.item.property_id
+
+        return None
+
+    # -----------------------------------------------------------------------------
+
     @staticmethod
     def __process_message(routing_key: str, origin: str, data: dict or str or None) -> bool:
         # Check if received message was not sent by gateway
@@ -294,27 +364,41 @@ class Exchanges(Thread):
             # Unknown record item
             return
 
-        content: dict = record.item.to_array()
-        content["value"] = record.value
-        content["expected"] = record.expected_value
-        content["pending"] = record.is_pending
+        content: dict = {
+            **record.item.to_array(),
+            "value": record.value,
+            "expected": record.expected_value,
+            "pending": record.is_pending,
+        }
 
         for exchange in self.__exchanges:
-            exchange.publish(record.origin, routing_key, content)
+            with self.__publish_metrics.measure():
+                exchange.publish(record.origin, routing_key, content)
 
     # -----------------------------------------------------------------------------
 
-    def __process_entity_record(self, record: PublishEntityQueueItem) -> None:
-        """Consume queue record with entity updates info"""
+    def __process_entities_record(self, record: PublishEntitiesQueueItem) -> None:
+        """Consume queue record with entities committed in one transaction"""
 
         for exchange in self.__exchanges:
-            exchange.publish(record.origin, record.routing_key.value, record.content)
+            if exchange not in self.__batch_exchanges:
+                for entity in record.entities:
+                    with self.__publish_metrics.measure():
+                        exchange.publish(entity.origin, entity.routing_key.value, entity.content)
+
+                continue
+
+            # Exchange consumers are able to process batch, one message per origin is published
+            for origin, content in record.get_batches().items():
+                with self.__publish_metrics.measure():
+                    exchange.publish(origin, RoutingKeys(RoutingKeys.ENTITIES_BATCH_ROUTING_KEY).value, content)
 
     # -----------------------------------------------------------------------------
 
     def __load(self) -> None:
         # Reset exchanges configuration
         self.__exchanges = set()
+        self.__batch_exchanges = set()
 
         # Process all configured exchanges
         for exchange_settings in self.__settings.all():
@@ -336,6 +420,9 @@ class Exchanges(Thread):
 
                     self.__exchanges.add(exchange_module)
 
+                    if bool(exchange_settings.get("entities_batch", False)):
+                        self.__batch_exchanges.add(exchange_module)
+
             except Exception as e:
                 log.error("Error on loading exchanges:")
                 log.exception(e)
@@ -16,6 +16,7 @@
 
 # App dependencies
 from abc import ABC
+from typing import Dict, List
 
 # App libs
 from miniserver_gateway.db.cache import DevicePropertyItem, ChannelPropertyItem
@@ -121,3 +122,40 @@ class PublishEntityQueueItem:
     @property
     def content(self) -> dict:
         return self.__content
+
+
+#
+# Entities changed in one transaction queue item
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Exchange
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class PublishEntitiesQueueItem:
+    __entities: List[PublishEntityQueueItem]
+
+    def __init__(self, entities: List[PublishEntityQueueItem]) -> None:
+        self.__entities = entities
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def entities(self) -> List[PublishEntityQueueItem]:
+        return self.__entities
+
+    # -----------------------------------------------------------------------------
+
+    def get_batches(self) -> Dict[ModulesOrigins, dict]:
+        """Batch message content for each origin of changed entities"""
+        batches: Dict[ModulesOrigins, dict] = {}
+
+        for entity in self.__entities:
+            batches.setdefault(entity.origin, {"entities": []})["entities"].append(
+                {
+                    "routing_key": entity.routing_key.value,
+                    "data": entity.content,
+                }
+            )
+
+        return batches
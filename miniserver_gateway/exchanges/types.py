@@ -69,3 +69,6 @@ class RoutingKeys(Enum):
     CHANNELS_CONFIGURATION_DELETED_ENTITY_ROUTING_KEY: str = "fb.bus.entity.deleted.channel.configuration"
 
     CHANNELS_CONFIGURATION_DATA_ROUTING_KEY: str = "fb.bus.data.channel.configuration"
+
+    # Entities changed in one transaction
+    ENTITIES_BATCH_ROUTING_KEY: str = "fb.bus.entity.batch"
@@ -29,7 +29,7 @@ from miniserver_gateway.exchanges.websockets.events import (
 )
 from miniserver_gateway.exchanges.websockets.client import WampClientInterface
 from miniserver_gateway.exchanges.websockets.types import WampCodes
-from miniserver_gateway.exchanges.websockets.server import WebsocketsServer
+from miniserver_gateway.exchanges.websockets.server import AsyncWebsocketsServer, WebsocketsServer
 from miniserver_gateway.types.types import ModulesOrigins
 
 
@@ -46,7 +46,7 @@ class WampExchange(ExchangeInterface):
 
     __container: Exchanges
 
-    __ws_server: WebsocketsServer
+    __ws_server: WebsocketsServer or AsyncWebsocketsServer
 
     __SHUTDOWN_WAITING_DELAY: int = 3.0
 
@@ -61,12 +61,20 @@ class WampExchange(ExchangeInterface):
         app_dispatcher.add_listener(UnsubscribeEvent.EVENT_NAME, self.__unsubscribe)
         app_dispatcher.add_listener(ReceiveProcedureRequestEvent.EVENT_NAME, self.__receive)
 
-        # WS server for UI clients
-        self.__ws_server = WebsocketsServer()
+        # WS server for UI clients, in asyncio runtime sockets are watched by event loop
+        if self.__container.event_loop is not None:
+            self.__ws_server = AsyncWebsocketsServer(self.__container.event_loop)
+
+        else:
+            self.__ws_server = WebsocketsServer()
 
     # -----------------------------------------------------------------------------
 
     def close(self) -> None:
+        app_dispatcher.remove_listener(SubscribeEvent.EVENT_NAME, self.__subscribe)
+        app_dispatcher.remove_listener(UnsubscribeEvent.EVENT_NAME, self.__unsubscribe)
+        app_dispatcher.remove_listener(ReceiveProcedureRequestEvent.EVENT_NAME, self.__receive)
+
         # Terminate web sockets server
         self.__ws_server.close()
 
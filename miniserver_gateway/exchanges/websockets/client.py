@@ -29,7 +29,7 @@ from codecs import IncrementalDecoder
 from collections import deque
 from io import BytesIO
 from http.client import parse_headers, HTTPMessage
-from typing import Dict, List, Union, Tuple
+from typing import Callable, Dict, List, Union, Tuple
 
 # App libs
 from miniserver_gateway.events.dispatcher import app_dispatcher
@@ -64,6 +64,7 @@ class WampClient(WampClientInterface):
     __is_closed: bool = False
 
     __send_queue: deque = deque()
+    __send_listener: Callable[[], None] or None = None
 
     __state: int
 
@@ -129,6 +130,7 @@ class WampClient(WampClientInterface):
         self.__state: int = self.__HEADER_B1
 
         self.__request_header_buffer = bytearray()
+        self.__send_queue = deque()
 
         self.__wamp_session = (
             str(random.randint(0, sys.maxsize))
@@ -290,6 +292,7 @@ class WampClient(WampClientInterface):
                     hs = self.__HANDSHAKE_STR % {"acceptstr": k_s}
 
                     self.__send_queue.append((OPCodes(OPCodes.BINARY).value, hs.encode("ascii")))
+                    self.__notify_send_listener()
 
                     self.__handshake_finished = True
 
@@ -399,6 +402,12 @@ class WampClient(WampClientInterface):
 
     # -----------------------------------------------------------------------------
 
+    def set_send_listener(self, listener: Callable[[], None] or None) -> None:
+        """Register callback invoked whenever new frame is added to send queue"""
+        self.__send_listener = listener
+
+    # -----------------------------------------------------------------------------
+
     def __send_message(self, fin: bool, opcode: OPCodes, data: bytearray or str) -> None:
         payload = bytearray()
 
@@ -435,6 +444,14 @@ class WampClient(WampClientInterface):
 
         self.__send_queue.append((opcode.value, payload))
 
+        self.__notify_send_listener()
+
+    # -----------------------------------------------------------------------------
+
+    def __notify_send_listener(self) -> None:
+        if self.__send_listener is not None:
+            self.__send_listener()
+
     # -----------------------------------------------------------------------------
 
     def __parse_message(self, byte) -> None:
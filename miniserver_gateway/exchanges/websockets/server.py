@@ -15,6 +15,7 @@
 #     limitations under the License.
 
 # App dependencies
+import asyncio
 import socket
 import ssl
 from select import select
@@ -218,3 +219,195 @@ class WebsocketsServer(Thread):
 
             except Exception:
                 pass
+
+
+class AsyncWebsocketsServer:
+    """
+    WS server driven by asyncio event loop readiness callbacks
+
+    Sockets are watched by event loop instead of own select() thread. Frames
+    could be queued from any thread, writer is registered thread-safely
+    """
+
+    __stopped: bool = False
+
+    __request_queue_size: int = 5
+
+    __using_ssl: bool = False
+
+    __event_loop: asyncio.AbstractEventLoop
+
+    __server_socket: socket.socket
+
+    __connections: Dict[int, WampClient]
+
+    __secured_context: ssl.SSLContext or None
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(
+        self,
+        event_loop: asyncio.AbstractEventLoop,
+        host: str = "",
+        port: int = 9000,
+        cert_file: str or None = None,
+        key_file: str or None = None,
+        ssl_version: int = ssl.PROTOCOL_TLSv1,
+    ) -> None:
+        if host == "":
+            host = None
+
+        fam = socket.AF_INET6 if host is None else 0
+
+        host_info = socket.getaddrinfo(host, port, fam, socket.SOCK_STREAM, socket.IPPROTO_TCP, socket.AI_PASSIVE)
+
+        self.__server_socket = socket.socket(host_info[0][0], host_info[0][1], host_info[0][2])
+        self.__server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__server_socket.setblocking(False)
+        self.__server_socket.bind(host_info[0][4])
+        self.__server_socket.listen(self.__request_queue_size)
+
+        self.__event_loop = event_loop
+        self.__connections = {}
+
+        self.__using_ssl = bool(cert_file and key_file)
+
+        if self.__using_ssl:
+            self.__secured_context = ssl.SSLContext(ssl_version)
+            self.__secured_context.load_cert_chain(cert_file, key_file)
+
+        self.__event_loop.call_soon_threadsafe(
+            self.__event_loop.add_reader, self.__server_socket.fileno(), self.__handle_accept
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def is_alive(self) -> bool:
+        return not self.__stopped
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        if self.__event_loop.is_closed():
+            self.__stopped = True
+
+            return
+
+        # Sockets have to be unregistered from event loop thread
+        self.__event_loop.call_soon_threadsafe(self.__close)
+
+    # -----------------------------------------------------------------------------
+
+    def __close(self) -> None:
+        self.__event_loop.remove_reader(self.__server_socket.fileno())
+        self.__server_socket.close()
+
+        for fileno, client in list(self.__connections.items()):
+            client.set_send_listener(None)
+            client.send_close()
+
+            # Try to deliver close frame before socket is closed
+            self.__handle_write(fileno)
+            self.__drop_client(fileno)
+
+        self.__stopped = True
+
+    # -----------------------------------------------------------------------------
+
+    def __handle_accept(self) -> None:
+        sock = None
+
+        try:
+            sock, address = self.__server_socket.accept()
+
+            client_socket = self.__decorate_socket(sock)
+            client_socket.setblocking(False)
+
+            fileno = client_socket.fileno()
+
+            client = WampClient(client_socket, address)
+            client.set_send_listener(lambda: self.__event_loop.call_soon_threadsafe(self.__watch_writer, fileno))
+
+            self.__connections[fileno] = client
+
+            self.__event_loop.add_reader(fileno, self.__handle_read, fileno)
+
+        except Exception:
+            if sock is not None:
+                sock.close()
+
+    # -----------------------------------------------------------------------------
+
+    def __handle_read(self, fileno: int) -> None:
+        if fileno not in self.__connections:
+            return
+
+        try:
+            self.__connections[fileno].receive_data()
+
+        except Exception:
+            self.__drop_client(fileno)
+
+    # -----------------------------------------------------------------------------
+
+    def __watch_writer(self, fileno: int) -> None:
+        if fileno in self.__connections and self.__connections[fileno].get_send_queue():
+            self.__event_loop.add_writer(fileno, self.__handle_write, fileno)
+
+    # -----------------------------------------------------------------------------
+
+    def __handle_write(self, fileno: int) -> None:
+        if fileno not in self.__connections:
+            return
+
+        client = self.__connections[fileno]
+
+        try:
+            while client.get_send_queue():
+                opcode, payload = client.get_send_queue().popleft()
+                remaining = client.send_buffer(payload)
+
+                if remaining is not None:
+                    client.get_send_queue().appendleft((opcode, remaining))
+
+                    # Socket buffer is full, wait for next writable notification
+                    return
+
+                if opcode == OPCodes(OPCodes.CLOSE).value:
+                    raise Exception("Received client close")
+
+        except Exception:
+            self.__drop_client(fileno)
+
+            return
+
+        self.__event_loop.remove_writer(fileno)
+
+    # -----------------------------------------------------------------------------
+
+    def __drop_client(self, fileno: int) -> None:
+        client = self.__connections.pop(fileno, None)
+
+        if client is None:
+            return
+
+        self.__event_loop.remove_reader(fileno)
+        self.__event_loop.remove_writer(fileno)
+
+        client.sock.close()
+
+        # only call handle_close when we have a successful websocket connection
+        if client.handshake_finished():
+            try:
+                client.handle_close()
+
+            except Exception:
+                pass
+
+    # -----------------------------------------------------------------------------
+
+    def __decorate_socket(self, sock: socket.socket) -> socket.socket:
+        if self.__using_ssl:
+            return self.__secured_context.wrap_socket(sock, server_side=True)
+
+        return sock
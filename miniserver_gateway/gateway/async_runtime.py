@@ -0,0 +1,370 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# App dependencies
+import asyncio
+import logging
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+# App libs
+from miniserver_gateway.connectors.connectors import Connectors
+from miniserver_gateway.exchanges.exchanges import Exchanges
+from miniserver_gateway.db.persistence import CachePersistence, PersistenceSettings
+from miniserver_gateway.events.dispatcher import app_dispatcher
+from miniserver_gateway.storages.storages import Storages
+from miniserver_gateway.triggers.triggers import Trigger
+from miniserver_gateway.utils.queue import PipelineQueue, QueueUtils
+
+log = logging.getLogger("service")
+
+
+#
+# Service queue consumer running in event loop
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Gateway
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class AsyncQueueWorker:
+    """
+    Coroutine replacement of service main thread
+
+    Queue producers wake up the worker through event loop, records batch is
+    processed in executor when processing is blocking (database, redis)
+
+    Records are passed to processor one by one or as whole batch when
+    processor is able to handle them together
+    """
+
+    __stopped: bool = False
+
+    __name: str
+    __queue: PipelineQueue
+    __processor: Callable[[object], None]
+    __batch_processor: Callable[[List[object]], None] or None
+    __executor: ThreadPoolExecutor or None
+
+    __wakeup: asyncio.Event or None = None
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(
+        self,
+        name: str,
+        queue: PipelineQueue,
+        processor: Callable[[object], None],
+        executor: ThreadPoolExecutor or None = None,
+        batch_processor: Callable[[List[object]], None] or None = None,
+    ) -> None:
+        self.__name = name
+        self.__queue = queue
+        self.__processor = processor
+        self.__batch_processor = batch_processor
+        self.__executor = executor
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    # -----------------------------------------------------------------------------
+
+    async def run(self) -> None:
+        self.__stopped = False
+
+        event_loop = asyncio.get_running_loop()
+
+        self.__wakeup = asyncio.Event()
+        self.__queue.set_waker(lambda: event_loop.call_soon_threadsafe(self.__wakeup.set))
+
+        try:
+            while True:
+                self.__wakeup.clear()
+
+                records: List[object] = QueueUtils.drain(self.__queue)
+
+                if len(records) > 0:
+                    if self.__executor is not None:
+                        await event_loop.run_in_executor(self.__executor, self.__process, records)
+
+                    else:
+                        self.__process(records)
+
+                    continue
+
+                # All records have to be processed before worker is closed
+                if self.__stopped:
+                    break
+
+                await self.__wakeup.wait()
+
+        finally:
+            self.__queue.set_waker(None)
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        self.__stopped = True
+
+        if self.__wakeup is not None:
+            self.__wakeup.set()
+
+    # -----------------------------------------------------------------------------
+
+    def __process(self, records: List[object]) -> None:
+        if self.__batch_processor is not None:
+            try:
+                self.__batch_processor(records)
+
+            except Exception as e:
+                log.error("Error on processing records in worker: {}".format(self.__name))
+                log.exception(e)
+
+            return
+
+        for record in records:
+            try:
+                self.__processor(record)
+
+            except Exception as e:
+                log.error("Error on processing record in worker: {}".format(self.__name))
+                log.exception(e)
+
+
+#
+# Gateway services running in single asyncio event loop
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Gateway
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class AsyncGatewayRuntime:
+    """
+    Alternative to threaded runtime, services queues are consumed by one event loop
+
+    Pony ORM and redis clients are blocking, so their records are processed in executor
+    """
+
+    __configuration: dict
+    __queues_configuration: dict
+
+    __cache_persistence: CachePersistence
+
+    __event_loop: asyncio.AbstractEventLoop
+    __executor: ThreadPoolExecutor
+    __stop_event: asyncio.Event
+
+    # Services are created when gateway is started, not created ones are skipped on stop
+    __connectors: Connectors or None = None
+    __storages: Storages or None = None
+    __exchanges: Exchanges or None = None
+    __triggers: Trigger or None = None
+
+    __workers: List[AsyncQueueWorker]
+    __tasks: List[asyncio.Task]
+
+    __EXECUTOR_WORKERS: int = 4
+    __SHUTDOWN_WAITING_DELAY: float = 3.0
+    __HEALTH_CHECK_INTERVAL: float = 5.0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, configuration: dict, cache_persistence: CachePersistence or None = None) -> None:
+        self.__configuration = configuration
+        self.__queues_configuration = configuration.get("queues", {}) or {}
+
+        self.__cache_persistence = (
+            cache_persistence
+            if cache_persistence is not None
+            else CachePersistence(PersistenceSettings(configuration.get("cache_snapshot")))
+        )
+
+        self.__workers = []
+        self.__tasks = []
+
+    # -----------------------------------------------------------------------------
+
+    async def run(self) -> None:
+        self.__event_loop = asyncio.get_running_loop()
+        self.__stop_event = asyncio.Event()
+
+        self.__executor = ThreadPoolExecutor(
+            max_workers=int(self.__configuration.get("executor_workers", self.__EXECUTOR_WORKERS)),
+            thread_name_prefix="Gateway executor",
+        )
+
+        self.__event_loop.add_signal_handler(signal.SIGTERM, self.__handle_signal, signal.SIGTERM)
+        self.__event_loop.add_signal_handler(signal.SIGINT, self.__handle_signal, signal.SIGINT)
+
+        health_check_interval: float = float(
+            self.__configuration.get("health_check_interval", self.__HEALTH_CHECK_INTERVAL)
+        )
+
+        try:
+            # Services are loading entities from database
+            await self.__event_loop.run_in_executor(self.__executor, self.__create_services)
+
+            for worker in self.__workers:
+                self.__tasks.append(self.__event_loop.create_task(worker.run()))
+
+            # Sleep until gateway is requested to stop and periodically check workers
+            while not self.__stop_event.is_set():
+                try:
+                    await asyncio.wait_for(self.__stop_event.wait(), timeout=health_check_interval)
+
+                except asyncio.TimeoutError:
+                    self.__check_workers()
+
+        finally:
+            await self.__stop_gateway()
+
+    # -----------------------------------------------------------------------------
+
+    def stop(self) -> None:
+        """Request gateway to stop"""
+        self.__stop_event.set()
+
+    # -----------------------------------------------------------------------------
+
+    def __handle_signal(self, signum: int) -> None:
+        log.info("Received signal: {}".format(signal.Signals(signum).name))
+
+        self.stop()
+
+    # -----------------------------------------------------------------------------
+
+    def __create_services(self) -> None:
+        self.__exchanges = Exchanges(
+            list(self.__configuration.get("exchanges", {})),
+            self.__queues_configuration.get("exchanges", {}) or {},
+            event_loop=self.__event_loop,
+        )
+
+        self.__storages = Storages(
+            list(self.__configuration.get("storages", {})),
+            self.__queues_configuration.get("storages", {}) or {},
+            threaded=False,
+        )
+
+        self.__connectors = Connectors(
+            list(self.__configuration.get("connectors", {})),
+            self.__queues_configuration.get("connectors", {}) or {},
+            self.__configuration.get("database"),
+        )
+
+        self.__triggers = Trigger(self.__queues_configuration.get("triggers", {}) or {}, threaded=False)
+
+        # Initialize repository cache
+        self.__cache_persistence.open()
+
+        # Connectors drivers keep their own threads, only container queue is consumed by loop
+        self.__connectors.open(threaded=False)
+
+        self.__workers = [
+            AsyncQueueWorker(
+                "connectors",
+                self.__connectors.queue,
+                self.__connectors.process_record,
+                self.__executor,
+                batch_processor=self.__connectors.process_records,
+            ),
+            AsyncQueueWorker(
+                "storages",
+                self.__storages.queue,
+                self.__storages.process_record,
+                self.__executor,
+                batch_processor=self.__storages.process_records,
+            ),
+            AsyncQueueWorker("exchanges", self.__exchanges.queue, self.__exchanges.process_record, self.__executor),
+            # Triggers are evaluated against in-memory cache only
+            AsyncQueueWorker("triggers", self.__triggers.queue, self.__triggers.process_record),
+        ]
+
+    # -----------------------------------------------------------------------------
+
+    def __check_workers(self) -> None:
+        for index, task in enumerate(self.__tasks):
+            if task.done():
+                worker: AsyncQueueWorker = self.__workers[index]
+
+                log.error("Worker: {} is not running. Restarting...".format(worker.name))
+
+                if not task.cancelled() and task.exception() is not None:
+                    log.exception(task.exception())
+
+                self.__tasks[index] = self.__event_loop.create_task(worker.run())
+
+    # -----------------------------------------------------------------------------
+
+    async def __stop_gateway(self) -> None:
+        log.info("Stopping...")
+
+        # Services are closed in same order as in threaded runtime
+        for name, service in (
+            ("connectors", self.__connectors),
+            ("exchanges", self.__exchanges),
+            ("storages", self.__storages),
+            ("triggers", self.__triggers),
+        ):
+            if service is None:
+                continue
+
+            try:
+                # Closing is blocking (waiting for sub-services), keep loop running meanwhile
+                await self.__event_loop.run_in_executor(self.__executor, service.close)
+
+            except Exception as e:
+                log.exception(e)
+
+            await self.__close_worker(name)
+
+            log.info("Service: {} was closed".format(name))
+
+        # ...store last version of properties caches
+        await self.__event_loop.run_in_executor(self.__executor, self.__cache_persistence.close)
+
+        # ...and deliver remaining events
+        await self.__event_loop.run_in_executor(self.__executor, app_dispatcher.close)
+
+        log.info("Events dispatcher was closed")
+
+        self.__executor.shutdown(wait=True)
+
+        log.info("============================")
+        log.info("The gateway has been stopped")
+
+    # -----------------------------------------------------------------------------
+
+    async def __close_worker(self, name: str) -> None:
+        for index, worker in enumerate(self.__workers):
+            if worker.name != name:
+                continue
+
+            worker.close()
+
+            try:
+                await asyncio.wait_for(self.__tasks[index], timeout=self.__SHUTDOWN_WAITING_DELAY)
+
+            except asyncio.TimeoutError:
+                log.warning("Worker: {} was not terminated in time".format(name))
+
+            except Exception as e:
+                log.exception(e)
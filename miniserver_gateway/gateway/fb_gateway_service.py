@@ -15,21 +15,27 @@
 #     limitations under the License.
 
 # App dependencies
+import asyncio
 import logging
 import logging.config
 import logging.handlers
-import time
+import signal
 from os import path
-from threading import Thread
+from threading import Event, Thread
+from types import FrameType
 from yaml import safe_load
 
 # App libs
 from miniserver_gateway.connectors.connectors import Connectors
 from miniserver_gateway.exchanges.exchanges import Exchanges
-from miniserver_gateway.db.models import db
-from miniserver_gateway.db.cache import device_property_cache, channel_property_cache
+from miniserver_gateway.gateway.async_runtime import AsyncGatewayRuntime
+from miniserver_gateway.db.utils import DatabaseSettings, DatabaseUtils
+from miniserver_gateway.db.persistence import CachePersistence, PersistenceSettings
+from miniserver_gateway.events.dispatcher import app_dispatcher
 from miniserver_gateway.storages.storages import Storages
 from miniserver_gateway.triggers.triggers import Trigger
+from miniserver_gateway.utils.metrics import MetricsServer, MetricsSettings, app_metrics
+from miniserver_gateway.utils.queue import PipelineQueueSettings
 
 log = logging.getLogger("service")
 
@@ -47,16 +53,27 @@ class FBGatewayService:
     __configuration_dir: str
     __stopped: bool = False
 
+    __stop_event: Event
+
+    __metrics_server: MetricsServer or None = None
+    __cache_persistence: CachePersistence
+
     __connectors: Connectors
     __storages: Storages
     __exchanges: Exchanges
     __triggers: Trigger
 
+    __RUNTIME_THREADED: str = "threaded"
+    __RUNTIME_ASYNCIO: str = "asyncio"
+
     __SHUTDOWN_WAITING_DELAY: int = 3.0
+    __HEALTH_CHECK_INTERVAL: float = 5.0
 
     # -----------------------------------------------------------------------------
 
     def __init__(self, config_file: str = None) -> None:
+        self.__stop_event = Event()
+
         if config_file is None:
             config_file = path.dirname(path.dirname(path.abspath(__file__))) + "/config/fb_gateway.yaml".replace(
                 "/", path.sep
@@ -77,44 +94,64 @@ class FBGatewayService:
 
         global log
 
-        # Configure database
-        db.bind(
-            provider="mysql",
-            host=self.__configuration.get("database").get("host", "127.0.0.1"),
-            user=self.__configuration.get("database").get("user", "root"),
-            passwd=self.__configuration.get("database").get("passwd", ""),
-            db=self.__configuration.get("database").get("db", "miniserver_app"),
-        )
-        db.generate_mapping(create_tables=False)
+        # Expose pipeline stages metrics
+        self.__metrics_server = self.__create_metrics_server()
+
+        # Configure events delivery queues
+        app_dispatcher.configure(PipelineQueueSettings(self.__get_queue_configuration("events")))
+
+        # Configure database, resolved configuration is shared with connectors processes
+        self.__configuration["database"] = DatabaseSettings(
+            self.__configuration.get("database"), self.__configuration_dir
+        ).to_dict()
+
+        DatabaseUtils.bind(self.__configuration.get("database"))
         # orm.set_sql_debug()
 
+        # Properties caches could be restored from local snapshot before database is loaded
+        self.__cache_persistence = CachePersistence(
+            PersistenceSettings(self.__configuration.get("cache_snapshot"), self.__configuration_dir)
+        )
+
+        # Services could be consumed by single event loop instead of threads
+        if self.__configuration.get("runtime", self.__RUNTIME_THREADED) == self.__RUNTIME_ASYNCIO:
+            log.info("Starting gateway with asyncio runtime")
+
+            asyncio.run(AsyncGatewayRuntime(self.__configuration, self.__cache_persistence).run())
+
+            self.__close_metrics_server()
+
+            return
+
         # Initialize data exchanges
-        exchanges_configuration: list = list(self.__configuration.get("exchanges", {}))
-        self.__exchanges = Exchanges(exchanges_configuration)
+        self.__exchanges = self.__create_exchanges()
 
         # Initialize data storages
-        storages_configuration: list = list(self.__configuration.get("storages", {}))
-        self.__storages = Storages(storages_configuration)
+        self.__storages = self.__create_storages()
 
         # Initialize connectors
-        connectors_configuration: list = list(self.__configuration.get("connectors", {}))
-        self.__connectors = Connectors(connectors_configuration)
+        self.__connectors = self.__create_connectors()
 
-        self.__triggers = Trigger()
+        self.__triggers = self.__create_triggers()
 
         # Initialize repository cache
-        device_property_cache.initialize()
-        channel_property_cache.initialize()
+        self.__cache_persistence.open()
 
         # Start all connectors
         self.__connectors.open()
 
+        signal.signal(signal.SIGTERM, self.__handle_signal)
+        signal.signal(signal.SIGINT, self.__handle_signal)
+
+        health_check_interval: float = float(
+            self.__configuration.get("health_check_interval", self.__HEALTH_CHECK_INTERVAL)
+        )
+
         try:
-            while not self.__stopped:
-                # Just to keep GW running
-                pass
+            # Sleep until gateway is requested to stop and periodically check services
+            while not self.__stop_event.wait(health_check_interval):
+                self.__check_services()
 
-        except KeyboardInterrupt:
             self.__stop_gateway()
 
         except Exception as e:
@@ -126,6 +163,116 @@ class FBGatewayService:
 
     # -----------------------------------------------------------------------------
 
+    def stop(self) -> None:
+        """Request gateway to stop"""
+        self.__stop_event.set()
+
+    # -----------------------------------------------------------------------------
+
+    def __handle_signal(self, signum: int, frame: FrameType or None) -> None:
+        log.info("Received signal: {}".format(signal.Signals(signum).name))
+
+        self.stop()
+
+    # -----------------------------------------------------------------------------
+
+    def __check_services(self) -> None:
+        if not self.__connectors.is_alive():
+            log.error("Connectors service thread is not running. Restarting...")
+
+            self.__connectors.close()
+            self.__wait_for_thread_to_close(self.__connectors)
+
+            self.__connectors = self.__create_connectors()
+            self.__connectors.open()
+
+        if not self.__storages.is_alive():
+            log.error("Data storage service thread is not running. Restarting...")
+
+            self.__storages.close()
+
+            self.__storages = self.__create_storages()
+
+        if not self.__exchanges.is_alive():
+            log.error("Data exchanges service thread is not running. Restarting...")
+
+            self.__exchanges.close()
+
+            self.__exchanges = self.__create_exchanges()
+
+        if not self.__triggers.is_alive():
+            log.error("Triggers watcher thread is not running. Restarting...")
+
+            self.__triggers.close()
+
+            self.__triggers = self.__create_triggers()
+
+    # -----------------------------------------------------------------------------
+
+    def __create_connectors(self) -> Connectors:
+        connectors_configuration: list = list(self.__configuration.get("connectors", {}))
+
+        return Connectors(
+            connectors_configuration,
+            self.__get_queue_configuration("connectors"),
+            self.__configuration.get("database"),
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def __create_storages(self) -> Storages:
+        storages_configuration: list = list(self.__configuration.get("storages", {}))
+
+        return Storages(storages_configuration, self.__get_queue_configuration("storages"))
+
+    # -----------------------------------------------------------------------------
+
+    def __create_exchanges(self) -> Exchanges:
+        exchanges_configuration: list = list(self.__configuration.get("exchanges", {}))
+
+        return Exchanges(exchanges_configuration, self.__get_queue_configuration("exchanges"))
+
+    # -----------------------------------------------------------------------------
+
+    def __create_triggers(self) -> Trigger:
+        return Trigger(self.__get_queue_configuration("triggers"))
+
+    # -----------------------------------------------------------------------------
+
+    def __create_metrics_server(self) -> MetricsServer or None:
+        settings: MetricsSettings = MetricsSettings(self.__configuration.get("metrics"))
+
+        app_metrics.set_enabled(settings.enabled)
+
+        if not settings.enabled:
+            return None
+
+        try:
+            return MetricsServer(settings)
+
+        except OSError as e:
+            log.error("Metrics server could not be started")
+            log.exception(e)
+
+        return None
+
+    # -----------------------------------------------------------------------------
+
+    def __close_metrics_server(self) -> None:
+        if self.__metrics_server is not None:
+            self.__metrics_server.close()
+
+            self.__metrics_server = None
+
+    # -----------------------------------------------------------------------------
+
+    def __get_queue_configuration(self, service: str) -> dict:
+        queues_configuration: dict = self.__configuration.get("queues", {}) or {}
+
+        return queues_configuration.get(service, {}) or {}
+
+    # -----------------------------------------------------------------------------
+
     def __stop_gateway(self) -> None:
         self.__stopped = True
 
@@ -157,17 +304,32 @@ class FBGatewayService:
 
         log.info("Data storage service was closed")
 
+        # ...triggers watcher
+        self.__triggers.close()
+
+        # ...and wait until thread is fully terminated
+        self.__wait_for_thread_to_close(self.__triggers)
+
+        log.info("Triggers watcher was closed")
+
+        # ...store last version of properties caches
+        self.__cache_persistence.close()
+
+        # ...and deliver remaining events
+        app_dispatcher.close()
+
+        log.info("Events dispatcher was closed")
+
+        self.__close_metrics_server()
+
         log.info("============================")
         log.info("The gateway has been stopped")
 
     # -----------------------------------------------------------------------------
 
     def __wait_for_thread_to_close(self, thread_service: Thread) -> None:
-        now: float = time.time()
-
-        waiting_for_closing: bool = True
-
         # Wait until thread is fully terminated
-        while waiting_for_closing and time.time() - now < self.__SHUTDOWN_WAITING_DELAY:
-            if not thread_service.is_alive():
-                waiting_for_closing = False
+        thread_service.join(timeout=self.__SHUTDOWN_WAITING_DELAY)
+
+        if thread_service.is_alive():
+            log.warning("Thread: {} was not terminated in time".format(thread_service.getName()))
@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""
+Redis storage layout migration
+
+Properties data are copied from one Redis storage layout into another one. Properties
+are loaded from gateway database, device and data type of every property are needed
+by device hash layout. Gateway should be stopped while its data are migrated, storage
+layout option has to be changed in configuration after migration.
+
+Usage: python -m miniserver_gateway.storages.migration --config /etc/miniserver-gateway/config/fb_gateway.yaml --target device_hash
+"""
+
+# App dependencies
+import argparse
+import json
+import logging
+from os import path
+from typing import Dict, List
+from redis import Redis
+from yaml import safe_load
+
+# App libs
+from miniserver_gateway.db.cache import (
+    DevicePropertyItem,
+    ChannelPropertyItem,
+    channel_property_cache,
+    device_property_cache,
+)
+from miniserver_gateway.db.utils import DatabaseSettings, DatabaseUtils
+from miniserver_gateway.storages.redis import RedisStorage, RedisStorageLayout, RedisStorageSettings
+from miniserver_gateway.storages.storages import StorageItem
+
+log = logging.getLogger("storage")
+
+
+#
+# Redis storage layout migration
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Storage
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class RedisStorageMigration:
+    __redis_client: Redis
+
+    __source: RedisStorageLayout
+    __target: RedisStorageLayout
+
+    __batch_size: int
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, redis_client: Redis, source: str, target: str, batch_size: int = 500) -> None:
+        if source == target:
+            raise ValueError("Source and target storage layout are same")
+
+        self.__redis_client = redis_client
+
+        self.__source = RedisStorage.create_layout(source)
+        self.__target = RedisStorage.create_layout(target)
+
+        self.__batch_size = batch_size
+
+    # -----------------------------------------------------------------------------
+
+    def migrate(
+        self,
+        items: List[DevicePropertyItem or ChannelPropertyItem],
+        delete_source: bool = False,
+        dry_run: bool = False,
+    ) -> Dict[str, int]:
+        """Copy stored data of all properties, source data are removed only when requested"""
+        result: Dict[str, int] = {
+            "properties": len(items),
+            "migrated": 0,
+            "missing": 0,
+            "invalid": 0,
+            "source_bytes": 0,
+            "target_bytes": 0,
+        }
+
+        for offset in range(0, len(items), self.__batch_size):
+            batch: List[DevicePropertyItem or ChannelPropertyItem] = items[offset:offset + self.__batch_size]
+
+            # Target data are always stored before source data are removed
+            pipeline = self.__redis_client.pipeline(transaction=False)
+
+            for item, stored_data in zip(batch, self.__source.read(self.__redis_client, batch)):
+                if stored_data is None:
+                    result["missing"] += 1
+
+                    continue
+
+                try:
+                    stored_item: StorageItem = self.__source.decode(item, stored_data)
+
+                    target_data: bytes = self.__target.encode(item, stored_item)
+
+                except (TypeError, ValueError) as e:
+                    log.warning("Stored data of property: {} could not be migrated: {}".format(item.property_id, e))
+
+                    result["invalid"] += 1
+
+                    continue
+
+                self.__target.store(pipeline, item, target_data)
+
+                if delete_source:
+                    self.__source.remove(pipeline, item)
+
+                result["migrated"] += 1
+                result["source_bytes"] += len(stored_data)
+                result["target_bytes"] += len(target_data)
+
+            if not dry_run:
+                pipeline.execute()
+
+        return result
+
+
+def load_properties(
+    database_configuration: dict, configuration_dir: str
+) -> List[DevicePropertyItem or ChannelPropertyItem]:
+    DatabaseUtils.bind(DatabaseSettings(database_configuration, configuration_dir).to_dict())
+
+    return device_property_cache.get_snapshot().items() + channel_property_cache.get_snapshot().items()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FastyBird gateway Redis storage layout migration")
+    parser.add_argument("--config", type=str, required=True, help="Gateway configuration file")
+    parser.add_argument(
+        "--target",
+        type=str,
+        choices=[RedisStorageSettings.LAYOUT_KEYS, RedisStorageSettings.LAYOUT_DEVICE_HASH],
+        default=RedisStorageSettings.LAYOUT_DEVICE_HASH,
+        help="Storage layout data are migrated to",
+    )
+    parser.add_argument("--storage", type=int, default=0, help="Index of Redis storage in configured storages")
+    parser.add_argument("--batch-size", type=int, default=500, help="Count of properties migrated in one pipeline round trip")
+    parser.add_argument("--delete-source", action="store_true", help="Remove data in source layout after copying")
+    parser.add_argument("--dry-run", action="store_true", help="Only count data which would be migrated")
+
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    with open(arguments.config) as general_config:
+        configuration: dict = safe_load(general_config)
+
+    storages: List[dict] = [
+        storage for storage in configuration.get("storages", []) if storage.get("class") == RedisStorage.__name__
+    ]
+
+    if arguments.storage >= len(storages):
+        parser.error("Redis storage with index: {} is not configured".format(arguments.storage))
+
+    settings = RedisStorageSettings(storages[arguments.storage])
+
+    items: List[DevicePropertyItem or ChannelPropertyItem] = load_properties(
+        configuration.get("database"), path.dirname(path.abspath(arguments.config))
+    )
+
+    source: str = (
+        RedisStorageSettings.LAYOUT_KEYS
+        if arguments.target == RedisStorageSettings.LAYOUT_DEVICE_HASH
+        else RedisStorageSettings.LAYOUT_DEVICE_HASH
+    )
+
+    migration = RedisStorageMigration(
+        Redis(host=settings.host, port=settings.port),
+        source,
+        arguments.target,
+        arguments.batch_size,
+    )
+
+    result: Dict[str, int] = migration.migrate(items, arguments.delete_source, arguments.dry_run)
+
+    print(json.dumps({"source": source, "target": arguments.target, "dry_run": arguments.dry_run, **result}, indent=4))
+
+
+if __name__ == "__main__":
+    main()
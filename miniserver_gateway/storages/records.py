@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# App dependencies
+import json
+import struct
+from typing import Dict, Tuple
+
+# App libs
+from miniserver_gateway.db.cache import DevicePropertyItem, ChannelPropertyItem
+from miniserver_gateway.db.types import DataType
+
+
+#
+# Binary record of property stored data
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Storage
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class StorageRecord:
+    """
+    Compact binary record of property value, expected value and pending flag
+
+    Record starts with pending flag and length of value segment, value segment is
+    followed by expected value segment. Empty segment is None, otherwise segment
+    starts with tag of its encoding. Values are packed by property data type, values
+    which could not be packed by data type (e.g. out of type range) are stored as JSON.
+
+    Same value is always encoded to same segment, so segments could be compared
+    without decoding them
+    """
+
+    TAG_PACKED: int = 1
+    TAG_JSON: int = 2
+
+    # Pending flag and value segment length
+    HEADER: struct.Struct = struct.Struct(">BH")
+
+    __FORMATS: Dict[DataType, struct.Struct] = {
+        DataType.DATA_TYPE_CHAR: struct.Struct(">b"),
+        DataType.DATA_TYPE_UCHAR: struct.Struct(">B"),
+        DataType.DATA_TYPE_SHORT: struct.Struct(">h"),
+        DataType.DATA_TYPE_USHORT: struct.Struct(">H"),
+        DataType.DATA_TYPE_INT: struct.Struct(">i"),
+        DataType.DATA_TYPE_UINT: struct.Struct(">I"),
+        # Double precision, received values are Python floats
+        DataType.DATA_TYPE_FLOAT: struct.Struct(">d"),
+        DataType.DATA_TYPE_BOOLEAN: struct.Struct(">?"),
+    }
+
+    __TEXT_TYPES: Tuple[DataType, ...] = (
+        DataType.DATA_TYPE_STRING,
+        DataType.DATA_TYPE_ENUM,
+        DataType.DATA_TYPE_COLOR,
+    )
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def encode(
+        item: DevicePropertyItem or ChannelPropertyItem,
+        value: int or float or str or bool or None,
+        expected: int or float or str or bool or None,
+        pending: bool,
+    ) -> bytes:
+        value_segment: bytes = StorageRecord.encode_value(item, value)
+
+        return (
+            StorageRecord.HEADER.pack(int(bool(pending)), len(value_segment))
+            + value_segment
+            + StorageRecord.encode_value(item, expected)
+        )
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def encode_value(
+        item: DevicePropertyItem or ChannelPropertyItem, value: int or float or str or bool or None
+    ) -> bytes:
+        if value is None:
+            return b""
+
+        segment: bytes or None = StorageRecord.__pack(item.data_type, value)
+
+        if segment is None:
+            segment = bytes([StorageRecord.TAG_JSON]) + json.dumps(value).encode("utf-8")
+
+        if len(segment) > 0xFFFF:
+            raise ValueError("Value of property: {} is too long for storage record".format(item.property_id))
+
+        return segment
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def decode(
+        item: DevicePropertyItem or ChannelPropertyItem, record: bytes
+    ) -> Tuple[int or float or str or bool or None, int or float or str or bool or None, bool]:
+        """Decode value, expected value and pending flag, ValueError is raised for invalid record"""
+        if len(record) < StorageRecord.HEADER.size:
+            raise ValueError("Storage record is too short")
+
+        pending, length = StorageRecord.HEADER.unpack_from(record)
+
+        value_end: int = StorageRecord.HEADER.size + length
+
+        if len(record) < value_end:
+            raise ValueError("Storage record value segment is truncated")
+
+        return (
+            StorageRecord.decode_value(item, record[StorageRecord.HEADER.size:value_end]),
+            StorageRecord.decode_value(item, record[value_end:]),
+            pending == 1,
+        )
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def decode_value(
+        item: DevicePropertyItem or ChannelPropertyItem, segment: bytes
+    ) -> int or float or str or bool or None:
+        if len(segment) == 0:
+            return None
+
+        if segment[0] == StorageRecord.TAG_JSON:
+            return json.loads(segment[1:].decode("utf-8"))
+
+        if segment[0] != StorageRecord.TAG_PACKED:
+            raise ValueError("Unknown storage record segment tag: {}".format(segment[0]))
+
+        if item.data_type in StorageRecord.__TEXT_TYPES:
+            return segment[1:].decode("utf-8")
+
+        packer: struct.Struct or None = StorageRecord.__FORMATS.get(item.data_type)
+
+        if packer is None:
+            raise ValueError("Property: {} data type could not be packed".format(item.property_id))
+
+        try:
+            return packer.unpack(segment[1:])[0]
+
+        except struct.error as e:
+            # Data type of property was changed after record was written
+            raise ValueError("Storage record segment does not match property data type") from e
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __pack(data_type: DataType or None, value: int or float or str or bool) -> bytes or None:
+        if data_type in StorageRecord.__TEXT_TYPES:
+            if not isinstance(value, str):
+                return None
+
+            return bytes([StorageRecord.TAG_PACKED]) + value.encode("utf-8")
+
+        packer: struct.Struct or None = StorageRecord.__FORMATS.get(data_type)
+
+        if packer is None:
+            return None
+
+        if data_type == DataType.DATA_TYPE_FLOAT:
+            if not isinstance(value, (int, float)):
+                return None
+
+        elif not isinstance(value, int):
+            # Booleans are integers too
+            return None
+
+        try:
+            return bytes([StorageRecord.TAG_PACKED]) + packer.pack(value)
+
+        except (struct.error, OverflowError):
+            return None
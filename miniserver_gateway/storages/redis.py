@@ -16,12 +16,20 @@
 
 # App dependencies
 import json
+import uuid
+from abc import ABC, abstractmethod
+from time import sleep
 from redis import Redis
-from typing import Dict
+from redis.client import Pipeline, PubSub
+from redis.exceptions import ConnectionError as RedisConnectionError, NoScriptError, ResponseError, TimeoutError
+from threading import Thread
+from typing import Dict, List, Tuple
 
 # App libs
 from miniserver_gateway.db.cache import DevicePropertyItem, ChannelPropertyItem
+from miniserver_gateway.storages.records import StorageRecord
 from miniserver_gateway.storages.storages import log, StorageInterface, StorageItem
+from miniserver_gateway.utils.cache import LruCache
 from miniserver_gateway.utils.properties import PropertiesUtils
 
 
@@ -38,6 +46,14 @@ class RedisStorageSettings:
     __port: int = 6379
     __username: str or None = None
     __password: str or None = None
+    __cache_size: int = 10000
+    __cache_ttl: float or None = None
+    __cache_invalidation: bool = False
+    __configure_notifications: bool = False
+    __layout: str = "keys"
+
+    LAYOUT_KEYS: str = "keys"
+    LAYOUT_DEVICE_HASH: str = "device_hash"
 
     # -----------------------------------------------------------------------------
 
@@ -46,6 +62,14 @@ class RedisStorageSettings:
         self.__port = int(config.get("port", 6379))
         self.__username = config.get("username", None)
         self.__password = config.get("password", None)
+        self.__cache_size = int(config.get("cache_size", 10000))
+        self.__cache_ttl = float(config.get("cache_ttl")) if config.get("cache_ttl") is not None else None
+        self.__cache_invalidation = bool(config.get("cache_invalidation", False))
+        self.__configure_notifications = bool(config.get("configure_notifications", False))
+        self.__layout = str(config.get("layout", self.LAYOUT_KEYS))
+
+        if self.__layout not in (self.LAYOUT_KEYS, self.LAYOUT_DEVICE_HASH):
+            raise ValueError("Redis storage layout: {} is not supported".format(self.__layout))
 
     # -----------------------------------------------------------------------------
 
@@ -71,123 +95,742 @@ class RedisStorageSettings:
     def password(self) -> str or None:
         return self.__password
 
+    # -----------------------------------------------------------------------------
+
+    @property
+    def cache_size(self) -> int:
+        """Maximum count of properties data kept in storage cache"""
+        return self.__cache_size
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def cache_ttl(self) -> float or None:
+        """Seconds after which cached data are loaded from Redis again"""
+        return self.__cache_ttl
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def cache_invalidation(self) -> bool:
+        """Cached data are invalidated by Redis keyspace notifications"""
+        return self.__cache_invalidation
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def configure_notifications(self) -> bool:
+        """Keyspace notifications are enabled on Redis server by gateway, server could be shared with other services"""
+        return self.__configure_notifications
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def layout(self) -> str:
+        """Properties data are stored under own keys or in one hash per device"""
+        return self.__layout
+
 
 #
-# Redis data storage
+# Redis storage cache invalidation
 #
 # @package        FastyBird:MiniServer!
 # @subpackage     Storage
 #
 # @author         Adam Kadlec <adam.kadlec@fastybird.com>
 #
-class RedisStorage(StorageInterface):
+class RedisCacheInvalidator(Thread):
+    """
+    Cached properties data changed by other Redis clients are removed from cache
+
+    Keyspace notifications do not carry changed data and they are published for
+    own writes too, so data stored under changed keys are loaded again and only
+    cached data different from stored data are removed
+
+    Keyspace notifications are not delivered while subscriber is disconnected,
+    so whole cache is cleared after connection is lost. Notifications are enabled on
+    Redis server only when it is allowed, otherwise invalidation is turned off
+    """
+
+    __stopped: bool = False
+    __subscribed: bool = False
+
     __redis_client: Redis
+    __redis_pub_sub: PubSub
 
-    __settings: RedisStorageSettings
+    __cache: LruCache
+    __layout: "RedisStorageLayout"
+    __configure_notifications: bool
+
+    __pattern: str
 
-    __data_cache: Dict[str, StorageItem] = {}
+    # Keyspace events of string, hash and generic commands (SET, HSET, DEL, EXPIRE...)
+    __KEYSPACE_EVENTS: str = "K$hg"
+
+    __RECONNECT_DELAY: float = 1.0
+    # Maximum count of changed keys loaded in one round trip
+    __BATCH_SIZE: int = 1000
 
     # -----------------------------------------------------------------------------
 
-    def __init__(self, config: dict) -> None:
-        super().__init__(config)
+    def __init__(
+        self,
+        redis_client: Redis,
+        cache: LruCache,
+        layout: "RedisStorageLayout",
+        configure_notifications: bool = False,
+    ) -> None:
+        super().__init__()
+
+        self.__redis_client = redis_client
+        self.__redis_pub_sub = self.__redis_client.pubsub(ignore_subscribe_messages=True)
+
+        self.__cache = cache
+        self.__layout = layout
+        self.__configure_notifications = configure_notifications
+
+        self.__pattern = "__keyspace@{}__:{}".format(
+            self.__redis_client.connection_pool.connection_kwargs.get("db", 0),
+            layout.KEYS_PATTERN,
+        )
+
+        # Threading config...
+        self.setDaemon(True)
+        self.setName("Redis storage cache thread")
+        # ...and starting
+        self.start()
 
-        self.__settings = RedisStorageSettings(config)
+    # -----------------------------------------------------------------------------
 
-        self.__redis_client = Redis(host=self.__settings.host, port=self.__settings.port)
+    def run(self) -> None:
+        self.__stopped = False
+
+        while not self.__stopped:
+            try:
+                if not self.__subscribed and not self.__subscribe():
+                    break
+
+                keys: List[str] = []
+
+                message: dict or None = self.__redis_pub_sub.get_message(timeout=1.0)
+
+                # All waiting notifications are processed together
+                while message is not None:
+                    key: str or None = self.__get_changed_key(message)
+
+                    if key is not None and key not in keys:
+                        keys.append(key)
+
+                    if len(keys) >= self.__BATCH_SIZE:
+                        break
+
+                    message = self.__redis_pub_sub.get_message(timeout=0.0)
+
+                if len(keys) > 0:
+                    self.__process_changes(keys)
+
+            except (RedisConnectionError, TimeoutError, OSError) as e:
+                # Socket is closed by close while waiting for message
+                if self.__stopped:
+                    break
+
+                # Changes made while disconnected are unknown
+                self.__cache.clear()
+
+                self.__subscribed = False
+
+                log.warning("Storage cache invalidation is disconnected from Redis: {}".format(e))
+
+                sleep(self.__RECONNECT_DELAY)
 
     # -----------------------------------------------------------------------------
 
     def close(self) -> None:
+        self.__stopped = True
+
+        try:
+            self.__redis_pub_sub.close()
+
+        except (RedisConnectionError, TimeoutError):
+            pass
+
+    # -----------------------------------------------------------------------------
+
+    def __subscribe(self) -> bool:
+        try:
+            configured: str = self.__redis_client.config_get("notify-keyspace-events").get("notify-keyspace-events", "")
+
+        except ResponseError as e:
+            # CONFIG command could be disabled, notifications are expected to be enabled on Redis server
+            log.warning("Keyspace notifications configuration could not be checked: {}".format(e))
+
+            configured = self.__KEYSPACE_EVENTS
+
+        # A is alias for all classes of events
+        missing: str = "".join(
+            [
+                flag
+                for flag in self.__KEYSPACE_EVENTS
+                if flag not in configured and (flag == "K" or "A" not in configured)
+            ]
+        )
+
+        if len(missing) > 0:
+            if not self.__configure_notifications:
+                log.warning(
+                    "Keyspace notifications: {} are not enabled on Redis server, storage cache invalidation is off".format(
+                        missing
+                    )
+                )
+
+                return False
+
+            try:
+                self.__redis_client.config_set("notify-keyspace-events", configured + missing)
+
+            except ResponseError as e:
+                log.warning("Keyspace notifications could not be enabled, storage cache invalidation is off")
+                log.exception(e)
+
+                return False
+
+        self.__redis_pub_sub.psubscribe(self.__pattern)
+
+        # Data cached before subscription could be already changed
+        self.__cache.clear()
+
+        self.__subscribed = True
+
+        return True
+
+    # -----------------------------------------------------------------------------
+
+    def __process_changes(self, keys: List[str]) -> None:
+        try:
+            stored: Dict[str, bytes or None] = self.__layout.read_changed(self.__redis_client, keys)
+
+        except ResponseError as e:
+            log.warning("Changed storage data could not be loaded: {}".format(e))
+
+            for key in keys:
+                self.__cache.invalidate(key)
+                self.__cache.invalidate_group(key)
+
+            return
+
+        # Cached properties data missing in changed keys were removed
+        for key in keys:
+            for cache_key in self.__cache.get_group_keys(key):
+                stored.setdefault(cache_key, None)
+
+        # Own writes are notified too, their cached data are equal to stored data and are kept
+        for cache_key, stored_data in stored.items():
+            self.__cache.changed(cache_key, stored_data)
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __get_changed_key(message: dict) -> str or None:
+        if message.get("type") != "pmessage":
+            return None
+
+        channel: bytes or str = message.get("channel")
+
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+
+        # Channel is in format __keyspace@<db>__:<key>
+        return channel.split(":", 1)[1]
+
+
+#
+# Redis storage layout
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Storage
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class RedisStorageLayout(ABC):
+    """Placement and encoding of properties data in Redis"""
+
+    # Script merging received value or expected value with stored data atomically,
+    # it returns flag if data were written and data stored after merge
+    WRITE_SCRIPT: str
+
+    # Pattern of Redis keys with properties data, keys of other services are not watched
+    KEYS_PATTERN: str
+
+    # -----------------------------------------------------------------------------
+
+    @abstractmethod
+    def get_key(self, item: DevicePropertyItem or ChannelPropertyItem) -> str:
+        """Redis key where property data are stored"""
+
+    # -----------------------------------------------------------------------------
+
+    def get_cache_group(self, item: DevicePropertyItem or ChannelPropertyItem) -> str or None:
+        """Cached properties data invalidated together when Redis key is changed"""
+        return None
+
+    # -----------------------------------------------------------------------------
+
+    @abstractmethod
+    def read_changed(self, redis_client: Redis, keys: List[str]) -> Dict[str, bytes or None]:
+        """Load all properties data stored under changed Redis keys, data are mapped by cache keys"""
+
+    # -----------------------------------------------------------------------------
+
+    @abstractmethod
+    def get_script_arguments(
+        self,
+        item: DevicePropertyItem or ChannelPropertyItem,
+        mode: str,
+        value: int or float or str or bool or None,
+    ) -> List[bytes or str]:
         pass
 
     # -----------------------------------------------------------------------------
 
-    def clear_cache(self) -> None:
-        self.__data_cache = {}
+    @abstractmethod
+    def read(self, redis_client: Redis, items: List[DevicePropertyItem or ChannelPropertyItem]) -> List[bytes or None]:
+        """Load stored data of all items with minimal count of round trips"""
 
     # -----------------------------------------------------------------------------
 
-    def write_property_value(
+    @abstractmethod
+    def decode(self, item: DevicePropertyItem or ChannelPropertyItem, stored_data: bytes) -> StorageItem:
+        """Parse stored data, ValueError is raised when stored data are not valid"""
+
+    # -----------------------------------------------------------------------------
+
+    @abstractmethod
+    def encode(self, item: DevicePropertyItem or ChannelPropertyItem, stored_item: StorageItem) -> bytes:
+        pass
+
+    # -----------------------------------------------------------------------------
+
+    @abstractmethod
+    def store(self, pipeline: Pipeline, item: DevicePropertyItem or ChannelPropertyItem, stored_data: bytes) -> None:
+        pass
+
+    # -----------------------------------------------------------------------------
+
+    @abstractmethod
+    def remove(self, redis_client: Redis or Pipeline, item: DevicePropertyItem or ChannelPropertyItem) -> None:
+        pass
+
+
+#
+# Properties data stored under own keys as JSON
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Storage
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class RedisKeysLayout(RedisStorageLayout):
+    # Keys are property identifiers, so only keys in UUID format are watched
+    KEYS_PATTERN: str = "{}-{}-{}-{}-{}".format("?" * 8, "?" * 4, "?" * 4, "?" * 4, "?" * 12)
+
+    # Numbers are formatted without loss of precision, cjson encoder is limited to 14 digits
+    WRITE_SCRIPT: str = """
+local function is_null(value)
+    return value == nil or value == cjson.null
+end
+
+local function encode(value)
+    if is_null(value) then
+        return "null"
+    end
+
+    if type(value) == "number" then
+        if value == math.floor(value) and math.abs(value) < 9007199254740992 then
+            return string.format("%d", value)
+        end
+
+        return string.format("%.17g", value)
+    end
+
+    return cjson.encode(value)
+end
+
+local stored = redis.call("GET", KEYS[1])
+local data = nil
+
+if stored then
+    local is_valid, decoded = pcall(cjson.decode, stored)
+
+    if is_valid and type(decoded) == "table"
+        and decoded["value"] ~= nil and decoded["expected"] ~= nil and decoded["pending"] ~= nil then
+        data = decoded
+    end
+end
+
+local received = cjson.decode(ARGV[3])
+local value, expected, pending
+
+if ARGV[1] == "value" then
+    if data ~= nil and not is_null(data["value"]) and data["value"] == received and data["pending"] ~= true then
+        return {0, stored}
+    end
+
+    value = ARGV[3]
+    expected = "null"
+    pending = "false"
+
+    -- Received value is not as expected yet
+    if data ~= nil and not is_null(data["expected"]) and data["expected"] ~= received then
+        expected = encode(data["expected"])
+        pending = "true"
+    end
+
+else
+    if data ~= nil and not is_null(data["value"]) and data["value"] == received then
+        return {0, stored}
+    end
+
+    value = data ~= nil and encode(data["value"]) or "null"
+    expected = ARGV[3]
+    pending = "true"
+end
+
+local content = '{"id": ' .. cjson.encode(ARGV[2]) .. ', "value": ' .. value
+    .. ', "expected": ' .. expected .. ', "pending": ' .. pending .. '}'
+
+redis.call("SET", KEYS[1], content)
+
+return {1, content}
+"""
+    # -----------------------------------------------------------------------------
+
+    def get_key(self, item: DevicePropertyItem or ChannelPropertyItem) -> str:
+        return item.property_id.__str__()
+
+    # -----------------------------------------------------------------------------
+
+    def get_script_arguments(
         self,
         item: DevicePropertyItem or ChannelPropertyItem,
-        value_to_write: int or float or str or bool or None,
-    ) -> bool:
-        storage_key: str = item.property_id.__str__()
+        mode: str,
+        value: int or float or str or bool or None,
+    ) -> List[bytes or str]:
+        return [mode, item.property_id.__str__(), json.dumps(value)]
+
+    # -----------------------------------------------------------------------------
+
+    def read(self, redis_client: Redis, items: List[DevicePropertyItem or ChannelPropertyItem]) -> List[bytes or None]:
+        return redis_client.mget([self.get_key(item) for item in items])
+
+    # -----------------------------------------------------------------------------
+
+    def read_changed(self, redis_client: Redis, keys: List[str]) -> Dict[str, bytes or None]:
+        return dict(zip(keys, redis_client.mget(keys)))
 
-        stored_data: StorageItem or None = self.read_property_data(item)
+    # -----------------------------------------------------------------------------
+
+    def decode(self, item: DevicePropertyItem or ChannelPropertyItem, stored_data: bytes) -> StorageItem:
+        stored_data_dict: dict = json.loads(stored_data.decode("utf-8"))
 
         if (
-            stored_data is None
-            or stored_data.value is None
-            or value_to_write != stored_data.value
-            or stored_data.is_pending
+            not isinstance(stored_data_dict, dict)
+            or "value" not in stored_data_dict
+            or "expected" not in stored_data_dict
+            or "pending" not in stored_data_dict
         ):
-            data_to_write = {
+            raise ValueError("Stored data are not complete")
+
+        return StorageItem(
+            value=PropertiesUtils.normalize_value(item, stored_data_dict.get("value", None)),
+            expected=PropertiesUtils.normalize_value(item, stored_data_dict.get("expected", None)),
+            pending=bool(stored_data_dict.get("pending", False)),
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def encode(self, item: DevicePropertyItem or ChannelPropertyItem, stored_item: StorageItem) -> bytes:
+        return json.dumps(
+            {
                 "id": item.property_id.__str__(),
-                "value": value_to_write,
-                "expected": None,
-                "pending": False,
+                "value": stored_item.value,
+                "expected": stored_item.expected,
+                "pending": stored_item.is_pending,
             }
+        ).encode("utf-8")
 
-            if stored_data is not None and stored_data.expected is not None:
-                # Check if received value is as expected if is set
-                if stored_data.expected != data_to_write.get("value"):
-                    data_to_write["pending"] = True
-                    data_to_write["expected"] = stored_data.expected
+    # -----------------------------------------------------------------------------
 
-                else:
-                    data_to_write["pending"] = False
-                    data_to_write["expected"] = None
+    def store(self, pipeline: Pipeline, item: DevicePropertyItem or ChannelPropertyItem, stored_data: bytes) -> None:
+        pipeline.set(self.get_key(item), stored_data)
 
-            if self.__store_into_storage(storage_key, json.dumps(data_to_write)):
-                log.debug(
-                    "Successfully written value for property: {} with value: {}".format(
-                        storage_key, data_to_write.get("value")
-                    )
-                )
+    # -----------------------------------------------------------------------------
 
-                self.__data_cache[storage_key] = StorageItem(
-                    value=data_to_write.get("value"),
-                    expected=data_to_write.get("expected"),
-                    pending=data_to_write.get("pending"),
-                )
+    def remove(self, redis_client: Redis or Pipeline, item: DevicePropertyItem or ChannelPropertyItem) -> None:
+        redis_client.delete(self.get_key(item))
 
-                return True
 
-        return False
+#
+# Properties data stored as binary records in one hash per device
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Storage
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class RedisDeviceHashLayout(RedisStorageLayout):
+    """
+    Every device has one hash, property identifier bytes are hash fields and
+    values are compact binary records, see StorageRecord
+    """
+
+    KEY_PREFIX: str = "fb_device_properties:"
+    KEYS_PATTERN: str = KEY_PREFIX + "*"
+
+    # Value and expected value segments of binary records are compared without decoding,
+    # same value is always encoded to same segment. Empty segment is None
+    WRITE_SCRIPT: str = """
+local stored = redis.call("HGET", KEYS[1], ARGV[2])
+local data = false
+local value, expected, pending
+
+if stored and string.len(stored) >= 3 then
+    local length = string.byte(stored, 2) * 256 + string.byte(stored, 3)
+
+    if string.len(stored) >= 3 + length then
+        data = true
+        pending = string.byte(stored, 1) == 1
+        value = string.sub(stored, 4, 3 + length)
+        expected = string.sub(stored, 4 + length)
+    end
+end
+
+local received = ARGV[3]
+local new_value, new_expected, new_pending
+
+if ARGV[1] == "value" then
+    if data and value ~= "" and value == received and not pending then
+        return {0, stored}
+    end
+
+    new_value = received
+    new_expected = ""
+    new_pending = 0
+
+    -- Received value is not as expected yet
+    if data and expected ~= "" and expected ~= received then
+        new_expected = expected
+        new_pending = 1
+    end
+
+else
+    if data and value ~= "" and value == received then
+        return {0, stored}
+    end
+
+    new_value = data and value or ""
+    new_expected = received
+    new_pending = 1
+end
+
+local length = string.len(new_value)
+local record = string.char(new_pending, math.floor(length / 256), length % 256) .. new_value .. new_expected
+
+redis.call("HSET", KEYS[1], ARGV[2], record)
+
+return {1, record}
+"""
+    # -----------------------------------------------------------------------------
+
+    def get_key(self, item: DevicePropertyItem or ChannelPropertyItem) -> str:
+        return self.KEY_PREFIX + item.device.__str__()
 
     # -----------------------------------------------------------------------------
 
-    def write_property_expected(
+    def get_cache_group(self, item: DevicePropertyItem or ChannelPropertyItem) -> str or None:
+        return self.get_key(item)
+
+    # -----------------------------------------------------------------------------
+
+    def get_script_arguments(
         self,
         item: DevicePropertyItem or ChannelPropertyItem,
-        expected_value_to_write: int or float or str or bool or None,
-    ) -> bool:
-        storage_key: str = item.property_id.__str__()
+        mode: str,
+        value: int or float or str or bool or None,
+    ) -> List[bytes or str]:
+        return [mode, item.property_id.bytes, StorageRecord.encode_value(item, value)]
 
-        stored_data: StorageItem or None = self.read_property_data(item)
+    # -----------------------------------------------------------------------------
 
-        if stored_data is None or stored_data.value is None or expected_value_to_write != stored_data.value:
-            data_to_write = {
-                "id": item.property_id.__str__(),
-                "value": stored_data.value if stored_data is not None else None,
-                "expected": expected_value_to_write,
-                "pending": True,
-            }
+    def read(self, redis_client: Redis, items: List[DevicePropertyItem or ChannelPropertyItem]) -> List[bytes or None]:
+        devices: Dict[str, List[int]] = {}
 
-            if self.__store_into_storage(storage_key, json.dumps(data_to_write)):
-                log.debug("Successfully written expected value for property: {}".format(storage_key))
+        for index, item in enumerate(items):
+            devices.setdefault(self.get_key(item), []).append(index)
 
-                self.__data_cache[storage_key] = StorageItem(
-                    value=data_to_write.get("value"),
-                    expected=data_to_write.get("expected"),
-                    pending=data_to_write.get("pending"),
-                )
+        # Properties of one device are loaded by one HMGET
+        pipeline = redis_client.pipeline(transaction=False)
+
+        for key, indexes in devices.items():
+            pipeline.hmget(key, [items[index].property_id.bytes for index in indexes])
+
+        stored: List[bytes or None] = [None] * len(items)
+
+        for indexes, values in zip(devices.values(), pipeline.execute()):
+            for index, value in zip(indexes, values):
+                stored[index] = value
+
+        return stored
+
+    # -----------------------------------------------------------------------------
+
+    def read_changed(self, redis_client: Redis, keys: List[str]) -> Dict[str, bytes or None]:
+        pipeline = redis_client.pipeline(transaction=False)
+
+        for key in keys:
+            pipeline.hgetall(key)
+
+        stored: Dict[str, bytes or None] = {}
+
+        for values in pipeline.execute():
+            for field, value in values.items():
+                # Fields are property identifier bytes
+                if len(field) == 16:
+                    stored[uuid.UUID(bytes=field).__str__()] = value
+
+        return stored
+
+    # -----------------------------------------------------------------------------
+
+    def decode(self, item: DevicePropertyItem or ChannelPropertyItem, stored_data: bytes) -> StorageItem:
+        value, expected, pending = StorageRecord.decode(item, stored_data)
+
+        return StorageItem(
+            value=PropertiesUtils.normalize_value(item, value),
+            expected=PropertiesUtils.normalize_value(item, expected),
+            pending=pending,
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def encode(self, item: DevicePropertyItem or ChannelPropertyItem, stored_item: StorageItem) -> bytes:
+        return StorageRecord.encode(item, stored_item.value, stored_item.expected, stored_item.is_pending)
+
+    # -----------------------------------------------------------------------------
+
+    def store(self, pipeline: Pipeline, item: DevicePropertyItem or ChannelPropertyItem, stored_data: bytes) -> None:
+        pipeline.hset(self.get_key(item), item.property_id.bytes, stored_data)
+
+    # -----------------------------------------------------------------------------
+
+    def remove(self, redis_client: Redis or Pipeline, item: DevicePropertyItem or ChannelPropertyItem) -> None:
+        redis_client.hdel(self.get_key(item), item.property_id.bytes)
 
-                return True
 
-        return False
+#
+# Redis data storage
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Storage
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class RedisStorage(StorageInterface):
+    __redis_client: Redis
+
+    __settings: RedisStorageSettings
+
+    __layout: RedisStorageLayout
+
+    __data_cache: LruCache
+    __cache_invalidator: RedisCacheInvalidator or None = None
+
+    __write_script_sha: str or None = None
+
+    __MODE_VALUE: str = "value"
+    __MODE_EXPECTED: str = "expected"
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+
+        self.__settings = RedisStorageSettings(config)
+
+        self.__redis_client = Redis(host=self.__settings.host, port=self.__settings.port)
+
+        self.__layout = self.create_layout(self.__settings.layout)
+
+        self.__data_cache = LruCache(self.__settings.cache_size, self.__settings.cache_ttl)
+
+        if self.__settings.cache_invalidation:
+            self.__cache_invalidator = RedisCacheInvalidator(
+                self.__redis_client,
+                self.__data_cache,
+                self.__layout,
+                self.__settings.configure_notifications,
+            )
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def create_layout(layout: str) -> RedisStorageLayout:
+        if layout == RedisStorageSettings.LAYOUT_DEVICE_HASH:
+            return RedisDeviceHashLayout()
+
+        return RedisKeysLayout()
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        """Storage cache size and its hits, misses, evictions and expirations counters"""
+        return self.__data_cache.stats()
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        if self.__cache_invalidator is not None:
+            self.__cache_invalidator.close()
+
+        log.info(
+            "Storage cache hits {hits}, misses {misses}, evictions {evictions} and expirations {expirations}".format(
+                **self.__data_cache.stats()
+            )
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def clear_cache(self) -> None:
+        self.__data_cache.clear()
+
+    # -----------------------------------------------------------------------------
+
+    def write_property_value(
+        self,
+        item: DevicePropertyItem or ChannelPropertyItem,
+        value_to_write: int or float or str or bool or None,
+    ) -> StorageItem or None:
+        return self.write_properties_values([(item, value_to_write)])[0]
+
+    # -----------------------------------------------------------------------------
+
+    def write_properties_values(
+        self,
+        values: List[Tuple[DevicePropertyItem or ChannelPropertyItem, int or float or str or bool or None]],
+    ) -> List[StorageItem or None]:
+        """All values are merged with stored data by write script in one pipeline"""
+        return self.__write_properties_data(
+            [(item, self.__MODE_VALUE, value_to_write) for item, value_to_write in values]
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def write_property_expected(
+        self,
+        item: DevicePropertyItem or ChannelPropertyItem,
+        expected_value_to_write: int or float or str or bool or None,
+    ) -> StorageItem or None:
+        return self.__write_properties_data([(item, self.__MODE_EXPECTED, expected_value_to_write)])[0]
 
     # -----------------------------------------------------------------------------
 
@@ -216,57 +859,156 @@ class RedisStorage(StorageInterface):
     # -----------------------------------------------------------------------------
 
     def read_property_data(self, item: DevicePropertyItem or ChannelPropertyItem) -> StorageItem or None:
-        storage_key: str = item.property_id.__str__()
+        return self.read_properties_data([item])[0]
+
+    # -----------------------------------------------------------------------------
+
+    def read_properties_data(self, items: List[DevicePropertyItem or ChannelPropertyItem]) -> List[StorageItem or None]:
+        """Data missing in cache are loaded in one round trip"""
+        stored: List[StorageItem or None] = [None] * len(items)
+        missing: List[int] = []
+
+        # Data loaded from Redis are not cached when their key was changed to other data in meantime
+        cache_version: int = self.__data_cache.version
 
-        if storage_key in self.__data_cache:
-            return self.__data_cache[storage_key]
+        for index, item in enumerate(items):
+            cached: StorageItem or None = self.__data_cache.get(item.property_id.__str__())
 
-        stored_data = self.__redis_client.get(storage_key)
+            if cached is not None:
+                stored[index] = cached
+
+            else:
+                missing.append(index)
+
+        if len(missing) == 0:
+            return stored
+
+        missing_items: List[DevicePropertyItem or ChannelPropertyItem] = [items[index] for index in missing]
+
+        for index, item, stored_data in zip(
+            missing, missing_items, self.__layout.read(self.__redis_client, missing_items)
+        ):
+            stored[index] = self.__parse_stored_data(item, stored_data, cache_version)
+
+        return stored
+
+    # -----------------------------------------------------------------------------
+
+    def __parse_stored_data(
+        self,
+        item: DevicePropertyItem or ChannelPropertyItem,
+        stored_data: bytes or str or None,
+        cache_version: int or None = None,
+    ) -> StorageItem or None:
+        storage_key: str = item.property_id.__str__()
 
         if stored_data is None:
             return None
 
-        if isinstance(stored_data, bytes):
-            stored_data = stored_data.decode("utf-8")
+        if isinstance(stored_data, str):
+            stored_data = stored_data.encode("utf-8")
 
         try:
-            stored_data_dict: dict = json.loads(stored_data)
+            stored_item: StorageItem = self.__layout.decode(item, stored_data)
 
-            if "value" in stored_data_dict and "expected" in stored_data_dict and "pending" in stored_data_dict:
-                self.__data_cache[storage_key] = StorageItem(
-                    value=PropertiesUtils.normalize_value(item, stored_data_dict.get("value", None)),
-                    expected=PropertiesUtils.normalize_value(item, stored_data_dict.get("expected", None)),
-                    pending=bool(stored_data_dict.get("pending", False)),
-                )
+        except (TypeError, ValueError) as e:
+            # Stored data are not valid, they should be removed
+            self.__layout.remove(self.__redis_client, item)
+            self.__data_cache.invalidate(storage_key)
 
-                return self.__data_cache[storage_key]
+            log.error("Property data for property: {} could not be loaded from storages".format(storage_key))
+            log.exception(e)
 
-            # Stored data are not valid, we will remove them from storages
-            self.__redis_client.delete(storage_key)
+            return None
 
-        except TypeError as e:
-            # Stored value is invalid, key should be removed
-            self.__redis_client.delete(storage_key)
-            del self.__data_cache[storage_key]
+        # Stored data are kept with cached data, so own writes notified by Redis are recognized
+        self.__data_cache.set(storage_key, stored_item, cache_version, self.__layout.get_cache_group(item), stored_data)
 
-            log.error(
-                "Property data for property: {} could not be loaded from storages. Data type error".format(storage_key)
-            )
-            log.exception(e)
+        return stored_item
 
-        except json.JSONDecodeError as e:
-            # Stored value is invalid, key should be removed
-            self.__redis_client.delete(storage_key)
-            del self.__data_cache[storage_key]
+    # -----------------------------------------------------------------------------
 
-            log.error(
-                "Property data for property: {} could not be loaded from storages. Json error".format(storage_key)
-            )
-            log.exception(e)
+    def __write_properties_data(
+        self, writes: List[Tuple[DevicePropertyItem or ChannelPropertyItem, str, int or float or str or bool or None]]
+    ) -> List[StorageItem or None]:
+        # Data changed by other client after script was executed could be already invalidated
+        cache_version: int = self.__data_cache.version
 
-        return None
+        responses: List[object] = self.__execute_write_script(writes)
+
+        results: List[StorageItem or None] = [None] * len(writes)
+
+        for index, ((item, mode, value_to_write), response) in enumerate(zip(writes, responses)):
+            storage_key: str = item.property_id.__str__()
+
+            if isinstance(response, Exception):
+                log.error("Value for property: {} could not be written: {}".format(storage_key, response))
+
+                self.__data_cache.invalidate(storage_key)
+
+                continue
+
+            is_written, stored_data = response
+
+            # Script returns data stored after merge, so they are cached without reading them back
+            stored_item: StorageItem or None = self.__parse_stored_data(item, stored_data, cache_version)
+
+            if stored_item is None:
+                self.__data_cache.invalidate(storage_key)
+
+            if int(is_written) == 1:
+                log.debug(
+                    "Successfully written {} for property: {} with value: {}".format(
+                        "value" if mode == self.__MODE_VALUE else "expected value", storage_key, value_to_write
+                    )
+                )
+
+                results[index] = stored_item
+
+        return results
 
     # -----------------------------------------------------------------------------
 
-    def __store_into_storage(self, key: str, content: str) -> bool:
-        return self.__redis_client.set(key, content)
+    def __execute_write_script(
+        self,
+        writes: List[Tuple[DevicePropertyItem or ChannelPropertyItem, str, int or float or str or bool or None]],
+        reload: bool = True,
+    ) -> List[object]:
+        if self.__write_script_sha is None:
+            self.__write_script_sha = self.__redis_client.script_load(self.__layout.WRITE_SCRIPT)
+
+        responses: List[object] = [None] * len(writes)
+        executed: List[int] = []
+
+        pipeline = self.__redis_client.pipeline(transaction=False)
+
+        for index, (item, mode, value_to_write) in enumerate(writes):
+            try:
+                arguments: List[bytes or str] = self.__layout.get_script_arguments(item, mode, value_to_write)
+
+            except (TypeError, ValueError) as e:
+                # Value could not be encoded, e.g. it is too long
+                responses[index] = e
+
+                continue
+
+            pipeline.evalsha(self.__write_script_sha, 1, self.__layout.get_key(item), *arguments)
+
+            executed.append(index)
+
+        if len(executed) > 0:
+            for index, response in zip(executed, pipeline.execute(raise_on_error=False)):
+                responses[index] = response
+
+        missing: List[int] = [index for index, response in enumerate(responses) if isinstance(response, NoScriptError)]
+
+        if len(missing) > 0 and reload:
+            # Scripts cache was flushed on server, e.g. after restart
+            self.__write_script_sha = None
+
+            repeated: List[object] = self.__execute_write_script([writes[index] for index in missing], False)
+
+            for index, response in zip(missing, repeated):
+                responses[index] = response
+
+        return responses
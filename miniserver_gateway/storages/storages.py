@@ -18,9 +18,10 @@
 import logging
 import time
 from abc import ABC, abstractmethod
-from queue import Queue, Full as QueueFull
+import uuid
+from queue import Full as QueueFull
 from threading import Thread
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Tuple
 
 # App libs
 from miniserver_gateway.connectors.events import ConnectorPropertyValueEvent
@@ -33,7 +34,9 @@ from miniserver_gateway.storages.queue import (
     SavePropertyExpectedValueQueueItem,
 )
 from miniserver_gateway.utils.libraries import LibrariesUtils
-from miniserver_gateway.types.types import ModulesOrigins
+from miniserver_gateway.utils.metrics import StageMetrics, app_metrics
+from miniserver_gateway.utils.queue import PipelineQueue, PipelineQueueSettings, QueueUtils
+from miniserver_gateway.types.types import ModulesOrigins, QueueOverflowPolicy
 
 log = logging.getLogger("storage")
 
@@ -76,13 +79,21 @@ class Storages(Thread):
     __primary_storage: "StorageInterface" or None = None
     __storages: Set["StorageInterface"] = set()
 
-    __queue: Queue
+    __queue: PipelineQueue
+
+    __metrics: StageMetrics
+    __write_metrics: StageMetrics
 
     __SHUTDOWN_WAITING_DELAY: int = 3.0
 
     # -----------------------------------------------------------------------------
 
-    def __init__(self, config: List[Dict[str, str]]) -> None:
+    def __init__(
+        self,
+        config: List[Dict[str, str]],
+        queue_config: dict or None = None,
+        threaded: bool = True,
+    ) -> None:
         super().__init__()
 
         self.__settings = StoragesSettings(config)
@@ -93,8 +104,17 @@ class Storages(Thread):
             self.__store_expected_value_event,
         )
 
+        self.__metrics = app_metrics.stage("storages")
+        self.__write_metrics = app_metrics.stage("storages.write")
+
         # Queue for consuming incoming data from connectors
-        self.__queue = Queue(maxsize=1000)
+        # By default, not yet stored property value is replaced with newer one
+        self.__queue = PipelineQueue(
+            PipelineQueueSettings(queue_config, QueueOverflowPolicy(QueueOverflowPolicy.POLICY_COALESCE)),
+            key=self.__get_record_key,
+            mergeable=(SavePropertyValueQueueItem,),
+            metrics=self.__metrics,
+        )
 
         # Process storages services
         self.__load()
@@ -105,8 +125,10 @@ class Storages(Thread):
         # Threading config...
         self.setDaemon(True)
         self.setName("Storage thread")
-        # ...and starting
-        self.start()
+
+        # ...and starting, in asyncio runtime queue is consumed by event loop
+        if threaded:
+            self.start()
 
     # -----------------------------------------------------------------------------
 
@@ -115,25 +137,77 @@ class Storages(Thread):
 
         # All records have to be processed before thread is closed
         while True:
-            if not self.__queue.empty():
-                record = self.__queue.get()
-
-                if isinstance(record, SavePropertyValueQueueItem):
-                    self.__process_property_value_record(record)
-
-                elif isinstance(record, SavePropertyExpectedValueQueueItem):
-                    self.__process_property_expected_value_record(record)
+            # Wait for incoming records and process all of them
+            self.process_records(QueueUtils.consume(self.__queue))
 
             if self.__stopped and self.__queue.empty():
                 break
 
-            time.sleep(0.001)
+    # -----------------------------------------------------------------------------
+
+    @property
+    def queue(self) -> PipelineQueue:
+        return self.__queue
+
+    # -----------------------------------------------------------------------------
+
+    def process_record(self, record: object) -> None:
+        if isinstance(record, SavePropertyValueQueueItem):
+            # Values batch is measured as one record
+            self.__process_property_value_records([record])
+
+        elif isinstance(record, SavePropertyExpectedValueQueueItem):
+            with self.__metrics.measure():
+                self.__process_property_expected_value_record(record)
+
+    # -----------------------------------------------------------------------------
+
+    def process_records(self, records: List[object]) -> None:
+        """Consecutive property values are written to storages as one batch"""
+        batch: List[SavePropertyValueQueueItem] = []
+
+        for record in records:
+            if isinstance(record, SavePropertyValueQueueItem):
+                batch.append(record)
+
+                continue
+
+            # Expected value has to be stored after values received before it
+            if len(batch) > 0:
+                self.__process_property_value_records(batch)
+
+                batch = []
+
+            self.process_record(record)
+
+        if len(batch) > 0:
+            self.__process_property_value_records(batch)
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def merged_updates(self) -> int:
+        """Count of property values replaced by newer value before storing"""
+        return self.__queue.merged
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def dropped_updates(self) -> int:
+        """Count of records dropped due to queue overflow"""
+        return self.__queue.dropped
 
     # -----------------------------------------------------------------------------
 
     def close(self) -> None:
         """Stop storage main thread"""
 
+        app_dispatcher.remove_listener(ConnectorPropertyValueEvent.EVENT_NAME, self.__store_value_event)
+        app_dispatcher.remove_listener(
+            ExchangePropertyExpectedValueEvent.EVENT_NAME,
+            self.__store_expected_value_event,
+        )
+
         for storage in self.__storages:
             try:
                 # Send terminate cmd to all sub-storages
@@ -159,12 +233,19 @@ class Storages(Thread):
 
         self.__stopped = True
 
+        # Wake up main thread to finish queued records
+        QueueUtils.wake_up(self.__queue)
+
+        log.info(
+            "Storage queue merged {} and dropped {} records".format(self.__queue.merged, self.__queue.dropped)
+        )
+
     # -----------------------------------------------------------------------------
 
     def __store_value_event(self, event: ConnectorPropertyValueEvent) -> None:
         try:
             if isinstance(event.record, DevicePropertyItem) or isinstance(event.record, ChannelPropertyItem):
-                self.__queue.put(SavePropertyValueQueueItem(event.record, event.actual_value))
+                self.__queue.enqueue(SavePropertyValueQueueItem(event.record, event.actual_value))
 
             else:
                 log.warning("Received unknown connectors event")
@@ -177,7 +258,7 @@ class Storages(Thread):
     def __store_expected_value_event(self, event: ExchangePropertyExpectedValueEvent) -> None:
         try:
             if isinstance(event.item, DevicePropertyItem):
-                self.__queue.put(
+                self.__queue.enqueue(
                     SavePropertyExpectedValueQueueItem(
                         event.item,
                         event.expected,
@@ -185,7 +266,7 @@ class Storages(Thread):
                 )
 
             elif isinstance(event.item, ChannelPropertyItem):
-                self.__queue.put(
+                self.__queue.enqueue(
                     SavePropertyExpectedValueQueueItem(
                         event.item,
                         event.expected,
@@ -200,31 +281,44 @@ class Storages(Thread):
 
     # -----------------------------------------------------------------------------
 
-    def __process_property_value_record(self, record: SavePropertyValueQueueItem) -> None:
+    @staticmethod
+    def __get_record_key(record: object) -> uuid.UUID or None:
+        if isinstance(record, SavePropertyValueQueueItem) or isinstance(record, SavePropertyExpectedValueQueueItem):
+            return record.item.property_id
+
+        return None
+
+    # -----------------------------------------------------------------------------
+
+    def __process_property_value_records(self, records: List[SavePropertyValueQueueItem]) -> None:
         if self.__primary_storage is None:
             return
 
-        if not isinstance(record.item, DevicePropertyItem) and not isinstance(record.item, ChannelPropertyItem):
-            # Unknown record item
+        # Unknown records items are skipped
+        records = [
+            record
+            for record in records
+            if isinstance(record.item, DevicePropertyItem) or isinstance(record.item, ChannelPropertyItem)
+        ]
+
+        if len(records) == 0:
             return
 
-        for storage in self.__storages:
-            if storage != self.__primary_storage:
-                storage.write_property_value(record.item, record.value)
-
-        if self.__primary_storage.write_property_value(record.item, record.value):
-            stored_data: StorageItem = self.__primary_storage.read_property_data(record.item)
-
-            app_dispatcher.dispatch(
-                StoragePropertyStoredEvent.EVENT_NAME,
-                StoragePropertyStoredEvent(
-                    ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
-                    record.item,
-                    stored_data.value,
-                    stored_data.expected,
-                    stored_data.expected,
-                ),
-            )
+        values: List[Tuple[DevicePropertyItem or ChannelPropertyItem, bool or int or float or str or None]] = [
+            (record.item, record.value) for record in records
+        ]
+
+        with self.__metrics.measure():
+            for storage in self.__storages:
+                if storage != self.__primary_storage:
+                    storage.write_properties_values(values)
+
+            with self.__write_metrics.measure():
+                results: List[StorageItem or None] = self.__primary_storage.write_properties_values(values)
+
+            for record, stored_data in zip(records, results):
+                if stored_data is not None:
+                    self.__dispatch_stored_event(record.item, stored_data)
 
     # -----------------------------------------------------------------------------
 
@@ -245,20 +339,29 @@ class Storages(Thread):
             if storage != self.__primary_storage:
                 storage.write_property_expected(property_item, record.expected_value)
 
-        if self.__primary_storage.write_property_expected(property_item, record.expected_value):
-            stored_data: StorageItem = self.__primary_storage.read_property_data(property_item)
-
-            app_dispatcher.dispatch(
-                StoragePropertyStoredEvent.EVENT_NAME,
-                StoragePropertyStoredEvent(
-                    ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
-                    property_item,
-                    stored_data.value,
-                    stored_data.expected,
-                    stored_data.expected,
-                ),
+        with self.__write_metrics.measure():
+            stored_data: StorageItem or None = self.__primary_storage.write_property_expected(
+                property_item, record.expected_value
             )
 
+        if stored_data is not None:
+            self.__dispatch_stored_event(property_item, stored_data)
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __dispatch_stored_event(item: DevicePropertyItem or ChannelPropertyItem, stored_data: "StorageItem") -> None:
+        app_dispatcher.dispatch(
+            StoragePropertyStoredEvent.EVENT_NAME,
+            StoragePropertyStoredEvent(
+                ModulesOrigins(ModulesOrigins.DEVICES_MODULE),
+                item,
+                stored_data.value,
+                stored_data.expected,
+                stored_data.is_pending,
+            ),
+        )
+
     # -----------------------------------------------------------------------------
 
     def __load(self) -> None:
@@ -368,19 +471,28 @@ class StorageInterface(ABC):
         self,
         item: DevicePropertyItem or ChannelPropertyItem,
         value_to_write: int or float or str or bool or None,
-    ) -> bool:
-        """Write value to storage and return TRUE if value is updated otherwise FALSE"""
+    ) -> StorageItem or None:
+        """Write value to storage and return stored data if value is updated otherwise None"""
         pass
 
     # -----------------------------------------------------------------------------
 
+    def write_properties_values(
+        self,
+        values: List[Tuple[DevicePropertyItem or ChannelPropertyItem, int or float or str or bool or None]],
+    ) -> List[StorageItem or None]:
+        """Write batch of values, result of every value is returned in same order"""
+        return [self.write_property_value(item, value_to_write) for item, value_to_write in values]
+
+    # -----------------------------------------------------------------------------
+
     @abstractmethod
     def write_property_expected(
         self,
         item: DevicePropertyItem or ChannelPropertyItem,
         expected_value_to_write: int or float or str or bool or None,
-    ) -> bool:
-        """Write expected value to storage and return TRUE if expected value is updated otherwise FALSE"""
+    ) -> StorageItem or None:
+        """Write expected value to storage and return stored data if expected value is updated otherwise None"""
         pass
 
     # -----------------------------------------------------------------------------
@@ -404,3 +516,9 @@ class StorageInterface(ABC):
     @abstractmethod
     def read_property_data(self, item: DevicePropertyItem or ChannelPropertyItem) -> StorageItem or None:
         pass
+
+    # -----------------------------------------------------------------------------
+
+    def read_properties_data(self, items: List[DevicePropertyItem or ChannelPropertyItem]) -> List[StorageItem or None]:
+        """Read batch of properties data, data of every property are returned in same order"""
+        return [self.read_property_data(item) for item in items]
@@ -16,9 +16,8 @@
 
 # App dependencies
 import logging
-import time
 from threading import Thread
-from queue import Queue, Full as QueueFull
+from queue import Full as QueueFull
 
 # App libs
 from miniserver_gateway.events.dispatcher import app_dispatcher
@@ -37,6 +36,8 @@ from miniserver_gateway.triggers.cache import (
 from miniserver_gateway.triggers.events import TriggerActionFiredEvent
 from miniserver_gateway.triggers.queue import FireTriggerActionQueueItem
 from miniserver_gateway.types.types import ModulesOrigins
+from miniserver_gateway.utils.metrics import StageMetrics, app_metrics
+from miniserver_gateway.utils.queue import PipelineQueue, PipelineQueueSettings, QueueUtils
 
 log = logging.getLogger("triggers")
 
@@ -54,15 +55,20 @@ class Trigger(Thread):
 
     __triggers: TriggersCache
 
+    __queue: PipelineQueue
+
+    __metrics: StageMetrics
+
     # -----------------------------------------------------------------------------
 
-    def __init__(self) -> None:
+    def __init__(self, queue_config: dict or None = None, threaded: bool = True) -> None:
         Thread.__init__(self)
 
         app_dispatcher.add_listener(ConnectorPropertyValueEvent.EVENT_NAME, self.__check_connector_value_event)
 
         # Queue for consuming incoming data from connectors
-        self.__queue = Queue(maxsize=1000)
+        self.__metrics = app_metrics.stage("triggers")
+        self.__queue = PipelineQueue(PipelineQueueSettings(queue_config), metrics=self.__metrics)
 
         # Initialize all triggers
         self.__triggers = TriggersCache()
@@ -71,8 +77,10 @@ class Trigger(Thread):
         # Threading config...
         self.setDaemon(True)
         self.setName("Triggers watcher thread")
-        # ...and starting
-        self.start()
+
+        # ...and starting, in asyncio runtime queue is consumed by event loop
+        if threaded:
+            self.start()
 
     # -----------------------------------------------------------------------------
 
@@ -80,23 +88,37 @@ class Trigger(Thread):
         self.__stopped = False
 
         while True:
-            if not self.__queue.empty():
-                record = self.__queue.get()
-
-                if isinstance(record, FireTriggerActionQueueItem):
-                    self.__process_trigger_record(record)
+            # Wait for incoming records and process all of them
+            for record in QueueUtils.consume(self.__queue):
+                self.process_record(record)
 
             # All records have to be processed before thread is closed
             if self.__stopped and self.__queue.empty():
                 break
 
-            time.sleep(0.001)
+    # -----------------------------------------------------------------------------
+
+    @property
+    def queue(self) -> PipelineQueue:
+        return self.__queue
+
+    # -----------------------------------------------------------------------------
+
+    def process_record(self, record: object) -> None:
+        with self.__metrics.measure():
+            if isinstance(record, FireTriggerActionQueueItem):
+                self.__process_trigger_record(record)
 
     # -----------------------------------------------------------------------------
 
     def close(self) -> None:
+        app_dispatcher.remove_listener(ConnectorPropertyValueEvent.EVENT_NAME, self.__check_connector_value_event)
+
         self.__stopped = True
 
+        # Wake up main thread to finish queued records
+        QueueUtils.wake_up(self.__queue)
+
     # -----------------------------------------------------------------------------
 
     def __check_connector_value_event(self, event: ConnectorPropertyValueEvent) -> None:
@@ -110,7 +132,7 @@ class Trigger(Thread):
                 if trigger.is_fulfilled and not trigger.is_triggered:
                     try:
                         for action in trigger.actions.values():
-                            self.__queue.put(FireTriggerActionQueueItem(trigger, action))
+                            self.__queue.enqueue(FireTriggerActionQueueItem(trigger, action))
 
                     except QueueFull:
                         log.error("Triggers processing queue is full. New messages could not be added")
@@ -36,3 +36,27 @@ class ModulesOrigins(Enum):
     @classmethod
     def has_value(cls, value: str) -> bool:
         return value in cls._value2member_map_
+
+
+#
+# Pipeline queue overflow policies
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Types
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+@unique
+class QueueOverflowPolicy(Enum):
+    # Wait for free slot until timeout expires, then drop new record
+    POLICY_BLOCK: str = "block"
+    # Drop oldest queued record to make room for new one
+    POLICY_DROP_OLDEST: str = "drop_oldest"
+    # Drop new record when queue is full
+    POLICY_DROP_NEWEST: str = "drop_newest"
+    # Replace pending record with same key, drop new record when queue is full
+    POLICY_COALESCE: str = "coalesce"
+
+    @classmethod
+    def has_value(cls, value: str) -> bool:
+        return value in cls._value2member_map_
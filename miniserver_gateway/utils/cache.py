@@ -0,0 +1,287 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# App dependencies
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Hashable, List, Set, Tuple
+
+
+#
+# Bounded cache with least recently used eviction
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class LruCache:
+    """
+    Cache keeping at most max size entries, least recently used entry is evicted first
+
+    Entries older than ttl are treated as missing. Entries could be assigned to group
+    and invalidated together with whole group. Entry could be tagged by data it was
+    created from (e.g. raw stored data), changed key is then removed only when its
+    new data are different.
+
+    Every change of key is versioned, value loaded before key, its group or whole
+    cache was changed to different data is not stored
+    """
+
+    __max_size: int
+    __ttl: float or None
+
+    __entries: "OrderedDict[Hashable, Tuple[object, float or None, Hashable or None, object]]"
+    __groups: Dict[Hashable, Set[Hashable]]
+
+    # Version of last change and tag of changed data for keys and groups
+    __changes: Dict[Hashable, Tuple[int, object]]
+    __groups_changes: Dict[Hashable, int]
+
+    __version: int = 0
+    # Values loaded before this version are refused, e.g. cache was cleared
+    __min_version: int = 0
+
+    __hits: int = 0
+    __misses: int = 0
+    __evictions: int = 0
+    __expirations: int = 0
+
+    __lock: Lock
+
+    # Tag of unknown data, it is not equal to any other tag
+    __UNKNOWN: object = object()
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, max_size: int, ttl: float or None = None) -> None:
+        if max_size < 1:
+            raise ValueError("Cache size has to be at least one entry")
+
+        self.__max_size = max_size
+        self.__ttl = ttl if ttl is not None and ttl > 0 else None
+
+        self.__entries = OrderedDict()
+        self.__groups = {}
+
+        self.__changes = {}
+        self.__groups_changes = {}
+
+        self.__lock = Lock()
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def version(self) -> int:
+        """Version to be passed to set when value is loaded from source"""
+        return self.__version
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def evictions(self) -> int:
+        """Count of entries removed due to cache size limit"""
+        return self.__evictions
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def expirations(self) -> int:
+        """Count of entries removed due to their age"""
+        return self.__expirations
+
+    # -----------------------------------------------------------------------------
+
+    def get(self, key: Hashable) -> object or None:
+        with self.__lock:
+            entry: Tuple[object, float or None, Hashable or None, object] or None = self.__entries.get(key)
+
+            if entry is None:
+                self.__misses += 1
+
+                return None
+
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                self.__remove(key)
+
+                self.__expirations += 1
+                self.__misses += 1
+
+                return None
+
+            self.__entries.move_to_end(key)
+
+            self.__hits += 1
+
+            return entry[0]
+
+    # -----------------------------------------------------------------------------
+
+    def set(
+        self,
+        key: Hashable,
+        value: object,
+        version: int or None = None,
+        group: Hashable or None = None,
+        tag: object or None = None,
+    ) -> bool:
+        """Store value, value loaded in older version of changed key is ignored"""
+        with self.__lock:
+            if version is not None and self.__is_outdated(key, version, group, tag):
+                return False
+
+            self.__remove(key)
+
+            self.__entries[key] = (
+                value,
+                time.monotonic() + self.__ttl if self.__ttl is not None else None,
+                group,
+                tag if tag is not None else self.__UNKNOWN,
+            )
+
+            if group is not None:
+                self.__groups.setdefault(group, set()).add(key)
+
+            while len(self.__entries) > self.__max_size:
+                self.__remove(next(iter(self.__entries)))
+
+                self.__evictions += 1
+
+            return True
+
+    # -----------------------------------------------------------------------------
+
+    def changed(self, key: Hashable, tag: object or None) -> None:
+        """Key data were changed to data with given tag, entry created from other data is removed"""
+        with self.__lock:
+            self.__record_change(key, tag)
+
+            entry: Tuple[object, float or None, Hashable or None, object] or None = self.__entries.get(key)
+
+            if entry is not None and (tag is None or entry[3] != tag):
+                self.__remove(key)
+
+    # -----------------------------------------------------------------------------
+
+    def invalidate(self, key: Hashable) -> None:
+        with self.__lock:
+            self.__record_change(key, self.__UNKNOWN)
+
+            self.__remove(key)
+
+    # -----------------------------------------------------------------------------
+
+    def invalidate_group(self, group: Hashable) -> None:
+        with self.__lock:
+            self.__version += 1
+            self.__groups_changes[group] = self.__version
+
+            for key in list(self.__groups.get(group, set())):
+                self.__remove(key)
+
+            self.__prune_changes()
+
+    # -----------------------------------------------------------------------------
+
+    def get_group_keys(self, group: Hashable) -> List[Hashable]:
+        with self.__lock:
+            return list(self.__groups.get(group, set()))
+
+    # -----------------------------------------------------------------------------
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+            self.__groups.clear()
+
+            self.__version += 1
+            self.__min_version = self.__version
+
+            self.__changes.clear()
+            self.__groups_changes.clear()
+
+    # -----------------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self.__entries),
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "evictions": self.__evictions,
+            "expirations": self.__expirations,
+        }
+
+    # -----------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    # -----------------------------------------------------------------------------
+
+    def __is_outdated(self, key: Hashable, version: int, group: Hashable or None, tag: object or None) -> bool:
+        if version < self.__min_version:
+            return True
+
+        change: Tuple[int, object] or None = self.__changes.get(key)
+
+        # Value loaded from same data as changed key has is still valid
+        if change is not None and change[0] > version and (tag is None or change[1] != tag):
+            return True
+
+        return group is not None and self.__groups_changes.get(group, 0) > version
+
+    # -----------------------------------------------------------------------------
+
+    def __record_change(self, key: Hashable, tag: object or None) -> None:
+        self.__version += 1
+        self.__changes[key] = (self.__version, tag if tag is not None else self.__UNKNOWN)
+
+        self.__prune_changes()
+
+    # -----------------------------------------------------------------------------
+
+    def __prune_changes(self) -> None:
+        # Changes are not kept forever, values loaded before pruning are refused instead
+        if len(self.__changes) + len(self.__groups_changes) > self.__max_size:
+            self.__changes.clear()
+            self.__groups_changes.clear()
+
+            self.__min_version = self.__version
+
+    # -----------------------------------------------------------------------------
+
+    def __remove(self, key: Hashable) -> None:
+        entry: Tuple[object, float or None, Hashable or None, object] or None = self.__entries.pop(key, None)
+
+        if entry is not None and entry[2] is not None:
+            keys: Set[Hashable] = self.__groups.get(entry[2], set())
+            keys.discard(key)
+
+            if len(keys) == 0:
+                self.__groups.pop(entry[2], None)
@@ -0,0 +1,552 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# App dependencies
+import logging
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue
+from threading import Lock, Thread
+from typing import Dict, List, Tuple
+from weakref import WeakSet
+
+log = logging.getLogger("metrics")
+
+
+#
+# Metrics exporter settings
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class MetricsSettings:
+    __enabled: bool = False
+    __host: str = "127.0.0.1"
+    __port: int = 9108
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, config: dict or None) -> None:
+        config = config if config is not None else {}
+
+        self.__enabled = bool(config.get("enabled", False))
+        self.__host = str(config.get("host", "127.0.0.1"))
+        self.__port = int(config.get("port", 9108))
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def host(self) -> str:
+        return self.__host
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def port(self) -> int:
+        return self.__port
+
+
+#
+# Cumulative histogram
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class Histogram:
+    """Histogram with fixed upper bounds, buckets are cumulated only when rendered"""
+
+    __bounds: Tuple[float, ...]
+    __counts: List[int]
+    __sum: float = 0.0
+
+    __lock: Lock
+
+    # Seconds, from 100us up to 10s
+    DEFAULT_BOUNDS: Tuple[float, ...] = (
+        0.0001,
+        0.00025,
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    )
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BOUNDS) -> None:
+        self.__bounds = bounds
+        # Last bucket is for values above highest bound
+        self.__counts = [0] * (len(bounds) + 1)
+        self.__sum = 0.0
+
+        self.__lock = Lock()
+
+    # -----------------------------------------------------------------------------
+
+    def observe(self, value: float) -> None:
+        index: int = bisect_left(self.__bounds, value)
+
+        with self.__lock:
+            self.__counts[index] += 1
+            self.__sum += value
+
+    # -----------------------------------------------------------------------------
+
+    def snapshot(self) -> Tuple[List[Tuple[str, int]], float, int]:
+        """Return cumulative buckets with their upper bounds, sum and count"""
+        with self.__lock:
+            counts: List[int] = list(self.__counts)
+            total: float = self.__sum
+
+        buckets: List[Tuple[str, int]] = []
+        cumulated: int = 0
+
+        for bound, count in zip(self.__bounds, counts):
+            cumulated += count
+            buckets.append((repr(bound), cumulated))
+
+        cumulated += counts[-1]
+        buckets.append(("+Inf", cumulated))
+
+        return buckets, total, cumulated
+
+
+#
+# Stage processing timer
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class StageTimer:
+    __slots__ = ("__stage", "__started")
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, stage: "StageMetrics") -> None:
+        self.__stage = stage
+        self.__started = 0.0
+
+    # -----------------------------------------------------------------------------
+
+    def __enter__(self) -> "StageTimer":
+        self.__started = time.monotonic()
+
+        return self
+
+    # -----------------------------------------------------------------------------
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.__stage.observe_processing(time.monotonic() - self.__started)
+
+
+#
+# Metrics of one pipeline stage
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class StageMetrics:
+    """
+    Queue depth, queue waiting time, processing time and throughput of pipeline stage
+
+    Stage could be fed by more queues (e.g. one queue per event listener), their
+    depths and drops are summed
+    """
+
+    __name: str
+    __registry: "MetricsRegistry"
+
+    __queues: WeakSet
+
+    __wait: Histogram
+    __processing: Histogram
+
+    __processed: int = 0
+
+    __rate: float = 0.0
+    __rate_window_start: float
+    __rate_window_processed: int = 0
+
+    __lock: Lock
+
+    __RATE_WINDOW: float = 10.0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, name: str, registry: "MetricsRegistry") -> None:
+        self.__name = name
+        self.__registry = registry
+
+        self.__queues = WeakSet()
+
+        self.__wait = Histogram()
+        self.__processing = Histogram()
+
+        self.__processed = 0
+
+        self.__rate = 0.0
+        self.__rate_window_start = time.monotonic()
+        self.__rate_window_processed = 0
+
+        self.__lock = Lock()
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def enabled(self) -> bool:
+        return self.__registry.enabled
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def processed(self) -> int:
+        return self.__processed
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in list(self.__queues))
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def dropped(self) -> int:
+        return sum(getattr(queue, "dropped", 0) for queue in list(self.__queues))
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def wait(self) -> Histogram:
+        return self.__wait
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def processing(self) -> Histogram:
+        return self.__processing
+
+    # -----------------------------------------------------------------------------
+
+    def watch_queue(self, queue: Queue) -> None:
+        """Include queue in stage depth, queue is released together with its owner"""
+        self.__queues.add(queue)
+
+    # -----------------------------------------------------------------------------
+
+    def observe_wait(self, seconds: float) -> None:
+        if self.__registry.enabled:
+            self.__wait.observe(seconds)
+
+    # -----------------------------------------------------------------------------
+
+    def observe_processing(self, seconds: float) -> None:
+        if not self.__registry.enabled:
+            return
+
+        self.__processing.observe(seconds)
+
+        with self.__lock:
+            self.__processed += 1
+
+    # -----------------------------------------------------------------------------
+
+    def measure(self) -> StageTimer:
+        """Context manager measuring processing time of one message"""
+        return StageTimer(self)
+
+    # -----------------------------------------------------------------------------
+
+    def rate(self) -> float:
+        """Processed messages per second averaged over last finished window"""
+        now: float = time.monotonic()
+
+        with self.__lock:
+            elapsed: float = now - self.__rate_window_start
+
+            if elapsed >= self.__RATE_WINDOW:
+                self.__rate = (self.__processed - self.__rate_window_processed) / elapsed
+
+                self.__rate_window_start = now
+                self.__rate_window_processed = self.__processed
+
+            return self.__rate
+
+
+#
+# Pipeline metrics registry
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class MetricsRegistry:
+    __enabled: bool = False
+
+    __stages: Dict[str, StageMetrics]
+
+    __lock: Lock
+
+    __PREFIX: str = "gateway_stage"
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self) -> None:
+        self.__stages = {}
+
+        self.__lock = Lock()
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    # -----------------------------------------------------------------------------
+
+    def set_enabled(self, enabled: bool) -> None:
+        """Disabled registry is not collecting observations"""
+        self.__enabled = enabled
+
+    # -----------------------------------------------------------------------------
+
+    def stage(self, name: str) -> StageMetrics:
+        """Get or create metrics of pipeline stage"""
+        stage: StageMetrics or None = self.__stages.get(name)
+
+        if stage is not None:
+            return stage
+
+        with self.__lock:
+            if name not in self.__stages:
+                self.__stages[name] = StageMetrics(name, self)
+
+            return self.__stages[name]
+
+    # -----------------------------------------------------------------------------
+
+    def stages(self) -> List[StageMetrics]:
+        return sorted(self.__stages.values(), key=lambda item: item.name)
+
+    # -----------------------------------------------------------------------------
+
+    def render(self) -> str:
+        """Render all stages in Prometheus text exposition format"""
+        stages: List[StageMetrics] = self.stages()
+
+        lines: List[str] = []
+
+        self.__render_gauge(
+            lines, "queue_depth", "Records waiting in stage queues", [(stage, stage.depth) for stage in stages]
+        )
+
+        self.__render_histogram(
+            lines,
+            "wait_seconds",
+            "Time between enqueuing and dequeuing of record",
+            [(stage, stage.wait) for stage in stages],
+        )
+
+        self.__render_histogram(
+            lines,
+            "processing_seconds",
+            "Time spent processing one record",
+            [(stage, stage.processing) for stage in stages],
+        )
+
+        self.__render_counter(
+            lines, "processed_total", "Records processed by stage", [(stage, stage.processed) for stage in stages]
+        )
+
+        self.__render_counter(
+            lines, "dropped_total", "Records dropped by stage queues", [(stage, stage.dropped) for stage in stages]
+        )
+
+        self.__render_gauge(
+            lines,
+            "messages_per_second",
+            "Processed records per second",
+            [(stage, stage.rate()) for stage in stages],
+        )
+
+        return "\n".join(lines) + "\n"
+
+    # -----------------------------------------------------------------------------
+
+    def __render_gauge(
+        self,
+        lines: List[str],
+        metric: str,
+        description: str,
+        values: List[Tuple[StageMetrics, int or float]],
+    ) -> None:
+        self.__render_simple(lines, metric, "gauge", description, values)
+
+    # -----------------------------------------------------------------------------
+
+    def __render_counter(
+        self,
+        lines: List[str],
+        metric: str,
+        description: str,
+        values: List[Tuple[StageMetrics, int or float]],
+    ) -> None:
+        self.__render_simple(lines, metric, "counter", description, values)
+
+    # -----------------------------------------------------------------------------
+
+    def __render_simple(
+        self,
+        lines: List[str],
+        metric: str,
+        metric_type: str,
+        description: str,
+        values: List[Tuple[StageMetrics, int or float]],
+    ) -> None:
+        name: str = "{}_{}".format(self.__PREFIX, metric)
+
+        lines.append("# HELP {} {}".format(name, description))
+        lines.append("# TYPE {} {}".format(name, metric_type))
+
+        for stage, value in values:
+            lines.append('{}{{stage="{}"}} {}'.format(name, stage.name, value))
+
+    # -----------------------------------------------------------------------------
+
+    def __render_histogram(
+        self,
+        lines: List[str],
+        metric: str,
+        description: str,
+        values: List[Tuple[StageMetrics, Histogram]],
+    ) -> None:
+        name: str = "{}_{}".format(self.__PREFIX, metric)
+
+        lines.append("# HELP {} {}".format(name, description))
+        lines.append("# TYPE {} histogram".format(name))
+
+        for stage, histogram in values:
+            buckets, total, count = histogram.snapshot()
+
+            for bound, cumulated in buckets:
+                lines.append('{}_bucket{{stage="{}",le="{}"}} {}'.format(name, stage.name, bound, cumulated))
+
+            lines.append('{}_sum{{stage="{}"}} {}'.format(name, stage.name, total))
+            lines.append('{}_count{{stage="{}"}} {}'.format(name, stage.name, count))
+
+
+#
+# Metrics HTTP request handler
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+
+            return
+
+        body: bytes = app_metrics.render().encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        self.wfile.write(body)
+
+    # -----------------------------------------------------------------------------
+
+    def log_message(self, format: str, *args) -> None:
+        log.debug(format % args)
+
+
+#
+# Metrics HTTP exporter
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class MetricsServer(Thread):
+    __server: ThreadingHTTPServer
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, settings: MetricsSettings) -> None:
+        super().__init__()
+
+        self.__server = ThreadingHTTPServer((settings.host, settings.port), MetricsRequestHandler)
+        self.__server.daemon_threads = True
+
+        # Threading config...
+        self.setDaemon(True)
+        self.setName("Metrics exporter thread")
+        # ...and starting
+        self.start()
+
+        log.info("Metrics are exposed on: http://{}:{}/metrics".format(settings.host, settings.port))
+
+    # -----------------------------------------------------------------------------
+
+    def run(self) -> None:
+        self.__server.serve_forever()
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+
+
+app_metrics = MetricsRegistry()
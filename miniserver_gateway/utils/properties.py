@@ -14,6 +14,9 @@
 #     See the License for the specific language governing permissions and
 #     limitations under the License.
 
+# App dependencies
+from typing import FrozenSet
+
 # App libs
 from miniserver_gateway.db.cache import DevicePropertyItem, ChannelPropertyItem
 from miniserver_gateway.db.types import DataType
@@ -52,8 +55,10 @@ class PropertiesUtils:
                 return value.lower() in ["true", "1", "t", "y", "yes", "on"]
 
             elif item.data_type == DataType.DATA_TYPE_ENUM:
-                if item.get_format() is not None and len(item.get_format()) > 0:
-                    if str(value) in item.get_format():
+                enum_values: FrozenSet[str] or None = item.get_format()
+
+                if enum_values is not None and len(enum_values) > 0:
+                    if str(value) in enum_values:
                         return str(value)
 
                     else:
@@ -0,0 +1,414 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# App dependencies
+import time
+from collections import deque
+from queue import Queue, Empty as QueueEmpty, Full as QueueFull
+from typing import Callable, Deque, Dict, Hashable, List, Tuple
+
+# App libs
+from miniserver_gateway.types.types import QueueOverflowPolicy
+from miniserver_gateway.utils.metrics import StageMetrics
+
+
+#
+# Worker shutdown queue item
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class ShutdownQueueItem:
+    """Sentinel used to wake up worker blocked on empty queue"""
+
+    pass
+
+
+#
+# Queue with coalescing of pending records
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class CoalescingQueue(Queue):
+    """
+    FIFO queue where a mergeable record replaces pending record with the same key
+
+    Record is replaced only when it is the latest queued record for its key,
+    so ordering of records with same key is kept
+    """
+
+    __key: Callable[[object], Hashable or None]
+    __mergeable: Tuple[type, ...]
+
+    __latest: Dict[Hashable, "CoalescingQueueEntry"]
+
+    __merged: int = 0
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        key: Callable[[object], Hashable or None] = lambda record: None,
+        mergeable: Tuple[type, ...] = (),
+    ) -> None:
+        self.__key = key
+        self.__mergeable = mergeable
+
+        self.__latest = {}
+        self.__merged = 0
+
+        super().__init__(maxsize)
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def merged(self) -> int:
+        """Count of records replaced by newer record"""
+        return self.__merged
+
+    # -----------------------------------------------------------------------------
+
+    def _init(self, maxsize: int) -> None:
+        self.queue: Deque[CoalescingQueueEntry] = deque()
+
+    # -----------------------------------------------------------------------------
+
+    def _qsize(self) -> int:
+        return len(self.queue)
+
+    # -----------------------------------------------------------------------------
+
+    def _put(self, record: object) -> None:
+        record_key: Hashable or None = self.__key(record)
+
+        if record_key is None:
+            self.queue.append(CoalescingQueueEntry(None, record))
+
+            return
+
+        if self._can_merge(record):
+            # Pending record is not processed yet, so it could be replaced
+            self.__latest[record_key].record = record
+
+            self.__merged += 1
+
+            return
+
+        entry = CoalescingQueueEntry(record_key, record)
+
+        self.queue.append(entry)
+        self.__latest[record_key] = entry
+
+    # -----------------------------------------------------------------------------
+
+    def _can_merge(self, record: object) -> bool:
+        """Check if record would replace pending record instead of taking new slot"""
+        if not isinstance(record, self.__mergeable):
+            return False
+
+        record_key: Hashable or None = self.__key(record)
+
+        if record_key is None:
+            return False
+
+        latest: CoalescingQueueEntry or None = self.__latest.get(record_key)
+
+        return latest is not None and type(latest.record) is type(record)
+
+    # -----------------------------------------------------------------------------
+
+    def _get(self) -> object:
+        return self._pop_entry().record
+
+    # -----------------------------------------------------------------------------
+
+    def _pop_entry(self) -> "CoalescingQueueEntry":
+        entry: CoalescingQueueEntry = self.queue.popleft()
+
+        if entry.key is not None and self.__latest.get(entry.key) is entry:
+            del self.__latest[entry.key]
+
+        return entry
+
+
+#
+# Pipeline queue settings
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class PipelineQueueSettings:
+    """Queues are filled from bus and listener threads, so by default producer is never blocked"""
+
+    __size: int = 1000
+    __policy: QueueOverflowPolicy = QueueOverflowPolicy.POLICY_DROP_OLDEST
+    __timeout: float = 0.1
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(
+        self,
+        config: dict or None,
+        policy: QueueOverflowPolicy = QueueOverflowPolicy.POLICY_DROP_OLDEST,
+    ) -> None:
+        config = config if config is not None else {}
+
+        self.__size = int(config.get("size", 1000))
+        self.__timeout = float(config.get("timeout", 0.1))
+
+        if QueueOverflowPolicy.has_value(str(config.get("policy", ""))):
+            self.__policy = QueueOverflowPolicy(config.get("policy"))
+
+        else:
+            self.__policy = policy
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def policy(self) -> QueueOverflowPolicy:
+        return self.__policy
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def timeout(self) -> float:
+        """Maximal waiting time for free slot with blocking policy"""
+        return self.__timeout
+
+
+#
+# Pipeline queue with overflow policy
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class PipelineQueue(CoalescingQueue):
+    __settings: PipelineQueueSettings
+
+    __dropped: int = 0
+
+    __waker: Callable[[], None] or None = None
+
+    __metrics: StageMetrics or None = None
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(
+        self,
+        settings: PipelineQueueSettings,
+        key: Callable[[object], Hashable or None] = lambda record: None,
+        mergeable: Tuple[type, ...] = (),
+        metrics: StageMetrics or None = None,
+    ) -> None:
+        self.__settings = settings
+        self.__dropped = 0
+        self.__waker = None
+        self.__metrics = metrics
+
+        # Records are merged only with coalescing policy
+        super().__init__(
+            settings.size,
+            key,
+            mergeable if settings.policy == QueueOverflowPolicy.POLICY_COALESCE else (),
+        )
+
+        if metrics is not None:
+            metrics.watch_queue(self)
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def dropped(self) -> int:
+        """Count of records dropped due to queue overflow"""
+        return self.__dropped
+
+    # -----------------------------------------------------------------------------
+
+    @property
+    def policy(self) -> QueueOverflowPolicy:
+        return self.__settings.policy
+
+    # -----------------------------------------------------------------------------
+
+    def set_waker(self, waker: Callable[[], None] or None) -> None:
+        """Set callback invoked after each put, used by consumers which are not blocked on get"""
+        self.__waker = waker
+
+    # -----------------------------------------------------------------------------
+
+    def enqueue(self, record: object) -> None:
+        """Add record to queue according to overflow policy, raise QueueFull when new record is dropped"""
+        if self.__settings.policy == QueueOverflowPolicy.POLICY_BLOCK:
+            try:
+                self.put(record, timeout=self.__settings.timeout)
+
+            except QueueFull:
+                with self.not_full:
+                    self.__dropped += 1
+
+                raise
+
+            return
+
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize() and not self._can_merge(record):
+                if self.__settings.policy == QueueOverflowPolicy.POLICY_DROP_OLDEST:
+                    self._pop_entry()
+
+                else:
+                    self.__dropped += 1
+
+                    raise QueueFull
+
+                self.__dropped += 1
+
+            self._put(record)
+
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    # -----------------------------------------------------------------------------
+
+    def _put(self, record: object) -> None:
+        super()._put(record)
+
+        if self.__waker is not None:
+            self.__waker()
+
+    # -----------------------------------------------------------------------------
+
+    def _get(self) -> object:
+        entry: CoalescingQueueEntry = self._pop_entry()
+
+        if self.__metrics is not None and not isinstance(entry.record, ShutdownQueueItem):
+            self.__metrics.observe_wait(time.monotonic() - entry.enqueued)
+
+        return entry.record
+
+
+#
+# Coalescing queue entry
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class CoalescingQueueEntry:
+    __slots__ = ("key", "record", "enqueued")
+
+    key: Hashable or None
+    record: object
+    # Merged record keeps time of the first enqueued one
+    enqueued: float
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, key: Hashable or None, record: object) -> None:
+        self.key = key
+        self.record = record
+        self.enqueued = time.monotonic()
+
+
+#
+# Worker queues utils
+#
+# @package        FastyBird:MiniServer!
+# @subpackage     Utils
+#
+# @author         Adam Kadlec <adam.kadlec@fastybird.com>
+#
+class QueueUtils:
+    @staticmethod
+    def consume(queue: Queue) -> List[object]:
+        """Block until at least one record is queued and return all records queued so far"""
+        records: List[object] = [queue.get()]
+
+        return [record for record in records + QueueUtils.drain(queue) if not isinstance(record, ShutdownQueueItem)]
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def collect(queue: Queue, max_records: int, max_wait: float) -> List[object]:
+        """Block until at least one record is queued and wait for more records up to given count or time"""
+        records: List[object] = []
+
+        record: object = queue.get()
+
+        deadline: float = time.monotonic() + max_wait
+
+        while not isinstance(record, ShutdownQueueItem):
+            records.append(record)
+
+            remaining: float = deadline - time.monotonic()
+
+            if len(records) >= max_records:
+                break
+
+            try:
+                record = queue.get_nowait() if remaining <= 0 else queue.get(timeout=remaining)
+
+            except QueueEmpty:
+                break
+
+        return records
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def drain(queue: Queue) -> List[object]:
+        """Return all records queued so far without waiting"""
+        records: List[object] = []
+
+        while True:
+            try:
+                record: object = queue.get_nowait()
+
+            except QueueEmpty:
+                break
+
+            if not isinstance(record, ShutdownQueueItem):
+                records.append(record)
+
+        return records
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def wake_up(queue: Queue) -> None:
+        """Wake up worker waiting for records"""
+        try:
+            queue.put_nowait(ShutdownQueueItem())
+
+        except QueueFull:
+            # Queue is full, so worker is not waiting
+            pass
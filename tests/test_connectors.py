@@ -0,0 +1,323 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""
+Connectors records are written to in-memory SQLite database, which is bound once for all tests
+"""
+
+# Test dependencies
+import time
+import unittest
+import uuid
+from pony.orm import core as orm
+from typing import List, Tuple
+
+# Library libs
+from miniserver_gateway.connectors.connectors import (
+    ConnectorInterface,
+    Connectors,
+    DevicesStatesWriter,
+    RecordsFingerprints,
+)
+from miniserver_gateway.connectors.queue import (
+    CreateOrUpdateChannelPropertyQueueItem,
+    CreateOrUpdateDeviceQueueItem,
+    UpdatePropertyExpectedQueueItem,
+)
+from miniserver_gateway.db.cache import ChannelPropertyItem
+from miniserver_gateway.db.models import db, ChannelPropertyEntity, ConnectorEntity, DeviceEntity
+from miniserver_gateway.db.types import DataType, DeviceStates
+from miniserver_gateway.events.dispatcher import app_dispatcher
+from miniserver_gateway.utils.libraries import LibrariesUtils
+
+if db.provider is None:
+    db.bind(provider="sqlite", filename=":sharedmemory:")
+    db.generate_mapping(create_tables=True)
+
+
+class RecordingConnector(ConnectorInterface):
+    """Connector recording published values together with property existence in database"""
+
+    published: List[Tuple[uuid.UUID, bool or int or float or str or None, bool]] = []
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self, container: Connectors, connector: ConnectorEntity) -> None:
+        super().__init__()
+
+    # -----------------------------------------------------------------------------
+
+    def open(self) -> None:
+        pass
+
+    # -----------------------------------------------------------------------------
+
+    def close(self) -> None:
+        pass
+
+    # -----------------------------------------------------------------------------
+
+    @orm.db_session
+    def publish(self, property_id: uuid.UUID, expected: bool or int or float or str or None) -> str:
+        self.published.append((property_id, expected, ChannelPropertyEntity.get(property_id=property_id) is not None))
+
+        return "ok"
+
+
+class TestDevicesStatesWriter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.written: List[Tuple[uuid.UUID, DeviceStates]] = []
+        self.accepted: bool = True
+
+        self.writer = DevicesStatesWriter(self.__write, interval=60.0)
+
+        self.device_id: uuid.UUID = uuid.uuid4()
+
+    # -----------------------------------------------------------------------------
+
+    def test_only_last_state_is_written_on_close(self) -> None:
+        self.writer.update(self.__create_record(DeviceStates.STATE_INIT))
+        self.writer.update(self.__create_record(DeviceStates.STATE_READY))
+        self.writer.update(self.__create_record(DeviceStates.STATE_RUNNING))
+
+        self.assertEqual([], self.written)
+
+        self.writer.close()
+
+        self.assertEqual([(self.device_id, DeviceStates.STATE_RUNNING)], self.written)
+
+    # -----------------------------------------------------------------------------
+
+    def test_written_state_is_not_written_again(self) -> None:
+        record: CreateOrUpdateDeviceQueueItem = self.__create_record(DeviceStates.STATE_RUNNING)
+
+        self.writer.update(record)
+        self.writer.flush()
+        self.writer.persisted(record)
+
+        # Device returned to written state before pending one was flushed
+        self.writer.update(self.__create_record(DeviceStates.STATE_SLEEPING))
+        self.writer.update(self.__create_record(DeviceStates.STATE_RUNNING))
+
+        self.writer.close()
+
+        self.assertEqual([(self.device_id, DeviceStates.STATE_RUNNING)], self.written)
+
+    # -----------------------------------------------------------------------------
+
+    def test_refused_state_is_written_again(self) -> None:
+        self.accepted = False
+
+        self.writer.update(self.__create_record(DeviceStates.STATE_RUNNING))
+        self.writer.flush()
+
+        self.accepted = True
+
+        self.writer.close()
+
+        self.assertEqual([(self.device_id, DeviceStates.STATE_RUNNING)] * 2, self.written)
+
+    # -----------------------------------------------------------------------------
+
+    def test_replaced_state_is_not_written(self) -> None:
+        self.writer.update(self.__create_record(DeviceStates.STATE_SLEEPING))
+        self.writer.replaced(self.device_id, DeviceStates.STATE_RUNNING)
+
+        self.writer.close()
+
+        self.assertEqual([], self.written)
+
+    # -----------------------------------------------------------------------------
+
+    def __write(self, record: CreateOrUpdateDeviceQueueItem) -> bool:
+        self.written.append((record.device_id, record.state))
+
+        return self.accepted
+
+    # -----------------------------------------------------------------------------
+
+    def __create_record(self, state: str) -> CreateOrUpdateDeviceQueueItem:
+        return CreateOrUpdateDeviceQueueItem(uuid.uuid4(), self.device_id, "device", DeviceStates(state))
+
+
+class TestRecordsFingerprints(unittest.TestCase):
+    def test_stored_record_matches_until_ttl_expires(self) -> None:
+        fingerprints = RecordsFingerprints(ttl=0.1)
+
+        record: CreateOrUpdateChannelPropertyQueueItem = create_property_record(uuid.uuid4(), uuid.uuid4(), "°C")
+
+        self.assertFalse(fingerprints.matches(record))
+
+        fingerprints.store(record)
+
+        self.assertTrue(fingerprints.matches(record))
+        self.assertFalse(
+            fingerprints.matches(create_property_record(record.device_id, record.property_id, "°F", record.channel_id))
+        )
+
+        time.sleep(0.15)
+
+        self.assertFalse(fingerprints.matches(record))
+        self.assertEqual(1, fingerprints.skipped)
+
+    # -----------------------------------------------------------------------------
+
+    def test_fingerprints_are_disabled_by_zero_ttl(self) -> None:
+        fingerprints = RecordsFingerprints(ttl=0)
+
+        record: CreateOrUpdateChannelPropertyQueueItem = create_property_record(uuid.uuid4(), uuid.uuid4(), "°C")
+
+        fingerprints.store(record)
+
+        self.assertFalse(fingerprints.matches(record))
+
+    # -----------------------------------------------------------------------------
+
+    def test_invalidated_record_does_not_match(self) -> None:
+        fingerprints = RecordsFingerprints()
+
+        record: CreateOrUpdateChannelPropertyQueueItem = create_property_record(uuid.uuid4(), uuid.uuid4(), "°C")
+
+        fingerprints.store(record)
+        fingerprints.invalidate(record.property_id)
+
+        self.assertFalse(fingerprints.matches(record))
+
+
+class TestConnectorsRecords(unittest.TestCase):
+    def setUp(self) -> None:
+        # Changes events are delivered before writing method returns
+        app_dispatcher.set_synchronous(True)
+
+        LibrariesUtils.loaded_connector_libraries["RecordingConnector"] = RecordingConnector
+
+        RecordingConnector.published = []
+
+        with orm.db_session:
+            self.connector_id: uuid.UUID = ConnectorEntity(name="recording", type="recording").connector_id
+
+        self.connectors = Connectors(
+            [{"type": "recording", "class": "RecordingConnector"}],
+            {"batch_size": 10},
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def tearDown(self) -> None:
+        self.connectors.close()
+
+        with orm.db_session:
+            ConnectorEntity[self.connector_id].delete()
+
+        app_dispatcher.set_synchronous(False)
+
+    # -----------------------------------------------------------------------------
+
+    def test_failed_batch_is_written_record_by_record(self) -> None:
+        first_id: uuid.UUID = uuid.uuid4()
+        failing_id: uuid.UUID = uuid.uuid4()
+        last_id: uuid.UUID = uuid.uuid4()
+
+        self.connectors.process_records(
+            [
+                self.__create_device_record(first_id),
+                # Device of unknown connector could not be created
+                CreateOrUpdateDeviceQueueItem(uuid.uuid4(), failing_id, failing_id.__str__(), DeviceStates.STATE_INIT),
+                self.__create_device_record(last_id),
+            ]
+        )
+
+        with orm.db_session:
+            self.assertIsNotNone(DeviceEntity.get(device_id=first_id))
+            self.assertIsNone(DeviceEntity.get(device_id=failing_id))
+            self.assertIsNotNone(DeviceEntity.get(device_id=last_id))
+
+    # -----------------------------------------------------------------------------
+
+    def test_expected_value_is_published_after_previous_records_are_written(self) -> None:
+        device_id: uuid.UUID = uuid.uuid4()
+
+        record: CreateOrUpdateChannelPropertyQueueItem = create_property_record(device_id, uuid.uuid4(), "°C")
+
+        self.connectors.process_records(
+            [
+                self.__create_device_record(device_id),
+                record,
+                UpdatePropertyExpectedQueueItem(create_property_item(record), 21.5),
+            ]
+        )
+
+        self.assertEqual([(record.property_id, 21.5, True)], RecordingConnector.published)
+
+    # -----------------------------------------------------------------------------
+
+    def test_record_is_written_again_when_entity_is_changed_by_other_writer(self) -> None:
+        device_id: uuid.UUID = uuid.uuid4()
+
+        record: CreateOrUpdateChannelPropertyQueueItem = create_property_record(device_id, uuid.uuid4(), "°C")
+
+        self.connectors.process_records([self.__create_device_record(device_id), record])
+
+        # Change is made outside of connectors session
+        with orm.db_session:
+            ChannelPropertyEntity.get(property_id=record.property_id).unit = "°F"
+
+        self.connectors.process_records([record])
+
+        with orm.db_session:
+            self.assertEqual("°C", ChannelPropertyEntity.get(property_id=record.property_id).unit)
+
+    # -----------------------------------------------------------------------------
+
+    def __create_device_record(self, device_id: uuid.UUID) -> CreateOrUpdateDeviceQueueItem:
+        return CreateOrUpdateDeviceQueueItem(
+            self.connector_id, device_id, device_id.__str__(), DeviceStates(DeviceStates.STATE_RUNNING)
+        )
+
+
+def create_property_record(
+    device_id: uuid.UUID, property_id: uuid.UUID, unit: str, channel_id: uuid.UUID or None = None
+) -> CreateOrUpdateChannelPropertyQueueItem:
+    return CreateOrUpdateChannelPropertyQueueItem(
+        device_id=device_id,
+        channel_id=channel_id if channel_id is not None else uuid.uuid4(),
+        channel_identifier="channel",
+        property_id=property_id,
+        property_identifier="property",
+        settable=True,
+        queryable=True,
+        data_type=DataType(DataType.DATA_TYPE_FLOAT),
+        unit=unit,
+    )
+
+
+def create_property_item(record: CreateOrUpdateChannelPropertyQueueItem) -> ChannelPropertyItem:
+    return ChannelPropertyItem(
+        record.property_id,
+        record.property_identifier,
+        record.key,
+        True,
+        True,
+        DataType(DataType.DATA_TYPE_FLOAT),
+        None,
+        record.attributes.get("unit"),
+        record.device_id,
+        record.channel_id,
+    )
+
+
+if __name__ == "__main__":
+    unittest.main()
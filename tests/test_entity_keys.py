@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# Test dependencies
+import random
+import unittest
+from threading import Thread
+from typing import List
+
+# Library libs
+from miniserver_gateway.db.utils import EntityKeyGenerator, EntityKeyHash
+
+
+class TestEntityKeyHash(unittest.TestCase):
+    def test_round_trip_on_length_boundaries(self) -> None:
+        samples: List[int] = [0, 1, EntityKeyHash.BASE - 1, EntityKeyHash.BASE]
+
+        for exponent in range(EntityKeyHash.MAX_LEN, 20):
+            boundary: int = EntityKeyHash.BASE**exponent - EntityKeyHash.BASE ** (EntityKeyHash.MAX_LEN - 1)
+
+            samples.extend([boundary - 1, boundary, boundary + 1])
+
+        for sample in samples:
+            key: str = EntityKeyHash.encode(sample)
+
+            self.assertEqual(sample, EntityKeyHash.decode(key))
+            self.assertGreaterEqual(len(key), EntityKeyHash.MAX_LEN)
+
+    # -----------------------------------------------------------------------------
+
+    def test_round_trip_of_random_numbers(self) -> None:
+        rnd = random.Random(2021)
+
+        for _ in range(10000):
+            sample: int = rnd.getrandbits(rnd.randint(1, 96))
+
+            self.assertEqual(sample, EntityKeyHash.decode(EntityKeyHash.encode(sample)))
+
+    # -----------------------------------------------------------------------------
+
+    def test_encode_many_matches_encode(self) -> None:
+        rnd = random.Random(2021)
+
+        samples: List[int] = [rnd.getrandbits(64) for _ in range(1000)] + [0, EntityKeyHash.BASE]
+
+        self.assertEqual([EntityKeyHash.encode(sample) for sample in samples], EntityKeyHash.encode_many(samples))
+
+
+class TestEntityKeyGenerator(unittest.TestCase):
+    def test_keys_are_unique_and_monotonic_across_threads(self) -> None:
+        generator = EntityKeyGenerator()
+
+        results: List[List[str]] = [[] for _ in range(4)]
+
+        def produce(index: int) -> None:
+            for _ in range(2000):
+                results[index].append(generator.generate())
+
+            results[index].extend(generator.generate_many(5000))
+
+        threads: List[Thread] = [Thread(target=produce, args=(index,)) for index in range(len(results))]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        keys: List[str] = [key for result in results for key in result]
+
+        self.assertEqual(len(keys), len(set(keys)))
+
+        for result in results:
+            numbers: List[int] = [EntityKeyHash.decode(key) for key in result]
+
+            self.assertEqual(sorted(numbers), numbers)
+            self.assertEqual(len(numbers), len(set(numbers)))
+
+    # -----------------------------------------------------------------------------
+
+    def test_nodes_do_not_collide(self) -> None:
+        first: List[int] = EntityKeyGenerator(node=1).generate_numbers(10000)
+        second: List[int] = EntityKeyGenerator(node=2).generate_numbers(10000)
+
+        self.assertEqual(0, len(set(first) & set(second)))
+
+        for number in first:
+            self.assertEqual(1, number & EntityKeyGenerator.MAX_NODE)
+
+    # -----------------------------------------------------------------------------
+
+    def test_invalid_node_is_refused(self) -> None:
+        with self.assertRaises(ValueError):
+            EntityKeyGenerator(node=EntityKeyGenerator.MAX_NODE + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# Test dependencies
+import threading
+import unittest
+from typing import List, Tuple
+from whistle import Event
+
+# Library libs
+from miniserver_gateway.events.dispatcher import AsyncEventDispatcher
+from miniserver_gateway.utils.queue import PipelineQueueSettings
+
+
+class NumberEvent(Event):
+    def __init__(self, number: int) -> None:
+        self.number = number
+
+
+class Recorder:
+    received: List[Tuple[str, int]]
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self) -> None:
+        self.received = []
+
+    # -----------------------------------------------------------------------------
+
+    def first(self, event: NumberEvent) -> None:
+        self.received.append(("first", event.number))
+
+    # -----------------------------------------------------------------------------
+
+    def second(self, event: NumberEvent) -> None:
+        self.received.append(("second", event.number))
+
+    # -----------------------------------------------------------------------------
+
+    def stopping(self, event: NumberEvent) -> None:
+        self.received.append(("stopping", event.number))
+
+        event.stop_propagation()
+
+
+class BlockingRecorder:
+    received: List[int]
+
+    started: threading.Event
+    released: threading.Event
+
+    # -----------------------------------------------------------------------------
+
+    def __init__(self) -> None:
+        self.received = []
+
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    # -----------------------------------------------------------------------------
+
+    def handle(self, event: NumberEvent) -> None:
+        self.started.set()
+        self.released.wait(5.0)
+
+        self.received.append(event.number)
+
+
+class TestSynchronousDispatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dispatcher = AsyncEventDispatcher(synchronous=True)
+
+    # -----------------------------------------------------------------------------
+
+    def tearDown(self) -> None:
+        self.dispatcher.close()
+
+    # -----------------------------------------------------------------------------
+
+    def test_listeners_are_called_in_ascending_priority_order(self) -> None:
+        recorder = Recorder()
+
+        self.dispatcher.add_listener("number", recorder.second, priority=10)
+        self.dispatcher.add_listener("number", recorder.first, priority=-10)
+
+        self.dispatcher.dispatch("number", NumberEvent(1))
+
+        self.assertEqual([("first", 1), ("second", 1)], recorder.received)
+        self.assertEqual([recorder.first, recorder.second], self.dispatcher.get_listeners("number"))
+
+    # -----------------------------------------------------------------------------
+
+    def test_event_is_delivered_in_producer_thread(self) -> None:
+        threads: List[threading.Thread] = []
+
+        self.dispatcher.add_listener("number", lambda event: threads.append(threading.current_thread()))
+
+        self.dispatcher.dispatch("number", NumberEvent(1))
+
+        self.assertEqual([threading.current_thread()], threads)
+
+    # -----------------------------------------------------------------------------
+
+    def test_dispatched_event_is_named(self) -> None:
+        event: Event = self.dispatcher.dispatch("number")
+
+        self.assertIs(self.dispatcher, event.dispatcher)
+        self.assertEqual("number", event.name)
+
+    # -----------------------------------------------------------------------------
+
+    def test_stopped_propagation_skips_remaining_listeners(self) -> None:
+        recorder = Recorder()
+
+        self.dispatcher.add_listener("number", recorder.stopping)
+        self.dispatcher.add_listener("number", recorder.second)
+
+        self.dispatcher.dispatch("number", NumberEvent(1))
+
+        self.assertEqual([("stopping", 1)], recorder.received)
+
+    # -----------------------------------------------------------------------------
+
+    def test_removed_listener_is_not_called(self) -> None:
+        recorder = Recorder()
+
+        self.dispatcher.add_listener("number", recorder.first)
+        self.dispatcher.add_listener("number", recorder.second)
+        self.dispatcher.remove_listener("number", recorder.first)
+
+        self.dispatcher.dispatch("number", NumberEvent(1))
+
+        self.assertEqual([("second", 1)], recorder.received)
+
+
+class TestAsyncDispatcher(unittest.TestCase):
+    def test_events_order_is_kept_across_listeners_of_one_object(self) -> None:
+        dispatcher = AsyncEventDispatcher()
+
+        recorder = Recorder()
+
+        dispatcher.add_listener("first", recorder.first)
+        dispatcher.add_listener("second", recorder.second)
+
+        for number in range(100):
+            dispatcher.dispatch("first" if number % 2 == 0 else "second", NumberEvent(number))
+
+        dispatcher.close()
+
+        self.assertEqual(
+            [("first" if number % 2 == 0 else "second", number) for number in range(100)],
+            recorder.received,
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def test_listener_is_called_in_own_thread(self) -> None:
+        dispatcher = AsyncEventDispatcher()
+
+        threads: List[threading.Thread] = []
+
+        dispatcher.add_listener("number", lambda event: threads.append(threading.current_thread()))
+
+        dispatcher.dispatch("number", NumberEvent(1))
+        dispatcher.close()
+
+        self.assertEqual(1, len(threads))
+        self.assertIsNot(threading.current_thread(), threads[0])
+
+    # -----------------------------------------------------------------------------
+
+    def test_queued_events_of_removed_listener_are_dropped(self) -> None:
+        dispatcher = AsyncEventDispatcher()
+
+        blocking = BlockingRecorder()
+
+        # Both listeners are delivered by one worker, queued events wait for blocked one
+        dispatcher.add_listener("block", blocking.handle)
+        dispatcher.add_listener("number", blocking.handle)
+
+        dispatcher.dispatch("block", NumberEvent(0))
+
+        self.assertTrue(blocking.started.wait(5.0))
+
+        dispatcher.dispatch("number", NumberEvent(1))
+        dispatcher.remove_listener("number", blocking.handle)
+
+        blocking.released.set()
+        dispatcher.close()
+
+        self.assertEqual([0], blocking.received)
+
+    # -----------------------------------------------------------------------------
+
+    def test_full_queue_drops_oldest_events_by_default(self) -> None:
+        self.assertEqual([0, 3, 4], self.__dispatch_to_full_queue({"size": 2}))
+
+    # -----------------------------------------------------------------------------
+
+    def test_full_queue_drops_newest_events(self) -> None:
+        self.assertEqual([0, 1, 2], self.__dispatch_to_full_queue({"size": 2, "policy": "drop_newest"}))
+
+    # -----------------------------------------------------------------------------
+
+    @staticmethod
+    def __dispatch_to_full_queue(queue_config: dict) -> List[int]:
+        dispatcher = AsyncEventDispatcher()
+        dispatcher.configure(PipelineQueueSettings(queue_config))
+
+        blocking = BlockingRecorder()
+
+        dispatcher.add_listener("number", blocking.handle)
+
+        # First event is taken by worker, its queue is filled by the next ones
+        dispatcher.dispatch("number", NumberEvent(0))
+
+        blocking.started.wait(5.0)
+
+        for number in range(1, 5):
+            dispatcher.dispatch("number", NumberEvent(number))
+
+        blocking.released.set()
+        dispatcher.close()
+
+        return blocking.received
+
+
+if __name__ == "__main__":
+    unittest.main()
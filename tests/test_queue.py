@@ -0,0 +1,221 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+# Test dependencies
+import threading
+import time
+import unittest
+from queue import Full as QueueFull, Queue
+from typing import Hashable, List
+
+# Library libs
+from miniserver_gateway.types.types import QueueOverflowPolicy
+from miniserver_gateway.utils.queue import (
+    CoalescingQueue,
+    PipelineQueue,
+    PipelineQueueSettings,
+    QueueUtils,
+    ShutdownQueueItem,
+)
+
+
+class ValueRecord:
+    def __init__(self, key: str, value: int) -> None:
+        self.key = key
+        self.value = value
+
+    # -----------------------------------------------------------------------------
+
+    def __repr__(self) -> str:
+        return "{}={}".format(self.key, self.value)
+
+
+class BarrierRecord(ValueRecord):
+    pass
+
+
+def record_key(record: object) -> Hashable or None:
+    return record.key if isinstance(record, ValueRecord) else None
+
+
+class TestCoalescingQueue(unittest.TestCase):
+    def test_pending_record_is_replaced_in_place(self) -> None:
+        queue = CoalescingQueue(key=record_key, mergeable=(ValueRecord,))
+
+        for record in (ValueRecord("a", 1), ValueRecord("b", 1), ValueRecord("a", 2)):
+            queue.put(record)
+
+        self.assertEqual(["a=2", "b=1"], [repr(record) for record in QueueUtils.drain(queue)])
+        self.assertEqual(1, queue.merged)
+
+    # -----------------------------------------------------------------------------
+
+    def test_record_is_not_merged_over_other_record_type(self) -> None:
+        queue = CoalescingQueue(key=record_key, mergeable=(ValueRecord,))
+
+        for record in (ValueRecord("a", 1), BarrierRecord("a", 2), ValueRecord("a", 3)):
+            queue.put(record)
+
+        self.assertEqual(["a=1", "a=2", "a=3"], [repr(record) for record in QueueUtils.drain(queue)])
+        self.assertEqual(0, queue.merged)
+
+    # -----------------------------------------------------------------------------
+
+    def test_record_taken_by_worker_is_not_replaced(self) -> None:
+        queue = CoalescingQueue(key=record_key, mergeable=(ValueRecord,))
+
+        queue.put(ValueRecord("a", 1))
+
+        self.assertEqual("a=1", repr(queue.get()))
+
+        queue.put(ValueRecord("a", 2))
+
+        self.assertEqual(["a=2"], [repr(record) for record in QueueUtils.drain(queue)])
+        self.assertEqual(0, queue.merged)
+
+    # -----------------------------------------------------------------------------
+
+    def test_full_queue_accepts_only_merged_records(self) -> None:
+        queue = PipelineQueue(
+            PipelineQueueSettings({"size": 2}, QueueOverflowPolicy(QueueOverflowPolicy.POLICY_COALESCE)),
+            key=record_key,
+            mergeable=(ValueRecord,),
+        )
+
+        queue.enqueue(ValueRecord("a", 1))
+        queue.enqueue(ValueRecord("b", 1))
+        queue.enqueue(ValueRecord("a", 2))
+
+        with self.assertRaises(QueueFull):
+            queue.enqueue(ValueRecord("c", 1))
+
+        self.assertEqual(["a=2", "b=1"], [repr(record) for record in QueueUtils.drain(queue)])
+        self.assertEqual(1, queue.merged)
+        self.assertEqual(1, queue.dropped)
+
+    # -----------------------------------------------------------------------------
+
+    def test_records_are_not_merged_without_coalesce_policy(self) -> None:
+        queue = PipelineQueue(PipelineQueueSettings({"size": 2}), key=record_key, mergeable=(ValueRecord,))
+
+        for value in range(3):
+            queue.enqueue(ValueRecord("a", value))
+
+        self.assertEqual(["a=1", "a=2"], [repr(record) for record in QueueUtils.drain(queue)])
+        self.assertEqual(0, queue.merged)
+        self.assertEqual(1, queue.dropped)
+
+
+class TestQueueUtils(unittest.TestCase):
+    def test_consume_returns_all_queued_records_without_sentinel(self) -> None:
+        queue: Queue = Queue()
+
+        for record in (1, ShutdownQueueItem(), 2, 3):
+            queue.put(record)
+
+        self.assertEqual([1, 2, 3], QueueUtils.consume(queue))
+        self.assertTrue(queue.empty())
+
+    # -----------------------------------------------------------------------------
+
+    def test_consume_is_woken_up_by_sentinel(self) -> None:
+        queue: Queue = Queue()
+
+        consumed: List[List[object]] = []
+
+        consumer = threading.Thread(target=lambda: consumed.append(QueueUtils.consume(queue)))
+        consumer.start()
+
+        QueueUtils.wake_up(queue)
+
+        consumer.join(5.0)
+
+        self.assertFalse(consumer.is_alive())
+        self.assertEqual([[]], consumed)
+
+    # -----------------------------------------------------------------------------
+
+    def test_wake_up_ignores_full_queue(self) -> None:
+        queue: Queue = Queue(maxsize=1)
+        queue.put(1)
+
+        QueueUtils.wake_up(queue)
+
+        self.assertEqual([1], QueueUtils.drain(queue))
+
+    # -----------------------------------------------------------------------------
+
+    def test_collect_stops_at_max_records(self) -> None:
+        queue: Queue = Queue()
+
+        for record in range(5):
+            queue.put(record)
+
+        self.assertEqual([0, 1, 2], QueueUtils.collect(queue, max_records=3, max_wait=5.0))
+        self.assertEqual([3, 4], QueueUtils.drain(queue))
+
+    # -----------------------------------------------------------------------------
+
+    def test_collect_stops_at_sentinel(self) -> None:
+        queue: Queue = Queue()
+
+        for record in (1, 2, ShutdownQueueItem(), 3):
+            queue.put(record)
+
+        self.assertEqual([1, 2], QueueUtils.collect(queue, max_records=10, max_wait=5.0))
+        self.assertEqual([3], QueueUtils.drain(queue))
+
+    # -----------------------------------------------------------------------------
+
+    def test_collect_waits_for_more_records_until_deadline(self) -> None:
+        queue: Queue = Queue()
+
+        producer = threading.Timer(0.05, queue.put, (2,))
+        late_producer = threading.Timer(0.5, queue.put, (3,))
+
+        queue.put(1)
+
+        producer.start()
+        late_producer.start()
+
+        started: float = time.monotonic()
+
+        self.assertEqual([1, 2], QueueUtils.collect(queue, max_records=10, max_wait=0.2))
+        self.assertLess(time.monotonic() - started, 0.45)
+
+        late_producer.join()
+
+        self.assertEqual([3], QueueUtils.drain(queue))
+
+    # -----------------------------------------------------------------------------
+
+    def test_collect_deadline_starts_with_first_record(self) -> None:
+        queue: Queue = Queue()
+
+        # Worker is waiting for first record longer than is the collecting window
+        producer = threading.Timer(0.2, queue.put, (1,))
+        next_producer = threading.Timer(0.25, queue.put, (2,))
+
+        producer.start()
+        next_producer.start()
+
+        self.assertEqual([1, 2], QueueUtils.collect(queue, max_records=10, max_wait=0.15))
+
+        next_producer.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+#!/usr/bin/python3
+
+#     Copyright 2021. FastyBird s.r.o.
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""
+Storage write scripts are executed by real Redis server, tests are skipped when server is not
+reachable. Server is configured by REDIS_HOST and REDIS_PORT environment variables.
+"""
+
+# Test dependencies
+import os
+import unittest
+import uuid
+from redis import Redis, RedisError
+from typing import List, Tuple
+
+# Library libs
+from miniserver_gateway.db.cache import ChannelPropertyItem
+from miniserver_gateway.db.types import DataType
+from miniserver_gateway.storages.redis import RedisStorage, RedisStorageSettings
+from miniserver_gateway.storages.storages import StorageItem
+
+REDIS_HOST: str = os.environ.get("REDIS_HOST", "127.0.0.1")
+REDIS_PORT: int = int(os.environ.get("REDIS_PORT", 6379))
+
+
+def redis_available() -> bool:
+    try:
+        return bool(Redis(host=REDIS_HOST, port=REDIS_PORT, socket_connect_timeout=0.5).ping())
+
+    except RedisError:
+        return False
+
+
+# Writes are (mode, value), mode is "value" or "expected"
+Writes = List[Tuple[str, int or float or str or bool or None]]
+Results = List[Tuple[bool, Tuple[int or float or str or bool or None, int or float or str or bool or None, bool]]]
+
+
+@unittest.skipUnless(redis_available(), "Redis server is not reachable")
+class RedisScriptsTestCase(unittest.TestCase):
+    LAYOUT: str = RedisStorageSettings.LAYOUT_KEYS
+
+    __items: List[ChannelPropertyItem]
+
+    # -----------------------------------------------------------------------------
+
+    def setUp(self) -> None:
+        self.__items = []
+
+    # -----------------------------------------------------------------------------
+
+    def tearDown(self) -> None:
+        redis_client = Redis(host=REDIS_HOST, port=REDIS_PORT)
+
+        layout = RedisStorage.create_layout(self.LAYOUT)
+
+        for item in self.__items:
+            layout.remove(redis_client, item)
+
+        redis_client.close()
+
+    # -----------------------------------------------------------------------------
+
+    def test_value_expected_and_matching_value(self) -> None:
+        self.assert_writes(
+            DataType.DATA_TYPE_FLOAT,
+            [
+                ("value", 10.5),
+                ("expected", 20.5),
+                ("value", 15.0),
+                ("value", 20.5),
+            ],
+            [
+                (True, (10.5, None, False)),
+                (True, (10.5, 20.5, True)),
+                (True, (15.0, 20.5, True)),
+                (True, (20.5, None, False)),
+            ],
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def test_unchanged_data_are_not_written(self) -> None:
+        self.assert_writes(
+            DataType.DATA_TYPE_INT,
+            [
+                ("value", 5),
+                ("value", 5),
+                ("expected", 5),
+                ("expected", 7),
+                ("value", 5),
+            ],
+            [
+                (True, (5, None, False)),
+                (False, (5, None, False)),
+                (False, (5, None, False)),
+                (True, (5, 7, True)),
+                (True, (5, 7, True)),
+            ],
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def test_null_values(self) -> None:
+        self.assert_writes(
+            DataType.DATA_TYPE_FLOAT,
+            [
+                ("expected", 1.5),
+                ("value", None),
+                ("value", 1.5),
+                ("value", None),
+            ],
+            [
+                (True, (None, 1.5, True)),
+                (True, (None, 1.5, True)),
+                (True, (1.5, None, False)),
+                (True, (None, None, False)),
+            ],
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def test_float_precision_is_kept(self) -> None:
+        # Stored value is encoded again by script when expected value is written
+        self.assert_writes(
+            DataType.DATA_TYPE_FLOAT,
+            [
+                ("value", 0.1 + 0.2),
+                ("expected", 1e16),
+                ("value", 1e16),
+                ("expected", -123456.789012345),
+            ],
+            [
+                (True, (0.1 + 0.2, None, False)),
+                (True, (0.1 + 0.2, 1e16, True)),
+                (True, (1e16, None, False)),
+                (True, (1e16, -123456.789012345, True)),
+            ],
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def test_string_values(self) -> None:
+        self.assert_writes(
+            DataType.DATA_TYPE_STRING,
+            [
+                ("value", 'quoted "héllo"'),
+                ("expected", ""),
+                ("value", ""),
+            ],
+            [
+                (True, ('quoted "héllo"', None, False)),
+                (True, ('quoted "héllo"', "", True)),
+                (True, ("", None, False)),
+            ],
+        )
+
+    # -----------------------------------------------------------------------------
+
+    def assert_writes(self, data_type: DataType, writes: Writes, expected: Results) -> None:
+        self.assertEqual(expected, self.__execute(data_type, writes))
+
+    # -----------------------------------------------------------------------------
+
+    def __execute(self, data_type: DataType, writes: Writes) -> Results:
+        item = ChannelPropertyItem(
+            uuid.uuid4(),
+            "property",
+            "property",
+            True,
+            True,
+            DataType(data_type),
+            None,
+            None,
+            uuid.uuid4(),
+            uuid.uuid4(),
+        )
+
+        self.__items.append(item)
+
+        storage = RedisStorage({"host": REDIS_HOST, "port": REDIS_PORT, "layout": self.LAYOUT})
+
+        results: Results = []
+
+        try:
+            for mode, value in writes:
+                if mode == "value":
+                    written: StorageItem or None = storage.write_property_value(item, value)
+
+                else:
+                    written: StorageItem or None = storage.write_property_expected(item, value)
+
+                # Stored data are read from server
+                storage.clear_cache()
+
+                stored: StorageItem = storage.read_property_data(item)
+
+                results.append((written is not None, (stored.value, stored.expected, stored.is_pending)))
+
+        finally:
+            storage.close()
+
+        return results
+
+
+class RedisDeviceHashScriptsTestCase(RedisScriptsTestCase):
+    LAYOUT: str = RedisStorageSettings.LAYOUT_DEVICE_HASH
+
+
+if __name__ == "__main__":
+    unittest.main()